@@ -12,6 +12,7 @@ Aplicación web para cálculos completos de sistemas eléctricos:
 import streamlit as st
 import sys
 import os
+import hashlib
 
 # Agregar src al path para importar módulos
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -24,15 +25,19 @@ from calculos import (
     analizar_eficiencia_energetica, analizar_calidad_energia
 )
 
-from graficos import (
-    crear_triangulo_potencias, crear_grafico_circular, crear_grafico_circuito_dc,
-    crear_grafico_capacitor, crear_diagrama_fasorial_trifasico,
-    crear_grafico_desequilibrio
+from compartido import registro
+from perfilado import (
+    iniciar_perfil, finalizar_perfil, instrumentar, FASES_APP, FASES_STREAMLIT, ARCHIVO_PERFIL
 )
 
-from datos import (
-    guardar_historico, mostrar_historico, mostrar_resultados
-)
+# graficos, cache_graficos y datos (plotly, numpy, pandas, fpdf) se importan dentro de las
+# funciones que los usan: la primera pantalla solo necesita streamlit y calculos, y así se
+# muestra antes en un arranque en frío. test_modular.py verifica que no se importen aquí.
+
+# Reejecución parcial de secciones (st.fragment, Streamlit 1.37 o posterior)
+fragmento = st.fragment
+
+FILAS_POR_PAGINA = [25, 50, 100, 250]
 
 
 def configurar_pagina():
@@ -72,6 +77,38 @@ def mostrar_info_version():
         """)
 
 
+def modo_depuracion():
+    """Indica si se muestra información de depuración (OHM_DEBUG=1 o ?debug=1 en la URL)."""
+    if os.environ.get('OHM_DEBUG', '').lower() in ('1', 'true', 'si'):
+        return True
+    return st.query_params.get('debug', '').lower() in ('1', 'true', 'si')
+
+
+def resultado_en_sesion(clave, entradas, calcular):
+    """Retorna el resultado guardado en la sesión si las entradas no cambiaron; si no, lo calcula.
+    
+    Evita repetir cálculos y gráficos en las reejecuciones provocadas por widgets ajenos
+    al cálculo. Retorna el resultado y si fue un acierto.
+    """
+    guardado = st.session_state.get(clave)
+    acierto = guardado is not None and guardado['entradas'] == entradas
+    if not acierto:
+        guardado = {'entradas': entradas, 'resultado': calcular()}
+        st.session_state[clave] = guardado
+    
+    if modo_depuracion():
+        st.caption(f"🐞 {clave}: {'acierto, sin recalcular' if acierto else 'fallo, recalculado'}")
+    return guardado['resultado'], acierto
+
+
+def guardar_historico_una_vez(resultado, acierto, datos):
+    """Guarda el cálculo en el histórico solo la primera vez que se calcula."""
+    if not acierto:
+        from datos import guardar_historico
+        resultado['total_registros'] = guardar_historico(datos)
+    st.success(f"✅ Cálculo guardado en el histórico (Total: {resultado['total_registros']} registros)")
+
+
 def procesar_circuito_trifasico():
     """Procesa los cálculos para sistemas trifásicos."""
     st.header("🔺 Sistema Trifásico")
@@ -107,6 +144,90 @@ def procesar_circuito_trifasico():
             help="Factor de potencia del sistema trifásico"
         )
     
+    # Validaciones
+    if voltaje_linea <= 0 or corriente_linea <= 0:
+        st.error("El voltaje y la corriente deben ser mayores que 0")
+        return
+    
+    entradas = (conexion, voltaje_linea, corriente_linea, factor_potencia)
+    calculo, _ = resultado_en_sesion(
+        'resultado_trifasico', entradas, lambda: calcular_trifasico(*entradas)
+    )
+    
+    # Secciones que solo dependen de los parámetros básicos
+    mostrar_parametros_trifasico(calculo['resultados'])
+    mostrar_eficiencia_trifasico(calculo['eficiencia'], factor_potencia)
+    st.subheader("📐 Diagrama Fasorial")
+    st.plotly_chart(calculo['figuras']['fasorial'], use_container_width=True)
+    
+    # Las corrientes por fase y lo que depende de ellas se reejecutan por separado
+    seccion_corrientes_fase(entradas, calculo)
+
+
+def calcular_trifasico(conexion, voltaje_linea, corriente_linea, factor_potencia):
+    """Calcula el sistema trifásico, su eficiencia y su diagrama fasorial."""
+    from graficos import crear_diagrama_fasorial, FASES_TRIFASICAS
+    from cache_graficos import cache_figuras
+    
+    if conexion == "Estrella (Y)":
+        resultados = calcular_sistema_trifasico_estrella(voltaje_linea, corriente_linea, factor_potencia)
+    else:
+        resultados = calcular_sistema_trifasico_delta(voltaje_linea, corriente_linea, factor_potencia)
+    
+    eficiencia = analizar_eficiencia_energetica(
+        resultados['potencia_activa_total'],
+        resultados['potencia_aparente_total'],
+        factor_potencia
+    )
+    
+    # Voltajes y corrientes de fase juntos; las corrientes atrasan el ángulo φ
+    angulos = [0, -120, 120]
+    angulos_corriente = [a - resultados['angulo_fi'] for a in angulos]
+    figuras = {
+        'fasorial': cache_figuras.obtener_compartida(
+            crear_diagrama_fasorial,
+            [resultados['voltaje_fase']] * 3 + [resultados['corriente_fase']] * 3,
+            angulos + angulos_corriente,
+            grupos=['Voltajes'] * 3 + ['Corrientes'] * 3,
+            etiquetas=[f'V{f}' for f in FASES_TRIFASICAS] + [f'I{f}' for f in FASES_TRIFASICAS],
+            titulo='Diagrama Fasorial Trifásico',
+            normalizar=True
+        )
+    }
+    return {'resultados': resultados, 'eficiencia': eficiencia, 'figuras': figuras}
+
+
+def calcular_fases(corriente_r, corriente_s, corriente_t, factor_potencia, potencia_aparente_total):
+    """Calcula el desequilibrio y la calidad de energía a partir de las corrientes por fase."""
+    from graficos import crear_grafico_desequilibrio
+    from cache_graficos import cache_figuras
+    
+    desequilibrio = calcular_desequilibrio_corrientes(corriente_r, corriente_s, corriente_t)
+    calidad = analizar_calidad_energia(
+        desequilibrio['desequilibrio_porcentaje'],
+        factor_potencia,
+        potencia_aparente_total
+    )
+    figuras = {
+        'desequilibrio': cache_figuras.obtener_compartida(
+            crear_grafico_desequilibrio,
+            [corriente_r, corriente_s, corriente_t], 
+            ['R', 'S', 'T']
+        )
+    }
+    return {'desequilibrio': desequilibrio, 'calidad': calidad, 'figuras': figuras}
+
+
+@fragmento
+def seccion_corrientes_fase(entradas, sistema):
+    """Corrientes por fase con su desequilibrio, calidad y formas de onda.
+    
+    Es un fragmento: al cambiar una corriente de fase solo se reejecuta esta sección,
+    sin volver a enviar las tablas por fase ni el diagrama fasorial.
+    """
+    conexion, voltaje_linea, corriente_linea, factor_potencia = entradas
+    resultados = sistema['resultados']
+    
     # Corrientes individuales por fase
     st.subheader("📊 Corrientes Individuales por Fase")
     col1, col2, col3 = st.columns(3)
@@ -132,46 +253,57 @@ def procesar_circuito_trifasico():
             help="Corriente en la fase T"
         )
     
-    # Validaciones
-    if voltaje_linea <= 0 or corriente_linea <= 0:
-        st.error("El voltaje y la corriente deben ser mayores que 0")
-        return
-    
     if corriente_r <= 0 or corriente_s <= 0 or corriente_t <= 0:
         st.error("Las corrientes de fase deben ser mayores que 0")
         return
     
-    # Cálculos
-    if conexion == "Estrella (Y)":
-        resultados = calcular_sistema_trifasico_estrella(voltaje_linea, corriente_linea, factor_potencia)
-    else:
-        resultados = calcular_sistema_trifasico_delta(voltaje_linea, corriente_linea, factor_potencia)
-    
-    # Análisis avanzados
-    desequilibrio = calcular_desequilibrio_corrientes(corriente_r, corriente_s, corriente_t)
-    eficiencia = analizar_eficiencia_energetica(
-        resultados['potencia_activa_total'],
-        resultados['potencia_aparente_total'],
-        factor_potencia
-    )
-    calidad = analizar_calidad_energia(
-        desequilibrio['desequilibrio_porcentaje'],
-        factor_potencia,
-        resultados['potencia_aparente_total']
+    # La clave incluye los parámetros básicos: de ellos depende la calidad y el registro
+    calculo, acierto = resultado_en_sesion(
+        'resultado_fases', entradas + (corriente_r, corriente_s, corriente_t),
+        lambda: calcular_fases(corriente_r, corriente_s, corriente_t, factor_potencia,
+                               resultados['potencia_aparente_total'])
     )
+    mostrar_desequilibrio_trifasico(calculo['desequilibrio'], calculo['figuras']['desequilibrio'])
+    mostrar_calidad_trifasico(calculo['calidad'])
+    
+    # Formas de onda animadas de las tres fases, con las corrientes medidas por fase
+    from graficos import crear_animacion_ondas
+    from cache_graficos import cache_figuras
+    with st.expander("🌊 Formas de Onda Animadas"):
+        muestras = st.select_slider("Muestras por ciclo", options=[50, 100, 200, 400], value=200,
+                                    key='muestras_trifasico')
+        st.plotly_chart(cache_figuras.obtener_compartida(
+            crear_animacion_ondas,
+            [resultados['voltaje_fase']] * 3,
+            [corriente_r, corriente_s, corriente_t],
+            factor_potencia,
+            muestras=muestras
+        ), use_container_width=True)
     
-    # Mostrar resultados
-    mostrar_resultados_trifasico(resultados, desequilibrio, eficiencia, calidad, 
-                                corriente_r, corriente_s, corriente_t, conexion, 
-                                voltaje_linea, corriente_linea, factor_potencia)
+    # Guardar en histórico
+    datos = {
+        'tipo_circuito': 'Trifásico',
+        'conexion': conexion,
+        'voltaje_linea': voltaje_linea,
+        'corriente_linea': corriente_linea,
+        'factor_potencia': factor_potencia,
+        'potencia_activa_total': resultados['potencia_activa_total'],
+        'potencia_reactiva_total': resultados['potencia_reactiva_total'],
+        'potencia_aparente_total': resultados['potencia_aparente_total'],
+        'corriente_r': corriente_r,
+        'corriente_s': corriente_s,
+        'corriente_t': corriente_t,
+        'desequilibrio_porcentaje': calculo['desequilibrio']['desequilibrio_porcentaje'],
+        'eficiencia_fp': sistema['eficiencia']['eficiencia_fp'],
+        'calidad_puntuacion': calculo['calidad']['puntuacion']
+    }
+    guardar_historico_una_vez(calculo, acierto, datos)
 
 
-def mostrar_resultados_trifasico(resultados, desequilibrio, eficiencia, calidad, 
-                                corriente_r, corriente_s, corriente_t, conexion,
-                                voltaje_linea, corriente_linea, factor_potencia):
-    """Muestra los resultados del análisis trifásico."""
+def mostrar_parametros_trifasico(resultados):
+    """Muestra los parámetros por fase y los totales del sistema."""
+    from datos import mostrar_resultados
     
-    # Resultados principales
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("⚡ Parámetros por Fase")
@@ -197,30 +329,10 @@ def mostrar_resultados_trifasico(resultados, desequilibrio, eficiencia, calidad,
             ("Factor de potencia", resultados['factor_potencia'], ""),
             ("Ángulo φ", resultados['angulo_fi'], "°")
         ])
-    
-    # Análisis de Desequilibrio
-    st.subheader("📊 Análisis de Desequilibrio de Fases")
-    col1, col2 = st.columns(2)
-    with col1:
-        st.write("**Resultados del análisis:**")
-        st.write(f"• Corriente promedio: {desequilibrio['corriente_promedio']:.2f} A")
-        st.write(f"• Desequilibrio: {desequilibrio['desequilibrio_porcentaje']:.2f}%")
-        
-        if desequilibrio['desequilibrio_porcentaje'] <= 2:
-            st.success("🟢 Desequilibrio aceptable (≤ 2%)")
-        elif desequilibrio['desequilibrio_porcentaje'] <= 5:
-            st.warning("🟡 Desequilibrio moderado (2-5%)")
-        else:
-            st.error("🔴 Desequilibrio alto (> 5%)")
-    
-    with col2:
-        fig_desequilibrio = crear_grafico_desequilibrio(
-            [corriente_r, corriente_s, corriente_t], 
-            ['R', 'S', 'T']
-        )
-        st.plotly_chart(fig_desequilibrio, use_container_width=True)
-    
-    # Análisis de Eficiencia
+
+
+def mostrar_eficiencia_trifasico(eficiencia, factor_potencia):
+    """Muestra el análisis de eficiencia energética."""
     st.subheader("⚡ Análisis de Eficiencia Energética")
     col1, col2 = st.columns(2)
     with col1:
@@ -248,8 +360,30 @@ def mostrar_resultados_trifasico(resultados, desequilibrio, eficiencia, calidad,
                 delta=f"vs ideal: {eficiencia['perdidas_reactivas']:.1f}%",
                 delta_color="inverse"
             )
+
+
+def mostrar_desequilibrio_trifasico(desequilibrio, figura):
+    """Muestra el análisis de desequilibrio de fases."""
+    st.subheader("📊 Análisis de Desequilibrio de Fases")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("**Resultados del análisis:**")
+        st.write(f"• Corriente promedio: {desequilibrio['corriente_promedio']:.2f} A")
+        st.write(f"• Desequilibrio: {desequilibrio['desequilibrio_porcentaje']:.2f}%")
+        
+        if desequilibrio['desequilibrio_porcentaje'] <= 2:
+            st.success("🟢 Desequilibrio aceptable (≤ 2%)")
+        elif desequilibrio['desequilibrio_porcentaje'] <= 5:
+            st.warning("🟡 Desequilibrio moderado (2-5%)")
+        else:
+            st.error("🔴 Desequilibrio alto (> 5%)")
     
-    # Análisis de Calidad de Energía
+    with col2:
+        st.plotly_chart(figura, use_container_width=True)
+
+
+def mostrar_calidad_trifasico(calidad):
+    """Muestra el análisis de calidad de energía."""
     st.subheader("🔍 Análisis de Calidad de Energía")
     col1, col2 = st.columns(2)
     with col1:
@@ -269,32 +403,6 @@ def mostrar_resultados_trifasico(resultados, desequilibrio, eficiencia, calidad,
             st.warning(f"🟡 Calidad regular ({calidad['puntuacion']:.0f}/100)")
         else:
             st.error(f"🔴 Calidad deficiente ({calidad['puntuacion']:.0f}/100)")
-    
-    # Diagrama fasorial
-    st.subheader("📐 Diagrama Fasorial")
-    voltajes = [resultados['voltaje_fase']] * 3
-    angulos = [0, -120, 120]
-    st.plotly_chart(crear_diagrama_fasorial_trifasico(voltajes, angulos), use_container_width=True)
-    
-    # Guardar en histórico
-    datos = {
-        'tipo_circuito': 'Trifásico',
-        'conexion': conexion,
-        'voltaje_linea': voltaje_linea,
-        'corriente_linea': corriente_linea,
-        'factor_potencia': factor_potencia,
-        'potencia_activa_total': resultados['potencia_activa_total'],
-        'potencia_reactiva_total': resultados['potencia_reactiva_total'],
-        'potencia_aparente_total': resultados['potencia_aparente_total'],
-        'corriente_r': corriente_r,
-        'corriente_s': corriente_s,
-        'corriente_t': corriente_t,
-        'desequilibrio_porcentaje': desequilibrio['desequilibrio_porcentaje'],
-        'eficiencia_fp': eficiencia['eficiencia_fp'],
-        'calidad_puntuacion': calidad['puntuacion']
-    }
-    total_registros = guardar_historico(datos)
-    st.success(f"✅ Cálculo guardado en el histórico (Total: {total_registros} registros)")
 
 
 def procesar_circuito_resistivo():
@@ -334,9 +442,12 @@ def procesar_dc(voltaje, corriente, horas):
         return
     
     if voltaje > 0 and corriente > 0:
-        resistencia, potencia = calcular_dc(voltaje, corriente)
-        consumo = calcular_consumo(potencia, horas)
+        calculo, acierto = resultado_en_sesion(
+            'resultado_dc', (voltaje, corriente, horas), lambda: calcular_circuito_dc(voltaje, corriente, horas)
+        )
+        resistencia, potencia = calculo['resistencia'], calculo['potencia']
         
+        from datos import mostrar_resultados
         st.subheader("📊 Resultados - Corriente Continua")
         col1, col2 = st.columns(2)
         
@@ -347,11 +458,11 @@ def procesar_dc(voltaje, corriente, horas):
                 ("Corriente", corriente, "A"),
                 ("Resistencia", resistencia, "Ω"),
                 ("Potencia", potencia, "W"),
-                ("Consumo", consumo, "kWh")
+                ("Consumo", calculo['consumo'], "kWh")
             ])
         
         with col2:
-            st.plotly_chart(crear_grafico_circuito_dc(voltaje, corriente, resistencia), use_container_width=True)
+            st.plotly_chart(calculo['figuras']['circuito'], use_container_width=True)
         
         # Guardar histórico
         datos = {
@@ -362,8 +473,23 @@ def procesar_dc(voltaje, corriente, horas):
             'resistencia': resistencia,
             'potencia': potencia
         }
-        total_registros = guardar_historico(datos)
-        st.success(f"✅ Cálculo guardado en el histórico (Total: {total_registros} registros)")
+        guardar_historico_una_vez(calculo, acierto, datos)
+
+
+def calcular_circuito_dc(voltaje, corriente, horas):
+    """Calcula el circuito DC y su gráfico."""
+    from graficos import crear_grafico_circuito_dc
+    from cache_graficos import cache_figuras
+    
+    resistencia, potencia = calcular_dc(voltaje, corriente)
+    return {
+        'resistencia': resistencia,
+        'potencia': potencia,
+        'consumo': calcular_consumo(potencia, horas),
+        'figuras': {
+            'circuito': cache_figuras.obtener_compartida(crear_grafico_circuito_dc, voltaje, corriente, resistencia)
+        }
+    }
 
 
 def procesar_ac(voltaje, corriente, coseno_fi, horas):
@@ -374,10 +500,16 @@ def procesar_ac(voltaje, corriente, coseno_fi, horas):
         return
     
     if voltaje > 0 and corriente > 0:
-        potencia_activa, potencia_reactiva, potencia_aparente = calcular_potencias(voltaje, corriente, coseno_fi)
-        impedancia, resistencia, reactancia = calcular_impedancias(voltaje, corriente, coseno_fi)
-        consumo = calcular_consumo(potencia_activa, horas)
+        calculo, acierto = resultado_en_sesion(
+            'resultado_ac', (voltaje, corriente, coseno_fi, horas),
+            lambda: calcular_circuito_ac(voltaje, corriente, coseno_fi, horas)
+        )
+        potencia_activa, potencia_reactiva, potencia_aparente = calculo['potencias']
+        impedancia, resistencia, reactancia = calculo['impedancias']
         
+        from datos import mostrar_resultados
+        from graficos import crear_animacion_ondas
+        from cache_graficos import cache_figuras
         st.subheader("📊 Resultados - Corriente Alterna")
         col1, col2 = st.columns(2)
         
@@ -387,7 +519,7 @@ def procesar_ac(voltaje, corriente, coseno_fi, horas):
                 ("Potencia activa", potencia_activa, "W"),
                 ("Potencia reactiva", potencia_reactiva, "VAR"),
                 ("Potencia aparente", potencia_aparente, "VA"),
-                ("Consumo", consumo, "kWh")
+                ("Consumo", calculo['consumo'], "kWh")
             ])
         
         with col2:
@@ -402,9 +534,16 @@ def procesar_ac(voltaje, corriente, coseno_fi, horas):
         # Visualizaciones
         col1, col2 = st.columns(2)
         with col1:
-            st.plotly_chart(crear_triangulo_potencias(potencia_activa, potencia_reactiva), use_container_width=True)
+            st.plotly_chart(calculo['figuras']['triangulo'], use_container_width=True)
         with col2:
-            st.plotly_chart(crear_grafico_circular(potencia_activa, potencia_reactiva, potencia_aparente), use_container_width=True)
+            st.plotly_chart(calculo['figuras']['circular'], use_container_width=True)
+        
+        # Formas de onda animadas: los cuadros se reproducen en el navegador
+        with st.expander("🌊 Formas de Onda Animadas"):
+            muestras = st.select_slider("Muestras por ciclo", options=[50, 100, 200, 400], value=200,
+                                        key='muestras_ac')
+            st.plotly_chart(cache_figuras.obtener_compartida(crear_animacion_ondas, [voltaje], [corriente], coseno_fi,
+                                                  muestras=muestras), use_container_width=True)
         
         # Guardar histórico
         datos = {
@@ -420,8 +559,25 @@ def procesar_ac(voltaje, corriente, coseno_fi, horas):
             'resistencia': resistencia,
             'reactancia': reactancia
         }
-        total_registros = guardar_historico(datos)
-        st.success(f"✅ Cálculo guardado en el histórico (Total: {total_registros} registros)")
+        guardar_historico_una_vez(calculo, acierto, datos)
+
+
+def calcular_circuito_ac(voltaje, corriente, coseno_fi, horas):
+    """Calcula potencias, impedancias y consumo del circuito AC y sus gráficos."""
+    from graficos import crear_triangulo_potencias, crear_grafico_circular
+    from cache_graficos import cache_figuras
+    
+    potencia_activa, potencia_reactiva, potencia_aparente = calcular_potencias(voltaje, corriente, coseno_fi)
+    return {
+        'potencias': (potencia_activa, potencia_reactiva, potencia_aparente),
+        'impedancias': calcular_impedancias(voltaje, corriente, coseno_fi),
+        'consumo': calcular_consumo(potencia_activa, horas),
+        'figuras': {
+            'triangulo': cache_figuras.obtener_compartida(crear_triangulo_potencias, potencia_activa, potencia_reactiva),
+            'circular': cache_figuras.obtener_compartida(crear_grafico_circular, potencia_activa, potencia_reactiva,
+                                              potencia_aparente)
+        }
+    }
 
 
 def procesar_circuito_capacitivo():
@@ -449,6 +605,10 @@ def procesar_circuito_capacitivo():
         st.error("El voltaje y la capacitancia deben ser mayores que 0")
         return
     
+    from datos import mostrar_resultados
+    from graficos import crear_grafico_capacitor
+    from cache_graficos import cache_figuras
+    
     if tipo_corriente == "Corriente Continua (DC)":
         carga, energia = calcular_capacitor_dc(voltaje, capacitancia)
         
@@ -467,7 +627,7 @@ def procesar_circuito_capacitivo():
         with col2:
             valores = [voltaje, capacitancia, carga, energia]
             titulos = ['Voltaje (V)', 'Capacitancia (F)', 'Carga (C)', 'Energía (J)']
-            st.plotly_chart(crear_grafico_capacitor(valores, titulos, "DC"), use_container_width=True)
+            st.plotly_chart(cache_figuras.obtener_compartida(crear_grafico_capacitor, valores, titulos, "DC"), use_container_width=True)
     
     else:  # AC
         if frecuencia <= 0:
@@ -493,16 +653,216 @@ def procesar_circuito_capacitivo():
         with col2:
             valores = [voltaje, corriente, reactancia_capacitiva, potencia_reactiva]
             titulos = ['Voltaje (V)', 'Corriente (A)', 'Reactancia (Ω)', 'P. Reactiva (VAR)']
-            st.plotly_chart(crear_grafico_capacitor(valores, titulos, "AC"), use_container_width=True)
+            st.plotly_chart(cache_figuras.obtener_compartida(crear_grafico_capacitor, valores, titulos, "AC"), use_container_width=True)
+
+
+def procesar_carga_masiva():
+    """Calcula en lote las lecturas de un archivo CSV o Excel y las agrega al histórico."""
+    st.header("📥 Carga Masiva de Lecturas")
+    st.caption(
+        "Columnas reconocidas: voltaje (V), corriente (I), coseno_fi (cos φ), horas, conexion "
+        "(Estrella/Delta), corriente_r/s/t (IR/IS/IT), tipo (DC/AC/Estrella/Delta) y fecha. Sin "
+        "tipo, las filas con conexión se calculan como trifásicas, las que tienen cos φ como AC y "
+        "el resto como DC."
+    )
+    
+    archivo = st.file_uploader("Archivo de lecturas", type=['csv', 'xlsx', 'xls'], key='archivo_lecturas')
+    if archivo is None:
+        return
+    
+    from datos import guardar_historico_lote, leer_lecturas
+    
+    contenido = archivo.getvalue()
+    try:
+        calculo, _ = resultado_en_sesion(
+            'resultado_lote', (archivo.name, hashlib.sha1(contenido).hexdigest()),
+            lambda: calcular_lote(leer_lecturas(archivo))
+        )
+    except ImportError:
+        st.error("Para leer archivos Excel se requiere openpyxl: pip install openpyxl")
+        return
+    except Exception as e:
+        st.error(f"No se pudo leer el archivo: {e}")
+        return
+    
+    resultados = calculo['resultados']
+    validas = resultados['error'] == ''
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Lecturas", f"{len(resultados):,}")
+    col2.metric("Válidas", f"{int(validas.sum()):,}")
+    col3.metric("Con error", f"{int((~validas).sum()):,}")
+    
+    if not validas.all():
+        with st.expander("⚠️ Lecturas con error"):
+            errores = resultados.loc[~validas, ['error']]
+            errores.index = errores.index + 1
+            st.dataframe(errores.rename_axis('Fila'), use_container_width=True)
+    
+    mostrar_pagina_lote(resultados, calculo['columnas'])
+    
+    # Resumen y gráficos agregados del lote
+    st.subheader("📊 Resumen del Lote")
+    st.dataframe(calculo['resumen'], use_container_width=True)
+    col1, col2 = st.columns(2)
+    for i, figura in enumerate(calculo['figuras']):
+        with (col1 if i % 2 == 0 else col2):
+            st.plotly_chart(figura, use_container_width=True)
+    
+    # Guardar todas las lecturas válidas con una sola escritura
+    if 'total_registros' in calculo:
+        st.success(f"✅ Lote guardado en el histórico (Total: {calculo['total_registros']} registros)")
+    elif validas.any() and st.button(f"💾 Guardar {int(validas.sum()):,} lecturas en el histórico"):
+        registros = resultados.loc[validas].drop(columns=['error', 'consumo'])
+        calculo['total_registros'] = guardar_historico_lote(registros)
+        st.success(f"✅ Lote guardado en el histórico (Total: {calculo['total_registros']} registros)")
+
+
+def calcular_lote(lecturas):
+    """Calcula las lecturas del lote, su resumen por tipo y sus gráficos agregados."""
+    import numpy as np
+    from calculos_vectorizados import procesar_lecturas
+    from decimacion import densidad_2d
+    from graficos import crear_mapa_densidad_potencias, crear_histograma
+    
+    resultados = procesar_lecturas(lecturas)
+    validas = resultados[resultados['error'] == '']
+    
+    # Columnas con algún valor, para no mostrar las de tipos ausentes en el archivo
+    columnas = [c for c in resultados.columns if c == 'error' or resultados[c].notna().any()]
+    
+    tipo = validas['tipo_circuito'].astype(str) + ' ' + validas['tipo_corriente'].fillna('').astype(str)
+    resumen = validas.assign(tipo=tipo.str.strip()).groupby('tipo').agg(
+        lecturas=('tipo_circuito', 'size'),
+        consumo_kwh=('consumo', 'sum')
+    )
+    
+    # Potencias y factor de potencia de lecturas AC y trifásicas en las mismas columnas
+    p = validas['potencia_activa'].fillna(validas['potencia_activa_total']).to_numpy('float64')
+    q = validas['potencia_reactiva'].fillna(validas['potencia_reactiva_total']).to_numpy('float64')
+    fp = validas['coseno_fi'].fillna(validas['factor_potencia']).dropna().to_numpy('float64')
+    desequilibrio = validas['desequilibrio_porcentaje'].dropna().to_numpy('float64')
+    
+    figuras = []
+    if np.isfinite(p).any():
+        figuras.append(crear_mapa_densidad_potencias(*densidad_2d(p, q, 60)))
+    if len(fp):
+        figuras.append(crear_histograma(*np.histogram(fp, bins=20), 'Factor de Potencia del Lote', 'cos φ'))
+    if len(desequilibrio):
+        figuras.append(crear_histograma(*np.histogram(desequilibrio, bins=20),
+                                        'Desequilibrio de Fases del Lote', 'Desequilibrio (%)'))
+    return {'resultados': resultados, 'columnas': columnas, 'resumen': resumen, 'figuras': figuras}
+
+
+@fragmento
+def mostrar_pagina_lote(resultados, columnas):
+    """Tabla paginada de resultados del lote; cambiar de página solo reejecuta esta sección."""
+    import pandas as pd
+    
+    st.subheader("📋 Resultados")
+    col1, col2 = st.columns(2)
+    with col1:
+        filas_pagina = st.selectbox("Filas por página", FILAS_POR_PAGINA, index=1)
+    paginas = max(1, -(-len(resultados) // filas_pagina))
+    with col2:
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1)
+    
+    inicio = (pagina - 1) * filas_pagina
+    pagina_df = resultados.iloc[inicio:inicio + filas_pagina][columnas]
+    pagina_df.index = pagina_df.index + 1
+    st.dataframe(
+        pagina_df,
+        column_config={
+            col: st.column_config.NumberColumn(format='%.2f')
+            for col in columnas if pd.api.types.is_float_dtype(resultados[col])
+        },
+        use_container_width=True
+    )
+
+
+def mostrar_vista_historico():
+    """Muestra las secciones de la pestaña del histórico."""
+    from datos import (
+        mostrar_historico, mostrar_tendencias, mostrar_series_historicas,
+        mostrar_densidad_potencias, mostrar_vista_flota
+    )
+    
+    mostrar_historico()
+    st.markdown("---")
+    mostrar_tendencias()
+    st.markdown("---")
+    mostrar_series_historicas()
+    st.markdown("---")
+    mostrar_densidad_potencias()
+    st.markdown("---")
+    mostrar_vista_flota()
+
+
+def instrumentar_ejecucion():
+    """Envuelve las funciones medidas por el perfil de la ejecución (modo depuración).
+    
+    Las envolturas de los módulos compartidos solo miden en el hilo de la sesión que
+    está perfilando; en las demás sesiones llaman directamente a la función original.
+    """
+    import graficos
+    import datos
+    import calculos_vectorizados
+    
+    instrumentar(globals(), FASES_APP)
+    for modulo in (graficos, datos, calculos_vectorizados):
+        instrumentar(vars(modulo), FASES_APP)
+    instrumentar(vars(st), FASES_STREAMLIT, prefijo_nombre='st.')
+
+
+def mostrar_depuracion(perfil):
+    """Muestra en la barra lateral las cachés y la cascada de tiempos de la ejecución."""
+    from cache_graficos import cache_figuras
+    from graficos import crear_cascada_tiempos
+    
+    estadisticas = cache_figuras.estadisticas()
+    st.sidebar.caption(
+        f"🐞 Caché de figuras: {estadisticas['aciertos']} aciertos, {estadisticas['fallos']} fallos "
+        f"({estadisticas['entradas']}/{estadisticas['capacidad']} entradas)"
+    )
+    compartidos = registro.estadisticas()
+    st.sidebar.caption(
+        f"🐞 Recursos compartidos: {compartidos['aciertos']} aciertos, "
+        f"{compartidos['construcciones']} construcciones ({compartidos['entradas']} entradas)"
+    )
+    
+    with st.sidebar.expander("🐞 Tiempos de la ejecución", expanded=True):
+        st.caption(" · ".join(
+            f"{categoria}: {duracion:.1f} ms" for categoria, duracion in perfil.totales_por_categoria().items()
+        ))
+        st.plotly_chart(crear_cascada_tiempos(perfil.tramos, perfil.total_ms()), use_container_width=True)
+        st.caption(f"Tiempos registrados en {ARCHIVO_PERFIL}")
 
 
 def main():
     """Función principal de la aplicación."""
     configurar_pagina()
+    
+    if not modo_depuracion():
+        mostrar_aplicacion()
+        return
+    
+    # Modo depuración: medir cada fase de la ejecución y mostrarla como cascada
+    instrumentar_ejecucion()
+    iniciar_perfil()
+    try:
+        mostrar_aplicacion()
+    finally:
+        perfil = finalizar_perfil()
+    mostrar_depuracion(perfil)
+
+
+def mostrar_aplicacion():
+    """Muestra la información de la aplicación y sus pestañas."""
     mostrar_info_version()
     
     # Navegación principal
-    tab1, tab2 = st.tabs(["🧮 Calculadora", "📊 Histórico"])
+    pestanas = ["🧮 Calculadora", "📥 Carga Masiva", "📊 Histórico"]
+    # Con key y on_change, st.tabs informa qué pestaña está abierta
+    tab1, tab2, tab3 = st.tabs(pestanas, key='pestana', on_change='rerun')
     
     with tab1:
         tipo_circuito = st.radio(
@@ -521,7 +881,13 @@ def main():
             procesar_circuito_resistivo()
     
     with tab2:
-        mostrar_historico()
+        procesar_carga_masiva()
+    
+    with tab3:
+        # El histórico solo se carga con la pestaña abierta, para que la calculadora
+        # no dependa de su tamaño
+        if tab3.open:
+            mostrar_vista_historico()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+"""
+Benchmark de la API HTTP local
+Lanza N clientes concurrentes con conexiones persistentes que envían peticiones
+individuales a /potencias y compara, para varias ventanas de agrupación, la latencia
+p50/p99 vista por los clientes, las peticiones por segundo y los elementos por lote
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api import iniciar_servidor, detener_servidor
+
+
+def cliente(puerto, peticiones, latencias, barrera):
+    """Envía peticiones individuales por una conexión persistente y anota cada latencia."""
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto)
+    rng = np.random.default_rng()
+    barrera.wait()
+    for _ in range(peticiones):
+        cuerpo = json.dumps({'voltaje': float(rng.uniform(100, 400)), 'corriente': float(rng.uniform(1, 50)),
+                             'coseno_fi': float(rng.uniform(0.6, 1))})
+        inicio = time.perf_counter()
+        conexion.request('POST', '/potencias', cuerpo, {'Content-Type': 'application/json'})
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        latencias.append(time.perf_counter() - inicio)
+    conexion.close()
+
+
+def medir(espera_ms, clientes, peticiones):
+    """Ejecuta la carga contra un servidor nuevo y retorna las métricas de clientes y servidor."""
+    servidor = iniciar_servidor(espera_ms=espera_ms)
+    try:
+        latencias = []
+        barrera = threading.Barrier(clientes + 1)
+        hilos = [threading.Thread(target=cliente, args=(servidor.server_address[1], peticiones, latencias, barrera))
+                 for _ in range(clientes)]
+        for hilo in hilos:
+            hilo.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+        lotes, elementos = servidor.estadisticas_lotes()['potencias']
+    finally:
+        detener_servidor(servidor)
+
+    latencias = np.array(latencias) * 1000
+    return {
+        'p50_ms': np.percentile(latencias, 50),
+        'p99_ms': np.percentile(latencias, 99),
+        'peticiones_por_segundo': len(latencias) / segundos,
+        'elementos_por_lote': elementos / lotes if lotes else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clientes', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--peticiones', type=int, default=200, help="Peticiones por cliente")
+    parser.add_argument('--espera-ms', type=float, nargs='+', default=[0, 2, 5])
+    args = parser.parse_args()
+
+    print(f"{'Clientes':>8} {'Ventana':>9} {'p50':>9} {'p99':>9} {'Peticiones/s':>13} {'Elem./lote':>11}")
+    for clientes in args.clientes:
+        for espera_ms in args.espera_ms:
+            r = medir(espera_ms, clientes, args.peticiones)
+            print(f"{clientes:>8} {espera_ms:>6.1f} ms {r['p50_ms']:>6.2f} ms {r['p99_ms']:>6.2f} ms "
+                  f"{r['peticiones_por_segundo']:>13,.0f} {r['elementos_por_lote']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark de carga del histórico
+Compara la carga con inferencia de tipos (ruta anterior) contra la carga con esquema
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import datos
+from datos import cargar_historico, FORMATO_FECHA, PYARROW_DISPONIBLE
+
+
+def generar_historico(archivo, filas, semilla=0):
+    """Genera un histórico sintético con la mezcla de registros DC, AC y trifásicos."""
+    rng = np.random.default_rng(semilla)
+    tipo = rng.choice(['DC', 'AC', 'Trifásico'], size=filas, p=[0.2, 0.3, 0.5])
+    es_dc, es_ac, es_tri = tipo == 'DC', tipo == 'AC', tipo == 'Trifásico'
+
+    voltaje = rng.uniform(12, 400, filas)
+    corriente = rng.uniform(0.5, 50, filas)
+    fp = rng.uniform(0.6, 1.0, filas)
+    ir, is_, it = (corriente * rng.uniform(0.9, 1.1, filas) for _ in range(3))
+    fechas = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 3.15e7, filas)), unit='s')
+
+    def solo(mascara, valores):
+        return np.where(mascara, valores, np.nan)
+
+    df = pd.DataFrame({
+        'tipo_circuito': np.where(es_tri, 'Trifásico', 'Resistivo'),
+        'tipo_corriente': np.where(es_tri, None, np.where(es_dc, 'DC', 'AC')),
+        'voltaje': solo(~es_tri, voltaje),
+        'corriente': solo(~es_tri, corriente),
+        'resistencia': solo(~es_tri, voltaje / corriente * np.where(es_ac, fp, 1)),
+        'potencia': solo(es_dc, voltaje * corriente),
+        'fecha': fechas.strftime(FORMATO_FECHA),
+        'coseno_fi': solo(es_ac, fp),
+        'potencia_activa': solo(es_ac, voltaje * corriente * fp),
+        'potencia_reactiva': solo(es_ac, voltaje * corriente * np.sin(np.arccos(fp))),
+        'potencia_aparente': solo(es_ac, voltaje * corriente),
+        'impedancia': solo(es_ac, voltaje / corriente),
+        'reactancia': solo(es_ac, voltaje / corriente * np.sin(np.arccos(fp))),
+        'conexion': np.where(es_tri, np.where(rng.random(filas) < 0.5, 'Estrella (Y)', 'Delta (Δ)'), None),
+        'voltaje_linea': solo(es_tri, voltaje),
+        'corriente_linea': solo(es_tri, corriente),
+        'factor_potencia': solo(es_tri, fp),
+        'potencia_activa_total': solo(es_tri, np.sqrt(3) * voltaje * corriente * fp),
+        'potencia_reactiva_total': solo(es_tri, np.sqrt(3) * voltaje * corriente * np.sin(np.arccos(fp))),
+        'potencia_aparente_total': solo(es_tri, np.sqrt(3) * voltaje * corriente),
+        'corriente_r': solo(es_tri, ir),
+        'corriente_s': solo(es_tri, is_),
+        'corriente_t': solo(es_tri, it),
+        'desequilibrio_porcentaje': solo(es_tri, rng.uniform(0, 10, filas)),
+        'eficiencia_fp': solo(es_tri, fp * 100),
+        'calidad_puntuacion': solo(es_tri, rng.choice([55, 65, 75, 80, 90, 100], filas).astype(float))
+    })
+    df.to_csv(archivo, index=False)
+    return df
+
+
+def cargar_sin_esquema(archivo):
+    """Ruta de carga anterior: inferencia de tipos y conversión de fecha en una segunda pasada."""
+    df = pd.read_csv(archivo)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
+
+def medir(nombre, funcion, repeticiones):
+    """Mide el mejor tiempo de varias repeticiones y la memoria del DataFrame resultante."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        df = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    memoria = df.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"{nombre:<32} {min(tiempos):>9.3f} s {memoria:>10.1f} MB")
+    return min(tiempos), memoria
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, 'historico_calculos.csv')
+        generar_historico(archivo, args.filas)
+        datos.ARCHIVO_HISTORICO = archivo
+        print(f"Archivo: {args.filas:,} filas, {os.path.getsize(archivo) / 1024 ** 2:.1f} MB\n")
+        print(f"{'Ruta':<32} {'Tiempo':>11} {'Memoria':>13}")
+
+        base = medir('Sin esquema (anterior)', lambda: cargar_sin_esquema(archivo), args.repeticiones)
+        nuevo = medir('Con esquema', cargar_historico, args.repeticiones)
+        medir('Con esquema, 4 columnas', lambda: cargar_historico(
+            ['fecha', 'tipo_circuito', 'potencia_activa_total', 'desequilibrio_porcentaje']
+        ), args.repeticiones)
+        if PYARROW_DISPONIBLE:
+            medir('Con esquema, motor pyarrow', lambda: cargar_historico(motor='pyarrow'), args.repeticiones)
+
+        print(f"\nAceleración: {base[0] / nuevo[0]:.2f}x, memoria: {nuevo[1] / base[1]:.0%} de la anterior")
+
+
+if __name__ == '__main__':
+    main()
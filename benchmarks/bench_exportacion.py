@@ -0,0 +1,55 @@
+"""
+Benchmark de exportación de gráficos a imágenes
+Compara fig.write_image figura por figura contra la exportación por lotes de
+exportacion.py con uno o varios procesos renderizadores
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from graficos import crear_triangulo_potencias, crear_grafico_desequilibrio, figura_desde_dict
+from exportacion import exportar_figuras
+
+
+def generar_figuras(cantidad):
+    """Genera figuras de ejemplo alternando triángulos de potencias y desequilibrios."""
+    for i in range(cantidad):
+        if i % 2:
+            yield f'triangulo_{i}', crear_triangulo_potencias(1000 + i, 500 + i, rapido=True)
+        else:
+            yield f'desequilibrio_{i}', crear_grafico_desequilibrio([10, 8 + i % 5, 12], ['R', 'S', 'T'],
+                                                                    rapido=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--figuras', type=int, default=200)
+    parser.add_argument('--formato', default='png')
+    parser.add_argument('--procesos', type=int, nargs='+', default=sorted({1, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # Referencia: una llamada a write_image por figura (con validación)
+        muestra = min(args.figuras, 20)
+        inicio = time.perf_counter()
+        for nombre, figura in generar_figuras(muestra):
+            figura_desde_dict(figura).write_image(os.path.join(directorio, f'{nombre}.{args.formato}'))
+        referencia = muestra / (time.perf_counter() - inicio)
+        print(f"{'write_image (una a una)':<28} {referencia:>8.1f} figuras/s")
+
+        for procesos in args.procesos:
+            resultado = exportar_figuras(generar_figuras(args.figuras),
+                                         os.path.join(directorio, f'lote_{procesos}.zip'),
+                                         formato=args.formato, procesos=procesos)
+            print(f"{f'exportar_figuras ({procesos} proc.)':<28} "
+                  f"{resultado['figuras_por_segundo']:>8.1f} figuras/s "
+                  f"({resultado['figuras_por_segundo'] / referencia:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark de construcción de gráficos
+Compara los constructores de graficos.py (con plantillas y en modo rápido, que
+retorna el dict sin validar) contra la construcción con validación completa de la
+misma figura, equivalente a la ruta anterior
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import plotly.graph_objects as go
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from graficos import (
+    crear_triangulo_potencias, crear_grafico_circular, crear_grafico_circuito_dc,
+    crear_diagrama_fasorial_trifasico, crear_grafico_desequilibrio
+)
+
+
+CASOS = {
+    'crear_triangulo_potencias': lambda **kw: crear_triangulo_potencias(1760, 1320, **kw),
+    'crear_grafico_circular': lambda **kw: crear_grafico_circular(1760, 1320, 2200, **kw),
+    'crear_grafico_circuito_dc': lambda **kw: crear_grafico_circuito_dc(12, 2, 6, **kw),
+    'crear_diagrama_fasorial_trifasico': lambda **kw: crear_diagrama_fasorial_trifasico(
+        [220, 220, 220], [0, -120, 120], **kw),
+    'crear_grafico_desequilibrio': lambda **kw: crear_grafico_desequilibrio([10, 8, 12], ['R', 'S', 'T'], **kw)
+}
+
+
+def medir(funcion, repeticiones):
+    """Retorna el tiempo medio por llamada en milisegundos."""
+    funcion()
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeticiones', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'Gráfico':<36} {'Validado':>10} {'Plantilla':>10} {'Rápido':>10} {'Mejora':>8}")
+    for nombre, constructor in CASOS.items():
+        figura = constructor().to_dict()
+        validado = medir(lambda: go.Figure(figura), args.repeticiones)
+        plantilla = medir(constructor, args.repeticiones)
+        rapido = medir(lambda: constructor(rapido=True), args.repeticiones)
+        print(f"{nombre:<36} {validado:>8.2f}ms {plantilla:>8.2f}ms {rapido:>8.3f}ms "
+              f"{validado / rapido:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark de memoria con N sesiones simuladas
+Cada sesión guarda en su estado el cálculo trifásico con sus figuras (como app.py) y
+abre el histórico al mismo tiempo que las demás. Compara la memoria en uso con todas
+las sesiones abiertas y la retenida al terminar, con los recursos compartidos del
+proceso (compartido.py y CacheFiguras.obtener_compartida) y sin ellos
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# pyarrow reserva sus búferes fuera del asignador de Python (tracemalloc no los ve)
+try:
+    import pyarrow as pa
+    memoria_arrow = pa.total_allocated_bytes
+except ImportError:
+    memoria_arrow = lambda: 0
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import app
+from cache_graficos import cache_figuras
+from graficos import crear_grafico_desequilibrio
+from compartido import registro
+from datos import guardar_historico_lote, cargar_historico_vigente, agregados_vigentes
+
+
+def generar_historico(registros):
+    """Escribe un histórico sintético de lecturas trifásicas en el directorio actual."""
+    rng = np.random.default_rng(0)
+    fp = rng.uniform(0.6, 1, registros)
+    s = rng.uniform(1000, 20000, registros)
+    guardar_historico_lote(pd.DataFrame({
+        'tipo_circuito': 'Trifásico',
+        'conexion': rng.choice(['Estrella (Y)', 'Delta (Δ)'], registros),
+        'voltaje_linea': 380.0,
+        'corriente_linea': s / (np.sqrt(3) * 380),
+        'factor_potencia': fp,
+        'potencia_activa_total': s * fp,
+        'potencia_reactiva_total': s * np.sin(np.arccos(fp)),
+        'potencia_aparente_total': s,
+        'fecha': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 3e7, registros), unit='s')
+    }))
+
+
+def memoria_actual():
+    """Bytes asignados por Python (tracemalloc) y por pyarrow."""
+    return tracemalloc.get_traced_memory()[0] + memoria_arrow()
+
+
+def simular_sesiones(cantidad, compartir):
+    """Simula sesiones concurrentes y retorna los MB en uso con todas abiertas y los retenidos al final."""
+    registro.limpiar()
+    cache_figuras.limpiar()
+    registro.habilitado = compartir
+    # Sin compartir, cada sesión guarda su propia copia de las figuras (obtener)
+    obtener = cache_figuras.obtener_compartida if compartir else cache_figuras.obtener
+    sesiones = [{} for _ in range(cantidad)]
+    # Todas las sesiones quedan a mitad de su ejecución hasta que se mide la memoria
+    cargadas = threading.Barrier(cantidad + 1)
+    medida = threading.Barrier(cantidad + 1)
+
+    def sesion(estado):
+        calculo = app.calcular_trifasico("Estrella (Y)", 380.0, 10.0, 0.85)
+        calculo['figuras']['desequilibrio'] = obtener(
+            crear_grafico_desequilibrio, [10.0, 10.0, 10.0], ['R', 'S', 'T'])
+        estado['resultado_trifasico'] = {'entradas': (380.0, 10.0, 0.85), 'resultado': calculo}
+        # Vista del histórico: el DataFrame y los agregados viven mientras dura la ejecución
+        df = cargar_historico_vigente()
+        tendencias = agregados_vigentes('dia', 'potencia_activa_total')
+        cargadas.wait()
+        medida.wait()
+        return len(df) + len(tendencias)
+
+    original = cache_figuras.obtener_compartida
+    cache_figuras.obtener_compartida = obtener
+    tracemalloc.start()
+    try:
+        base = memoria_actual()
+        hilos = [threading.Thread(target=sesion, args=(estado,)) for estado in sesiones]
+        for hilo in hilos:
+            hilo.start()
+        cargadas.wait()
+        en_uso = memoria_actual() - base
+        medida.wait()
+        for hilo in hilos:
+            hilo.join()
+        # Lo que queda vivo tras las ejecuciones: estados de sesión y objetos compartidos
+        retenido = memoria_actual() - base
+    finally:
+        tracemalloc.stop()
+        cache_figuras.obtener_compartida = original
+        registro.habilitado = True
+    return en_uso / 2**20, retenido / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--registros', type=int, default=50_000, help="Registros del histórico sintético")
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            generar_historico(args.registros)
+            # Calentamiento: importaciones diferidas y cachés internas de pandas/pyarrow/plotly
+            simular_sesiones(1, False)
+            
+            print(f"{'Sesiones':>8} {'Modo':<12} {'En uso':>12} {'Por sesión':>12} {'Retenido':>12}")
+            for cantidad in args.sesiones:
+                for compartir in (False, True):
+                    en_uso, retenido = simular_sesiones(cantidad, compartir)
+                    print(f"{cantidad:>8} {'compartido' if compartir else 'por sesión':<12} "
+                          f"{en_uso:>9.1f} MB {en_uso / cantidad:>9.2f} MB {retenido:>9.1f} MB")
+        finally:
+            os.chdir(directorio_original)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark del tamaño del JSON de los gráficos
+Compara los bytes de cada figura antes y después de compactarla con serializacion.py,
+con listas redondeadas (lo que recibe Streamlit) y con arreglos binarios (exportación)
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from graficos import (
+    crear_triangulo_potencias, crear_diagrama_fasorial, crear_grafico_serie_historica,
+    crear_mapa_densidad_potencias, crear_animacion_ondas, crear_flota_desequilibrio
+)
+from decimacion import decimar_serie, densidad_2d
+from serializacion import reporte_compactacion, binario_disponible
+
+
+def generar_casos(registros):
+    """Genera figuras de ejemplo a partir de un histórico sintético."""
+    rng = np.random.default_rng(0)
+    segundos = np.sort(rng.integers(1_600_000_000, 1_700_000_000, registros))
+    p = rng.uniform(100, 5000, registros)
+    q = p * rng.uniform(0, 1, registros)
+    fechas, valores, total = decimar_serie(segundos, p, metodo='lttb')
+
+    return {
+        'Triángulo de potencias': crear_triangulo_potencias(1760.5, 1320.25, rapido=True),
+        'Fasorial (600 vectores)': crear_diagrama_fasorial(
+            rng.uniform(1, 220, 600), rng.uniform(-180, 180, 600), ['V', 'I'] * 300, rapido=True),
+        'Serie histórica': crear_grafico_serie_historica(
+            fechas.astype('datetime64[s]'), valores, 'potencia', total, rapido=True),
+        'Densidad P-Q': crear_mapa_densidad_potencias(*densidad_2d(p, q), rapido=True),
+        'Animación de ondas': crear_animacion_ondas([220] * 3, [10, 9, 11], 0.85, rapido=True),
+        'Flota (60 circuitos)': crear_flota_desequilibrio(rng.uniform(8, 12, (60, 3)), rapido=True)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--registros', type=int, default=100_000)
+    args = parser.parse_args()
+
+    binario = binario_disponible()
+    print(f"{'Gráfico':<26} {'Original':>10} {'Listas':>16} {'Binario':>16}")
+    for nombre, figura in generar_casos(args.registros).items():
+        _, listas = reporte_compactacion(figura, binario=False)
+        columnas = [f"{listas['bytes_despues'] / 1024:>7.1f} kB ({listas['reduccion_porcentaje']:>3.0f}%)"]
+        if binario:
+            _, binarios = reporte_compactacion(figura, binario=True)
+            columnas.append(f"{binarios['bytes_despues'] / 1024:>7.1f} kB ({binarios['reduccion_porcentaje']:>3.0f}%)")
+        else:
+            columnas.append(f"{'no disponible':>16}")
+        print(f"{nombre:<26} {listas['bytes_antes'] / 1024:>7.1f} kB {columnas[0]:>16} {columnas[1]:>16}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark del sondeo de medidores
+Inicia el simulador de medidores en otro proceso y mide, para varias cantidades de
+conexiones persistentes, las lecturas por segundo que un solo proceso sondeador lee y
+calcula por lotes
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sondeo import Sondeador, medidores_de
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esperar_puerto(puerto, segundos=30):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        try:
+            socket.create_connection(('127.0.0.1', puerto), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("El simulador no respondió")
+
+
+async def medir(puerto, unidades, conexiones, rondas):
+    """Ejecuta las rondas y retorna la mediana de lecturas por segundo (sin contar la primera)."""
+    sondeador = Sondeador(medidores_de([('127.0.0.1', puerto)], unidades), conexiones)
+    try:
+        resumenes = await sondeador.ejecutar(intervalo=0, rondas=rondas + 1)
+    finally:
+        sondeador.cerrar()
+    # La primera ronda abre las conexiones
+    tasas = sorted(r['lecturas_por_segundo'] for r in resumenes[1:])
+    return tasas[len(tasas) // 2], resumenes[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--unidades', type=int, default=5000)
+    parser.add_argument('--conexiones', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--rondas', type=int, default=3)
+    args = parser.parse_args()
+
+    puerto = puerto_libre()
+    simulador = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), '..', 'src', 'sondeo.py'), 'simulador',
+         '--puerto', str(puerto), '--unidades', str(args.unidades), '--semilla', '0'],
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        esperar_puerto(puerto)
+        print(f"{'Conexiones':>10} {'Lecturas/s':>11} {'Ronda':>9} {'Lotes':>6}")
+        for conexiones in args.conexiones:
+            tasa, ultimo = asyncio.run(medir(puerto, args.unidades, conexiones, args.rondas))
+            print(f"{conexiones:>10} {tasa:>11,.0f} {ultimo['segundos'] * 1000:>6.0f} ms {ultimo['lotes']:>6}")
+    finally:
+        simulador.terminate()
+        simulador.wait()
+
+
+if __name__ == '__main__':
+    main()
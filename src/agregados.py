@@ -0,0 +1,112 @@
+"""
+Módulo de agregados del histórico
+Mantiene tablas pre-agregadas por hora, día y mes de las métricas del histórico
+"""
+
+import os
+import pandas as pd
+
+
+# Métricas del histórico que se resumen en los agregados
+METRICAS_AGREGADAS = [
+    'potencia_activa',
+    'potencia_activa_total',
+    'desequilibrio_porcentaje',
+    'calidad_puntuacion'
+]
+
+# Resoluciones disponibles y frecuencia usada para truncar las fechas
+RESOLUCIONES = {
+    'hora': 'h',
+    'dia': 'D',
+    'mes': 'M'
+}
+
+CLAVES_AGREGADO = ['periodo', 'tipo_circuito', 'metrica']
+COLUMNAS_AGREGADO = CLAVES_AGREGADO + ['conteo', 'suma', 'minimo', 'maximo', 'media']
+
+
+def archivo_agregado(resolucion):
+    """Retorna el nombre del archivo CSV de agregados para una resolución."""
+    return f'agregados_{resolucion}.csv'
+
+
+def agregados_existen():
+    """Indica si ya existen los archivos de agregados de todas las resoluciones."""
+    return all(os.path.exists(archivo_agregado(r)) for r in RESOLUCIONES)
+
+
+def truncar_fechas(fechas, resolucion):
+    """Trunca una serie de fechas al inicio de su periodo (hora, día o mes)."""
+    if resolucion == 'mes':
+        return fechas.dt.to_period(RESOLUCIONES[resolucion]).dt.to_timestamp()
+    return fechas.dt.floor(RESOLUCIONES[resolucion])
+
+
+def calcular_agregados(df, resolucion):
+    """Calcula conteo, suma, mínimo, máximo y media por periodo, tipo de circuito y métrica."""
+    metricas = [m for m in METRICAS_AGREGADAS if m in df.columns]
+    if df.empty or not metricas:
+        return pd.DataFrame(columns=COLUMNAS_AGREGADO)
+
+    base = df[['fecha', 'tipo_circuito'] + metricas].copy()
+    base['periodo'] = truncar_fechas(pd.to_datetime(base['fecha']), resolucion)
+
+    # Formato largo: una fila por registro y métrica, sin valores vacíos
+    largo = base.melt(
+        id_vars=['periodo', 'tipo_circuito'],
+        value_vars=metricas,
+        var_name='metrica',
+        value_name='valor'
+    ).dropna(subset=['valor'])
+    if largo.empty:
+        return pd.DataFrame(columns=COLUMNAS_AGREGADO)
+
+    agregado = largo.groupby(CLAVES_AGREGADO, observed=True)['valor'].agg(
+        conteo='count', suma='sum', minimo='min', maximo='max'
+    ).reset_index()
+    agregado['media'] = agregado['suma'] / agregado['conteo']
+    return agregado[COLUMNAS_AGREGADO]
+
+
+def combinar_agregados(existente, nuevo):
+    """Combina dos tablas de agregados sumando conteos y sumas y ajustando extremos."""
+    if existente is None or existente.empty:
+        return nuevo.reset_index(drop=True)
+    if nuevo is None or nuevo.empty:
+        return existente.reset_index(drop=True)
+
+    combinado = pd.concat([existente, nuevo], ignore_index=True).groupby(
+        CLAVES_AGREGADO, observed=True
+    ).agg(conteo=('conteo', 'sum'), suma=('suma', 'sum'),
+          minimo=('minimo', 'min'), maximo=('maximo', 'max')).reset_index()
+    combinado['media'] = combinado['suma'] / combinado['conteo']
+    return combinado[COLUMNAS_AGREGADO]
+
+
+def cargar_agregados(resolucion, metrica=None):
+    """Carga la tabla de agregados de una resolución, opcionalmente filtrada por métrica."""
+    archivo = archivo_agregado(resolucion)
+    if not os.path.exists(archivo):
+        return pd.DataFrame(columns=COLUMNAS_AGREGADO)
+
+    df = pd.read_csv(archivo, parse_dates=['periodo'])
+    if metrica is not None:
+        df = df[df['metrica'] == metrica]
+    return df.sort_values('periodo').reset_index(drop=True)
+
+
+def actualizar_agregados(nuevos_registros):
+    """Incorpora registros nuevos del histórico a los agregados de todas las resoluciones."""
+    for resolucion in RESOLUCIONES:
+        nuevo = calcular_agregados(nuevos_registros, resolucion)
+        if nuevo.empty:
+            continue
+        existente = cargar_agregados(resolucion)
+        combinar_agregados(existente, nuevo).to_csv(archivo_agregado(resolucion), index=False)
+
+
+def reconstruir_agregados(df):
+    """Reconstruye desde cero los agregados de todas las resoluciones a partir del histórico."""
+    for resolucion in RESOLUCIONES:
+        calcular_agregados(df, resolucion).to_csv(archivo_agregado(resolucion), index=False)
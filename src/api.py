@@ -0,0 +1,437 @@
+"""
+Módulo de API HTTP local
+Expone los cálculos como endpoints JSON sobre http.server (sin dependencias adicionales).
+Cada endpoint acepta un objeto o un arreglo de objetos; las peticiones individuales que
+llegan con pocos milisegundos de diferencia se agrupan en un solo cálculo vectorizado
+con calculos_vectorizados.py. GET /metricas reporta latencias p50/p99 y rendimiento
+
+Uso desde la línea de comandos:
+    python src/api.py --puerto 8502 --espera-ms 2
+    curl -X POST localhost:8502/potencias -d '{"voltaje": 220, "corriente": 10, "coseno_fi": 0.85}'
+    curl -X POST localhost:8502/trifasico -d '[{"conexion": "delta", "voltaje_linea": 380,
+                                                "corriente_linea": 10, "factor_potencia": 0.9}]'
+    curl localhost:8502/metricas
+"""
+
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from calculos import calcular_dc
+from calculos_vectorizados import (
+    calcular_potencias_lote, calcular_impedancias_lote, calcular_sistema_trifasico_lote,
+    calcular_desequilibrio_lote, CONEXION_ESTRELLA, CONEXION_DELTA
+)
+
+
+ESPERA_LOTE_MS = 2
+MAXIMO_LOTE = 1024
+TIEMPO_MAXIMO_RESPUESTA = 30
+MAXIMO_CUERPO = 16 * 1024 * 1024  # bytes del cuerpo de una petición
+
+# Ventana de las métricas: últimas peticiones y segundos para el rendimiento
+MUESTRAS_LATENCIA = 10_000
+VENTANA_RENDIMIENTO = 60
+
+# Mensajes de validar_entrada y validar_entrada_dc (calculos.py)
+ERROR_VOLTAJE = "El voltaje debe ser mayor que 0"
+ERROR_CORRIENTE = "La corriente debe ser mayor que 0"
+ERROR_FACTOR_POTENCIA = "El factor de potencia debe estar entre -1 y 1"
+ERROR_FASES = "Las corrientes de fase deben ser mayores que 0"
+
+
+def _numero(valor):
+    """Convierte un valor JSON numérico a float."""
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        raise ValueError("debe ser numérico")
+    return float(valor)
+
+
+def _conexion(valor):
+    """Convierte la conexión ('estrella', 'Y', 'delta', 'Δ'...) a 1.0 si es delta y 0.0 si es estrella."""
+    texto = str(valor).strip().lower()
+    if texto.startswith(('e', 'y')):
+        return 0.0
+    if texto.startswith(('d', 'δ', 'triangulo', 'triángulo')):
+        return 1.0
+    raise ValueError("debe ser Estrella o Delta")
+
+
+def _entre(valores, minimo, maximo):
+    return (valores >= minimo) & (valores <= maximo)
+
+
+def _dc(e):
+    resistencia, potencia = calcular_dc(e['voltaje'], e['corriente'])
+    return {'resistencia': resistencia, 'potencia': potencia}
+
+
+def _potencias(e):
+    activa, reactiva, aparente = calcular_potencias_lote(e['voltaje'], e['corriente'], e['coseno_fi'])
+    return {'potencia_activa': activa, 'potencia_reactiva': reactiva, 'potencia_aparente': aparente}
+
+
+def _impedancias(e):
+    impedancia, resistencia, reactancia = calcular_impedancias_lote(e['voltaje'], e['corriente'], e['coseno_fi'])
+    return {'impedancia': impedancia, 'resistencia': resistencia, 'reactancia': reactancia}
+
+
+def _trifasico(e):
+    delta = e['conexion'] == 1.0
+    sistema = calcular_sistema_trifasico_lote(e['voltaje_linea'], e['corriente_linea'], e['factor_potencia'], delta)
+    return dict(sistema, conexion=np.where(delta, CONEXION_DELTA, CONEXION_ESTRELLA))
+
+
+def _desequilibrio(e):
+    return calcular_desequilibrio_lote(e['corriente_r'], e['corriente_s'], e['corriente_t'])
+
+
+def _reglas_ac(e):
+    return [
+        (e['voltaje'] > 0, ERROR_VOLTAJE),
+        (e['corriente'] > 0, ERROR_CORRIENTE),
+        (_entre(e['coseno_fi'], -1, 1), ERROR_FACTOR_POTENCIA)
+    ]
+
+# Endpoints: campos de entrada (con su conversión), reglas de validación en el orden de
+# calculos.py (condición de validez, mensaje) y cálculo vectorizado
+ENDPOINTS = {
+    'dc': {
+        'campos': {'voltaje': _numero, 'corriente': _numero},
+        'reglas': lambda e: [(e['voltaje'] > 0, ERROR_VOLTAJE), (e['corriente'] > 0, ERROR_CORRIENTE)],
+        'calcular': _dc
+    },
+    'potencias': {
+        'campos': {'voltaje': _numero, 'corriente': _numero, 'coseno_fi': _numero},
+        'reglas': _reglas_ac,
+        'calcular': _potencias
+    },
+    'impedancias': {
+        'campos': {'voltaje': _numero, 'corriente': _numero, 'coseno_fi': _numero},
+        'reglas': _reglas_ac,
+        'calcular': _impedancias
+    },
+    'trifasico': {
+        'campos': {'conexion': _conexion, 'voltaje_linea': _numero, 'corriente_linea': _numero,
+                   'factor_potencia': _numero},
+        'reglas': lambda e: [
+            (e['voltaje_linea'] > 0, ERROR_VOLTAJE),
+            (e['corriente_linea'] > 0, ERROR_CORRIENTE),
+            (_entre(e['factor_potencia'], -1, 1), ERROR_FACTOR_POTENCIA)
+        ],
+        'calcular': _trifasico
+    },
+    'desequilibrio': {
+        'campos': {'corriente_r': _numero, 'corriente_s': _numero, 'corriente_t': _numero},
+        'reglas': lambda e: [
+            ((e['corriente_r'] > 0) & (e['corriente_s'] > 0) & (e['corriente_t'] > 0), ERROR_FASES)
+        ],
+        'calcular': _desequilibrio
+    }
+}
+
+
+def calcular_elementos(endpoint, elementos):
+    """Calcula en una pasada vectorizada una lista de objetos de entrada de un endpoint.
+
+    Retorna un dict de resultados por elemento, o {'error': mensaje} para los inválidos.
+    """
+    definicion = ENDPOINTS[endpoint]
+    n = len(elementos)
+    entradas = {campo: np.full(n, np.nan) for campo in definicion['campos']}
+    errores = [None] * n
+    for i, elemento in enumerate(elementos):
+        if not isinstance(elemento, dict):
+            errores[i] = "Cada elemento debe ser un objeto JSON"
+            continue
+        for campo, convertir in definicion['campos'].items():
+            if campo not in elemento:
+                errores[i] = f"Falta el campo {campo}"
+                break
+            try:
+                entradas[campo][i] = convertir(elemento[campo])
+            except ValueError as e:
+                errores[i] = f"El campo {campo} {e}"
+                break
+
+    # La primera regla que falla define el error, como en validar_entrada; los errores de
+    # lectura de los campos tienen prioridad
+    errores_reglas = np.full(n, None, dtype=object)
+    for validas, mensaje in reversed(definicion['reglas'](entradas)):
+        errores_reglas[~validas] = mensaje
+    errores = [error or regla for error, regla in zip(errores, errores_reglas)]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columnas = {nombre: np.asarray(valores).tolist() for nombre, valores in definicion['calcular'](entradas).items()}
+    return [
+        {'error': error} if error is not None else {nombre: valores[i] for nombre, valores in columnas.items()}
+        for i, error in enumerate(errores)
+    ]
+
+
+class MicroLote:
+    """Agrupa las peticiones individuales que llegan dentro de una ventana en un solo cálculo.
+
+    Un hilo toma la primera petición de la cola y espera hasta espera_ms (o hasta reunir
+    maximo) a las siguientes; luego las calcula juntas con calcular_elementos.
+    """
+
+    def __init__(self, endpoint, espera_ms=ESPERA_LOTE_MS, maximo=MAXIMO_LOTE):
+        self.endpoint = endpoint
+        self.espera = espera_ms / 1000
+        self.maximo = maximo
+        self.lotes = 0
+        self.elementos = 0
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._atender, name=f'lote-{endpoint}', daemon=True)
+        self._hilo.start()
+
+    def enviar(self, elemento):
+        """Encola un elemento y retorna el Future con su resultado."""
+        futuro = Future()
+        self._cola.put((elemento, futuro))
+        return futuro
+
+    def _reunir(self):
+        """Espera la primera petición y reúne las que llegan dentro de la ventana."""
+        primera = self._cola.get()
+        if primera is None:
+            return None
+        pendientes = [primera]
+        limite = time.perf_counter() + self.espera
+        while len(pendientes) < self.maximo:
+            try:
+                restante = limite - time.perf_counter()
+                siguiente = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if siguiente is None:
+                # Cerrar después de atender este lote
+                self._cola.put(None)
+                break
+            pendientes.append(siguiente)
+        return pendientes
+
+    def _atender(self):
+        while (pendientes := self._reunir()) is not None:
+            try:
+                resultados = calcular_elementos(self.endpoint, [elemento for elemento, _ in pendientes])
+            except Exception as e:
+                for _, futuro in pendientes:
+                    futuro.set_exception(e)
+                continue
+            self.lotes += 1
+            self.elementos += len(pendientes)
+            for (_, futuro), resultado in zip(pendientes, resultados):
+                futuro.set_result(resultado)
+
+    def cerrar(self):
+        self._cola.put(None)
+        self._hilo.join()
+
+
+class Metricas:
+    """Latencias y rendimiento por endpoint de las últimas peticiones."""
+
+    def __init__(self, muestras=MUESTRAS_LATENCIA, ventana=VENTANA_RENDIMIENTO):
+        self.ventana = ventana
+        self.inicio = time.time()
+        self._muestras = muestras
+        self._registros = {}
+        self._totales = {}
+        self._bloqueo = threading.Lock()
+
+    def registrar(self, endpoint, segundos, elementos):
+        """Registra una petición atendida con su latencia y cantidad de elementos."""
+        with self._bloqueo:
+            registros = self._registros.setdefault(endpoint, deque(maxlen=self._muestras))
+            registros.append((time.time(), segundos, elementos))
+            totales = self._totales.setdefault(endpoint, [0, 0])
+            totales[0] += 1
+            totales[1] += elementos
+
+    def resumen(self, lotes=None):
+        """Retorna por endpoint las peticiones, p50/p99 (ms) y peticiones y elementos por segundo."""
+        ahora = time.time()
+        ventana = min(self.ventana, max(ahora - self.inicio, 1e-9))
+        resultado = {}
+        with self._bloqueo:
+            for endpoint, registros in self._registros.items():
+                latencias = np.array([r[1] for r in registros]) * 1000
+                recientes = [r for r in registros if r[0] >= ahora - ventana]
+                resultado[endpoint] = {
+                    'peticiones': self._totales[endpoint][0],
+                    'elementos': self._totales[endpoint][1],
+                    'p50_ms': float(np.percentile(latencias, 50)),
+                    'p99_ms': float(np.percentile(latencias, 99)),
+                    'peticiones_por_segundo': len(recientes) / ventana,
+                    'elementos_por_segundo': sum(r[2] for r in recientes) / ventana
+                }
+        for endpoint, (cantidad, elementos) in (lotes or {}).items():
+            if endpoint in resultado:
+                resultado[endpoint]['lotes'] = cantidad
+                resultado[endpoint]['elementos_por_lote'] = elementos / cantidad if cantidad else 0.0
+        return resultado
+
+
+class ManejadorCalculos(BaseHTTPRequestHandler):
+    """Atiende POST /<endpoint> con un objeto o un arreglo JSON y GET /metricas y /salud."""
+
+    protocol_version = 'HTTP/1.1'
+    # Encabezados y cuerpo van en escrituras separadas: sin TCP_NODELAY el cuerpo esperaría
+    # el ACK retardado del cliente (~40 ms por respuesta en conexiones persistentes)
+    disable_nagle_algorithm = True
+
+    def log_message(self, formato, *args):
+        if self.server.registrar_peticiones:
+            super().log_message(formato, *args)
+
+    def _responder(self, estado, contenido):
+        cuerpo = json.dumps(contenido, ensure_ascii=False, allow_nan=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        ruta = self.path.rstrip('/')
+        if ruta == '/metricas':
+            self._responder(200, self.server.metricas.resumen(self.server.estadisticas_lotes()))
+        elif ruta == '/salud':
+            self._responder(200, {'estado': 'ok', 'endpoints': sorted(ENDPOINTS)})
+        else:
+            self._responder(404, {'error': f"Ruta desconocida: {self.path}"})
+
+    def do_POST(self):
+        inicio = time.perf_counter()
+        endpoint = self.path.strip('/')
+        longitud = self._longitud_cuerpo()
+        if longitud is None:
+            return
+        cuerpo = self.rfile.read(longitud)
+        if endpoint not in ENDPOINTS:
+            self._responder(404, {'error': f"Endpoint desconocido: {endpoint}", 'endpoints': sorted(ENDPOINTS)})
+            return
+        try:
+            entrada = json.loads(cuerpo or b'null')
+        except ValueError:
+            self._responder(400, {'error': "El cuerpo debe ser JSON válido"})
+            return
+
+        try:
+            if isinstance(entrada, list):
+                # Un arreglo ya es un lote: se calcula directamente en este hilo
+                resultado, estado = calcular_elementos(endpoint, entrada), 200
+            else:
+                resultado = self.server.lotes[endpoint].enviar(entrada).result(TIEMPO_MAXIMO_RESPUESTA)
+                estado = 422 if 'error' in resultado else 200
+        except Exception as e:
+            self._responder(500, {'error': f"Error al calcular: {e}"})
+            return
+
+        self._responder(estado, self._finitos(resultado))
+        self.server.metricas.registrar(endpoint, time.perf_counter() - inicio,
+                                       len(entrada) if isinstance(entrada, list) else 1)
+
+    def _longitud_cuerpo(self):
+        """Retorna la longitud del cuerpo, o None tras responder el error si no es aceptable."""
+        encabezado = self.headers.get('Content-Length')
+        try:
+            longitud = int(encabezado) if encabezado is not None else None
+        except ValueError:
+            longitud = -1
+        if longitud is None:
+            error = (411, "Falta el encabezado Content-Length")
+        elif longitud < 0:
+            error = (400, f"Content-Length inválido: {encabezado[:40]!r}")
+        elif longitud > self.server.maximo_cuerpo:
+            error = (413, f"El cuerpo supera el máximo de {self.server.maximo_cuerpo} bytes")
+        else:
+            return longitud
+        # El cuerpo no se lee, así que la conexión no puede reutilizarse
+        self.close_connection = True
+        self._responder(error[0], {'error': error[1]})
+        return None
+
+    @staticmethod
+    def _finitos(resultado):
+        """Reemplaza NaN e infinitos por None para responder JSON estándar."""
+        def limpiar(objeto):
+            return {k: (None if isinstance(v, float) and not np.isfinite(v) else v) for k, v in objeto.items()}
+        return [limpiar(r) for r in resultado] if isinstance(resultado, list) else limpiar(resultado)
+
+
+class ServidorCalculos(ThreadingHTTPServer):
+    """Servidor HTTP con un agrupador de peticiones por endpoint y sus métricas."""
+
+    daemon_threads = True
+    # La cola de conexiones por defecto (5) rechaza ráfagas de clientes concurrentes
+    request_queue_size = 256
+
+    def __init__(self, direccion, espera_ms=ESPERA_LOTE_MS, maximo_lote=MAXIMO_LOTE, registrar_peticiones=False,
+                 maximo_cuerpo=MAXIMO_CUERPO):
+        super().__init__(direccion, ManejadorCalculos)
+        self.registrar_peticiones = registrar_peticiones
+        self.maximo_cuerpo = maximo_cuerpo
+        self.metricas = Metricas()
+        self.lotes = {endpoint: MicroLote(endpoint, espera_ms, maximo_lote) for endpoint in ENDPOINTS}
+
+    def estadisticas_lotes(self):
+        """Retorna por endpoint los lotes calculados y los elementos agrupados en ellos."""
+        return {endpoint: (lote.lotes, lote.elementos) for endpoint, lote in self.lotes.items()}
+
+    def server_close(self):
+        super().server_close()
+        for lote in self.lotes.values():
+            lote.cerrar()
+
+
+def iniciar_servidor(host='127.0.0.1', puerto=0, espera_ms=ESPERA_LOTE_MS, maximo_lote=MAXIMO_LOTE,
+                     maximo_cuerpo=MAXIMO_CUERPO):
+    """Inicia el servidor en un hilo y lo retorna (puerto=0 elige un puerto libre)."""
+    servidor = ServidorCalculos((host, puerto), espera_ms, maximo_lote, maximo_cuerpo=maximo_cuerpo)
+    threading.Thread(target=servidor.serve_forever, name='api-calculos', daemon=True).start()
+    return servidor
+
+
+def detener_servidor(servidor):
+    """Detiene el servidor iniciado con iniciar_servidor."""
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def main(argumentos=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="API HTTP local de los cálculos eléctricos")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8502)
+    parser.add_argument('--espera-ms', type=float, default=ESPERA_LOTE_MS,
+                        help="Ventana para agrupar peticiones individuales (0 agrupa solo las ya encoladas)")
+    parser.add_argument('--maximo-lote', type=int, default=MAXIMO_LOTE)
+    parser.add_argument('--maximo-cuerpo-mb', type=float, default=MAXIMO_CUERPO / 1024 ** 2,
+                        help="Tamaño máximo del cuerpo de una petición (MB)")
+    parser.add_argument('--registrar', action='store_true', help="Mostrar cada petición en la consola")
+    args = parser.parse_args(argumentos)
+
+    servidor = ServidorCalculos((args.host, args.puerto), args.espera_ms, args.maximo_lote, args.registrar,
+                                int(args.maximo_cuerpo_mb * 1024 ** 2))
+    print(f"API de cálculos en http://{args.host}:{servidor.server_address[1]} "
+          f"(endpoints: {', '.join(sorted(ENDPOINTS))}; GET /metricas)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Módulo de caché de gráficos
+Memoriza las figuras de graficos.py según sus entradas (redondeadas en la clave), compartidas por
+todas las sesiones del proceso, con desalojo LRU y contadores de aciertos y fallos
+"""
+
+import inspect
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from graficos import figura_desde_dict
+
+
+CAPACIDAD_POR_DEFECTO = 256
+# La clave absorbe el ruido de punto flotante pero distingue cualquier diferencia visible: las
+# etiquetas muestran a lo sumo 3 decimales, que 12 cifras conservan en valores de hasta 1e8
+CIFRAS_SIGNIFICATIVAS = 12
+
+
+def redondear_entrada(valor, cifras=CIFRAS_SIGNIFICATIVAS):
+    """Redondea números reales (también dentro de listas y tuplas) a cifras significativas."""
+    if valor is None or isinstance(valor, (bool, str)):
+        return valor
+    if hasattr(valor, 'tolist'):
+        # Escalares y arreglos de numpy a tipos de Python
+        valor = valor.tolist()
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, float):
+        return float(f'{valor:.{cifras}g}')
+    if isinstance(valor, (list, tuple)):
+        return tuple(redondear_entrada(v, cifras) for v in valor)
+    return valor
+
+
+class CacheFiguras:
+    """Caché LRU de figuras indexada por constructor y entradas redondeadas."""
+
+    def __init__(self, capacidad=CAPACIDAD_POR_DEFECTO, cifras=CIFRAS_SIGNIFICATIVAS):
+        self.capacidad = capacidad
+        self.cifras = cifras
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._bloqueo = threading.Lock()
+
+    def _entrada(self, constructor, args, kwargs):
+        """Retorna la entrada de la caché, construyendo la figura si no existe."""
+        clave = (
+            constructor.__module__, constructor.__name__,
+            tuple(redondear_entrada(a, self.cifras) for a in args),
+            tuple(sorted((k, redondear_entrada(v, self.cifras)) for k, v in kwargs.items()))
+        )
+
+        with self._bloqueo:
+            if clave in self._entradas:
+                self.aciertos += 1
+                self._entradas.move_to_end(clave)
+                return self._entradas[clave]
+            self.fallos += 1
+
+        # Construir fuera del bloqueo con las entradas originales: la clave redondeada solo
+        # agrupa entradas que se dibujan igual, y las etiquetas deben coincidir con los resultados
+        if 'rapido' in inspect.signature(constructor).parameters:
+            # El dict de la ruta rápida no se modifica: obtener() siempre lo copia
+            figura = constructor(*args, rapido=True, **kwargs)
+        else:
+            figura = constructor(*args, **kwargs).to_plotly_json()
+        entrada = {'dict': figura, 'json': None, 'figura': None}
+
+        with self._bloqueo:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+        return entrada
+
+    def obtener(self, constructor, *args, **kwargs):
+        """Retorna una figura nueva e independiente para las entradas dadas."""
+        return figura_desde_dict(self._entrada(constructor, args, kwargs)['dict'])
+
+    def obtener_compartida(self, constructor, *args, **kwargs):
+        """Retorna la figura de solo lectura compartida por todas las sesiones para las entradas dadas.
+        
+        Se construye una sola vez por entrada, de modo que guardarla en st.session_state no la
+        duplica por sesión. No se debe modificar: para cambiarla usar obtener().
+        """
+        entrada = self._entrada(constructor, args, kwargs)
+        if entrada['figura'] is None:
+            entrada['figura'] = figura_desde_dict(entrada['dict'])
+        return entrada['figura']
+    
+    def obtener_json(self, constructor, *args, **kwargs):
+        """Retorna la figura serializada a JSON, serializándola una sola vez por entrada."""
+        entrada = self._entrada(constructor, args, kwargs)
+        if entrada['json'] is None:
+            entrada['json'] = pio.to_json(entrada['dict'], validate=False)
+        return entrada['json']
+
+    def estadisticas(self):
+        """Retorna aciertos, fallos, tasa de aciertos y ocupación de la caché."""
+        with self._bloqueo:
+            total = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / total if total else 0.0,
+                'entradas': len(self._entradas),
+                'capacidad': self.capacidad
+            }
+
+    def limpiar(self):
+        """Vacía la caché y reinicia los contadores."""
+        with self._bloqueo:
+            self._entradas.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+
+# Caché compartida por todas las sesiones del proceso
+cache_figuras = CacheFiguras()
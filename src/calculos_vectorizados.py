@@ -0,0 +1,270 @@
+"""
+Módulo de cálculos eléctricos por lotes
+Versiones vectorizadas con numpy de las funciones de calculos.py, para procesar en una
+sola pasada muchas lecturas (DC, AC y trifásicas) cargadas desde un archivo
+"""
+
+import numpy as np
+import pandas as pd
+
+from calculos import calcular_dc, calcular_consumo
+
+
+# Nombres aceptados en el archivo de lecturas para cada columna (en minúsculas)
+ALIAS_LECTURAS = {
+    'voltaje': ['voltaje', 'v', 'voltaje_linea', 'vl', 'tension'],
+    'corriente': ['corriente', 'i', 'corriente_linea', 'il'],
+    'coseno_fi': ['coseno_fi', 'cos_fi', 'cos_φ', 'cosφ', 'factor_potencia', 'fp'],
+    'horas': ['horas', 'h'],
+    'conexion': ['conexion', 'conexión'],
+    'tipo': ['tipo', 'circuito'],
+    'corriente_r': ['corriente_r', 'ir'],
+    'corriente_s': ['corriente_s', 'is'],
+    'corriente_t': ['corriente_t', 'it'],
+    'fecha': ['fecha']
+}
+COLUMNAS_NUMERICAS = ['voltaje', 'corriente', 'coseno_fi', 'horas', 'corriente_r', 'corriente_s', 'corriente_t']
+
+CONEXION_ESTRELLA = "Estrella (Y)"
+CONEXION_DELTA = "Delta (Δ)"
+
+# Tipos de circuito que pueden forzarse para todas las lecturas o indicarse en la columna tipo
+TIPOS_CIRCUITO = ['dc', 'ac', 'estrella', 'delta']
+
+RAIZ_3 = np.sqrt(3)
+
+
+def _arreglo(valor):
+    """Convierte escalares, listas o Series a arreglos float64."""
+    return np.asarray(valor, dtype='float64')
+
+
+def calcular_potencias_lote(voltaje, corriente, coseno_fi):
+    """Calcula las potencias activa, reactiva y aparente de cada lectura."""
+    voltaje, corriente, coseno_fi = _arreglo(voltaje), _arreglo(corriente), _arreglo(coseno_fi)
+    potencia_aparente = voltaje * corriente
+    # sin(acos(x)) como en calculos.py: la reactiva siempre es positiva
+    return potencia_aparente * coseno_fi, potencia_aparente * np.sin(np.arccos(coseno_fi)), potencia_aparente
+
+
+def calcular_impedancias_lote(voltaje, corriente, coseno_fi):
+    """Calcula la impedancia, resistencia y reactancia de cada lectura."""
+    impedancia = _arreglo(voltaje) / _arreglo(corriente)
+    coseno_fi = _arreglo(coseno_fi)
+    return impedancia, impedancia * coseno_fi, impedancia * np.sin(np.arccos(coseno_fi))
+
+
+def calcular_sistema_trifasico_lote(vl, il, coseno_fi, delta):
+    """Calcula los parámetros de sistemas trifásicos; delta indica las lecturas en conexión delta."""
+    vl, il, coseno_fi = _arreglo(vl), _arreglo(il), _arreglo(coseno_fi)
+    delta = np.asarray(delta, dtype=bool)
+
+    vf = np.where(delta, vl, vl / RAIZ_3)
+    if_fase = np.where(delta, il / RAIZ_3, il)
+    angulo_fi = np.arccos(coseno_fi)
+    s_total = RAIZ_3 * vl * il
+    p_total = s_total * coseno_fi
+    q_total = s_total * np.sin(angulo_fi)
+    z_fase = vf / if_fase
+
+    return {
+        'voltaje_fase': vf,
+        'voltaje_linea': vl,
+        'corriente_fase': if_fase,
+        'corriente_linea': il,
+        'potencia_activa_total': p_total,
+        'potencia_reactiva_total': q_total,
+        'potencia_aparente_total': s_total,
+        'potencia_activa_fase': p_total / 3,
+        'potencia_reactiva_fase': q_total / 3,
+        'potencia_aparente_fase': s_total / 3,
+        'impedancia_fase': z_fase,
+        'resistencia_fase': z_fase * coseno_fi,
+        'reactancia_fase': z_fase * np.sin(angulo_fi),
+        'factor_potencia': coseno_fi,
+        'angulo_fi': np.degrees(angulo_fi)
+    }
+
+
+def calcular_desequilibrio_lote(ir, is_, it):
+    """Calcula la corriente promedio y el desequilibrio porcentual de cada terna de corrientes."""
+    corrientes = np.column_stack([_arreglo(ir), _arreglo(is_), _arreglo(it)])
+    promedio = corrientes.mean(axis=1)
+    max_desviacion = np.abs(corrientes - promedio[:, None]).max(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        desequilibrio = np.where(promedio > 0, max_desviacion / promedio * 100, 0.0)
+    return {'corriente_promedio': promedio, 'desequilibrio_porcentaje': desequilibrio}
+
+
+def analizar_eficiencia_lote(potencia_activa, potencia_aparente, factor_potencia):
+    """Calcula la eficiencia del factor de potencia, las pérdidas reactivas y la categoría."""
+    potencia_activa, potencia_aparente = _arreglo(potencia_activa), _arreglo(potencia_aparente)
+    eficiencia_fp = _arreglo(factor_potencia) * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        perdidas_reactivas = np.where(
+            potencia_aparente > 0, (potencia_aparente - potencia_activa) / potencia_aparente * 100, 0.0
+        )
+    categoria = np.select(
+        [eficiencia_fp >= 95, eficiencia_fp >= 90, eficiencia_fp > 80],
+        ['Excelente', 'Buena', 'Regular'],
+        default='Deficiente'
+    )
+    return {'eficiencia_fp': eficiencia_fp, 'perdidas_reactivas': perdidas_reactivas, 'categoria': categoria}
+
+
+def analizar_calidad_lote(desequilibrio_porcentaje, factor_potencia, potencia_aparente):
+    """Calcula la puntuación de calidad y el costo estimado de pérdidas de cada lectura."""
+    desequilibrio, factor_potencia = _arreglo(desequilibrio_porcentaje), _arreglo(factor_potencia)
+    puntuacion = 100 - np.select([desequilibrio > 5, desequilibrio > 2], [20, 10], default=0) \
+                     - np.select([factor_potencia < 0.85, factor_potencia < 0.9], [25, 15], default=0)
+    perdidas_kw = _arreglo(potencia_aparente) * (1 - factor_potencia) / 1000
+    return {
+        'puntuacion': np.maximum(puntuacion, 0),
+        'perdidas_kw': perdidas_kw,
+        'costo_anual': perdidas_kw * 8760 * 0.15  # $0.15/kWh promedio
+    }
+
+
+def normalizar_lecturas(lecturas):
+    """Renombra las columnas según ALIAS_LECTURAS y convierte las columnas numéricas.
+
+    Acepta decimales con coma; los valores no numéricos quedan como NaN.
+    """
+    nombres = {}
+    for columna in lecturas.columns:
+        clave = str(columna).strip().lower().replace(' ', '_')
+        for nombre, alias in ALIAS_LECTURAS.items():
+            if clave in alias and nombre not in nombres.values():
+                nombres[columna] = nombre
+    df = lecturas[list(nombres)].rename(columns=nombres)
+
+    for columna in COLUMNAS_NUMERICAS:
+        if columna not in df.columns:
+            df[columna] = np.nan
+        elif not pd.api.types.is_numeric_dtype(df[columna]):
+            df[columna] = pd.to_numeric(
+                df[columna].astype(str).str.strip().str.replace(',', '.', regex=False), errors='coerce'
+            )
+    for columna in ('conexion', 'tipo'):
+        if columna not in df.columns:
+            df[columna] = None
+    return df.reset_index(drop=True)
+
+
+def _conexiones(valores):
+    """Normaliza la conexión ('estrella', 'Y', 'delta', 'Δ', 'D'...); vacío si no es trifásica."""
+    texto = valores.fillna('').astype(str).str.strip().str.lower()
+    return np.select(
+        [texto.str.startswith(('e', 'y')), texto.str.startswith(('d', 'δ', 'triangulo', 'triángulo'))],
+        [CONEXION_ESTRELLA, CONEXION_DELTA],
+        default=np.where(texto == '', '', 'invalida')
+    )
+
+
+def _tipos(valores):
+    """Normaliza el tipo de circuito de cada fila ('DC', 'AC', 'Estrella', 'Delta'...); vacío si no se indica."""
+    texto = valores.fillna('').astype(str).str.strip().str.lower()
+    return np.select(
+        [texto.isin(['dc', 'cc', 'continua']), texto.isin(['ac', 'ca', 'alterna']),
+         texto.str.startswith(('e', 'y')), texto.str.startswith(('d', 'δ', 'triangulo', 'triángulo'))],
+        TIPOS_CIRCUITO,
+        default=np.where(texto == '', '', 'invalido')
+    )
+
+
+def procesar_lecturas(lecturas, tipo=None):
+    """Calcula en una pasada todas las lecturas de un archivo.
+
+    El tipo de circuito se toma de tipo (uno de TIPOS_CIRCUITO, para todas las filas), de la
+    columna tipo de cada fila o, si no se indica, se deduce: trifásica si indica conexión, AC
+    si indica cos φ y DC en otro caso. Retorna un DataFrame con las columnas del histórico,
+    el consumo (si hay horas) y una columna 'error' con el motivo de las filas inválidas
+    (vacía en las válidas).
+    """
+    if tipo is not None and tipo not in TIPOS_CIRCUITO:
+        raise ValueError(f"Tipo de circuito no soportado: {tipo} (use {', '.join(TIPOS_CIRCUITO)})")
+    df = normalizar_lecturas(lecturas)
+    n = len(df)
+    voltaje, corriente, coseno_fi = (df[c].to_numpy('float64') for c in ('voltaje', 'corriente', 'coseno_fi'))
+    tipos = np.full(n, tipo) if tipo is not None else _tipos(df['tipo'])
+    conexion = np.select(
+        [tipos == 'estrella', tipos == 'delta', np.isin(tipos, ['dc', 'ac'])],
+        [CONEXION_ESTRELLA, CONEXION_DELTA, ''],
+        default=_conexiones(df['conexion'])
+    )
+    trifasico = conexion != ''
+    ac = ~trifasico & np.where(np.isin(tipos, ['dc', 'ac']), tipos == 'ac', ~np.isnan(coseno_fi))
+    dc = ~trifasico & ~ac
+
+    # Corrientes por fase: si faltan se usa la corriente de línea, como en la calculadora
+    fases = {c: np.where(np.isnan(df[c].to_numpy('float64')), corriente, df[c].to_numpy('float64'))
+             for c in ('corriente_r', 'corriente_s', 'corriente_t')}
+
+    # Validaciones en el mismo orden que validar_entrada (NaN cuenta como faltante)
+    error = np.full(n, '', dtype=object)
+    reglas = [
+        (tipos == 'invalido', "Tipo de circuito desconocido (use DC, AC, Estrella o Delta)"),
+        (conexion == 'invalida', "Conexión desconocida (use Estrella o Delta)"),
+        (~(voltaje > 0), "El voltaje debe ser mayor que 0"),
+        (~(corriente > 0), "La corriente debe ser mayor que 0"),
+        (~dc & ~((coseno_fi >= -1) & (coseno_fi <= 1)), "El factor de potencia debe estar entre -1 y 1"),
+        (trifasico & ~((fases['corriente_r'] > 0) & (fases['corriente_s'] > 0) & (fases['corriente_t'] > 0)),
+         "Las corrientes de fase deben ser mayores que 0")
+    ]
+    for condicion, mensaje in reversed(reglas):
+        error[condicion] = mensaje
+    valida = error == ''
+
+    resultado = pd.DataFrame({
+        'tipo_circuito': np.where(trifasico, 'Trifásico', 'Resistivo'),
+        'tipo_corriente': np.where(trifasico, None, np.where(ac, 'AC', 'DC')),
+        'conexion': np.where(trifasico & valida, conexion, None)
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # DC: calcular_dc y calcular_consumo ya operan sobre arreglos
+        resistencia_dc, potencia_dc = calcular_dc(voltaje, corriente)
+        activa, reactiva, aparente = calcular_potencias_lote(voltaje, corriente, coseno_fi)
+        impedancia, resistencia_ac, reactancia = calcular_impedancias_lote(voltaje, corriente, coseno_fi)
+        sistema = calcular_sistema_trifasico_lote(voltaje, corriente, coseno_fi, conexion == CONEXION_DELTA)
+        desequilibrio = calcular_desequilibrio_lote(fases['corriente_r'], fases['corriente_s'], fases['corriente_t'])
+        eficiencia = analizar_eficiencia_lote(sistema['potencia_activa_total'],
+                                              sistema['potencia_aparente_total'], coseno_fi)
+        calidad = analizar_calidad_lote(desequilibrio['desequilibrio_porcentaje'], coseno_fi,
+                                        sistema['potencia_aparente_total'])
+
+    def por_tipo(mascara, valores):
+        return np.where(mascara & valida, valores, np.nan)
+
+    columnas = {
+        'voltaje': por_tipo(~trifasico, voltaje),
+        'corriente': por_tipo(~trifasico, corriente),
+        'coseno_fi': por_tipo(ac, coseno_fi),
+        'resistencia': np.where(dc, por_tipo(dc, resistencia_dc), por_tipo(ac, resistencia_ac)),
+        'potencia': por_tipo(dc, potencia_dc),
+        'potencia_activa': por_tipo(ac, activa),
+        'potencia_reactiva': por_tipo(ac, reactiva),
+        'potencia_aparente': por_tipo(ac, aparente),
+        'impedancia': por_tipo(ac, impedancia),
+        'reactancia': por_tipo(ac, reactancia),
+        'voltaje_linea': por_tipo(trifasico, voltaje),
+        'corriente_linea': por_tipo(trifasico, corriente),
+        'factor_potencia': por_tipo(trifasico, coseno_fi),
+        'potencia_activa_total': por_tipo(trifasico, sistema['potencia_activa_total']),
+        'potencia_reactiva_total': por_tipo(trifasico, sistema['potencia_reactiva_total']),
+        'potencia_aparente_total': por_tipo(trifasico, sistema['potencia_aparente_total']),
+        'corriente_r': por_tipo(trifasico, fases['corriente_r']),
+        'corriente_s': por_tipo(trifasico, fases['corriente_s']),
+        'corriente_t': por_tipo(trifasico, fases['corriente_t']),
+        'desequilibrio_porcentaje': por_tipo(trifasico, desequilibrio['desequilibrio_porcentaje']),
+        'eficiencia_fp': por_tipo(trifasico, eficiencia['eficiencia_fp']),
+        'calidad_puntuacion': por_tipo(trifasico, calidad['puntuacion']),
+        'consumo': calcular_consumo(np.where(trifasico, sistema['potencia_activa_total'],
+                                             np.where(ac, activa, potencia_dc)), df['horas'].to_numpy('float64'))
+    }
+    for nombre, valores in columnas.items():
+        resultado[nombre] = valores
+    resultado.loc[~valida, 'consumo'] = np.nan
+    if 'fecha' in df.columns:
+        resultado['fecha'] = df['fecha']
+    resultado['error'] = error
+    return resultado
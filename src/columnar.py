@@ -0,0 +1,175 @@
+"""
+Módulo de almacenamiento columnar del histórico
+Guarda las columnas del histórico como archivos binarios de ancho fijo que se abren
+con numpy.memmap, de modo que las lecturas cargan páginas bajo demanda y comparten
+la caché de páginas del sistema operativo entre sesiones
+"""
+
+import os
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from esquema import ESQUEMA_HISTORICO, FORMATO_FECHA
+
+
+DIRECTORIO_COLUMNAS = 'historico_columnas'
+ARCHIVO_META = 'meta.json'
+
+# Tipo binario de cada tipo del esquema: los textos enumerados se guardan como
+# códigos de diccionario y las fechas como segundos desde la época
+TIPOS_BINARIOS = {
+    'category': 'int32',
+    'float32': 'float32',
+    'float64': 'float64',
+    'datetime64[ns]': 'int64'
+}
+
+_bloqueo = threading.Lock()
+_mapas = {}
+
+
+def _ruta(nombre):
+    """Retorna la ruta de un archivo dentro del directorio del almacén."""
+    return os.path.join(DIRECTORIO_COLUMNAS, nombre)
+
+
+def almacen_existe():
+    """Indica si el almacén columnar ya fue creado."""
+    return os.path.exists(_ruta(ARCHIVO_META))
+
+
+def cargar_meta():
+    """Carga los metadatos del almacén: filas, columnas y diccionarios."""
+    if not almacen_existe():
+        return {'filas': 0, 'columnas': {}, 'diccionarios': {}}
+    with open(_ruta(ARCHIVO_META), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _guardar_meta(meta):
+    """Guarda los metadatos de forma atómica; publica las filas ya escritas."""
+    with open(_ruta(ARCHIVO_META) + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(_ruta(ARCHIVO_META) + '.tmp', _ruta(ARCHIVO_META))
+
+
+def _codificar(df, columna, tipo, diccionarios):
+    """Convierte una columna del DataFrame a su representación binaria."""
+    n = len(df)
+    if columna not in df.columns:
+        if tipo == 'category':
+            return np.full(n, -1, dtype='int32')
+        if tipo == 'datetime64[ns]':
+            return np.full(n, np.datetime64('NaT'), dtype='datetime64[s]').view('int64')
+        return np.full(n, np.nan, dtype=TIPOS_BINARIOS[tipo])
+
+    serie = df[columna]
+    if tipo == 'category':
+        # Extender el diccionario con los valores nuevos y codificar por posición
+        diccionario = diccionarios.setdefault(columna, [])
+        valores = serie.astype(object)
+        conocidos = set(diccionario)
+        diccionario.extend(v for v in pd.unique(valores[valores.notna()]) if v not in conocidos)
+        return pd.Categorical(valores, categories=diccionario).codes.astype('int32')
+    if tipo == 'datetime64[ns]':
+        # Fechas mal formadas (histórico antiguo) quedan como NaT, como en cargar_historico
+        fechas = pd.to_datetime(serie, format=FORMATO_FECHA, errors='coerce')
+        return fechas.to_numpy(dtype='datetime64[s]').view('int64')
+    return pd.to_numeric(serie, errors='coerce').to_numpy(dtype=TIPOS_BINARIOS[tipo])
+
+
+def _alinear(archivo, columna, tipo, filas):
+    """Deja el archivo de una columna con exactamente las filas publicadas en los metadatos.
+
+    Descarta los bytes de una escritura anterior que no llegó a publicarse y completa con
+    valores faltantes las columnas más cortas (p. ej. agregadas al esquema después).
+    """
+    tamano = np.dtype(TIPOS_BINARIOS[tipo]).itemsize
+    completas = min(archivo.seek(0, os.SEEK_END) // tamano, filas)
+    archivo.truncate(completas * tamano)
+    if completas < filas:
+        faltantes = pd.DataFrame(index=range(filas - completas))
+        archivo.write(_codificar(faltantes, columna, tipo, {}).tobytes())
+
+
+def agregar_registros(df):
+    """Agrega registros al final de cada archivo de columna y actualiza los metadatos.
+
+    _bloqueo solo ordena los hilos de este proceso: entre procesos debe llamarse con
+    datos.bloqueo_historico() tomado, como hace guardar_historico_lote.
+    """
+    if df.empty:
+        return cargar_meta()['filas']
+
+    with _bloqueo:
+        os.makedirs(DIRECTORIO_COLUMNAS, exist_ok=True)
+        meta = cargar_meta()
+        for columna, tipo in ESQUEMA_HISTORICO.items():
+            valores = _codificar(df, columna, tipo, meta['diccionarios'])
+            meta['columnas'][columna] = {'tipo': tipo, 'binario': TIPOS_BINARIOS[tipo]}
+            with open(_ruta(f'{columna}.bin'), 'ab') as f:
+                _alinear(f, columna, tipo, meta['filas'])
+                f.write(np.ascontiguousarray(valores).tobytes())
+        meta['filas'] += len(df)
+        _guardar_meta(meta)
+        return meta['filas']
+
+
+def reconstruir_almacen(df):
+    """Reconstruye el almacén columnar completo a partir del histórico."""
+    with _bloqueo:
+        # Soltar los mapas antes de eliminar: Windows no borra archivos mapeados en memoria
+        _mapas.clear()
+        if os.path.isdir(DIRECTORIO_COLUMNAS):
+            for nombre in os.listdir(DIRECTORIO_COLUMNAS):
+                os.remove(_ruta(nombre))
+    return agregar_registros(df)
+
+
+def abrir_columnas(columnas=None):
+    """Abre columnas del almacén como arreglos numpy.memmap de solo lectura.
+
+    Los mapas se reutilizan entre llamadas (y entre sesiones del mismo proceso)
+    mientras el número de filas publicado no cambie.
+    """
+    meta = cargar_meta()
+    filas = meta['filas']
+    nombres = list(meta['columnas']) if columnas is None else [c for c in columnas if c in meta['columnas']]
+
+    resultado = {}
+    with _bloqueo:
+        for columna in nombres:
+            clave = (os.path.abspath(_ruta(f'{columna}.bin')), filas)
+            if clave not in _mapas:
+                # Liberar los mapas de la misma columna con un número de filas anterior
+                for anterior in [k for k in _mapas if k[0] == clave[0]]:
+                    del _mapas[anterior]
+                binario = meta['columnas'][columna]['binario']
+                if filas == 0:
+                    _mapas[clave] = np.empty(0, dtype=binario)
+                else:
+                    _mapas[clave] = np.memmap(clave[0], dtype=binario, mode='r', shape=(filas,))
+            resultado[columna] = _mapas[clave]
+    return resultado
+
+
+def decodificar_columna(columna, valores, meta=None):
+    """Convierte una columna binaria a su forma de pandas (categorías, fechas o números)."""
+    meta = meta or cargar_meta()
+    tipo = meta['columnas'][columna]['tipo']
+    if tipo == 'category':
+        return pd.Categorical.from_codes(np.asarray(valores), categories=meta['diccionarios'].get(columna, []))
+    if tipo == 'datetime64[ns]':
+        # El mínimo de int64 corresponde a NaT en numpy
+        return pd.to_datetime(np.asarray(valores).view('datetime64[s]'))
+    return np.asarray(valores)
+
+
+def cargar_columnas(columnas=None):
+    """Construye un DataFrame con columnas del almacén ya decodificadas."""
+    meta = cargar_meta()
+    mapas = abrir_columnas(columnas)
+    return pd.DataFrame({c: decodificar_columna(c, v, meta) for c, v in mapas.items()})
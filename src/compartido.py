@@ -0,0 +1,101 @@
+"""
+Módulo de recursos compartidos entre sesiones
+Registro de objetos de solo lectura (histórico cargado, agregados, CSV de descarga)
+construidos una vez por proceso y compartidos por todas las sesiones de Streamlit,
+con invalidación explícita por etiqueta cuando cambian los datos de origen
+"""
+
+import threading
+
+
+class RegistroCompartido:
+    """Objetos de solo lectura compartidos por proceso, indexados por nombre y clave."""
+
+    def __init__(self):
+        # Con habilitado=False cada llamada construye su propio objeto (para comparar memoria)
+        self.habilitado = True
+        self.construcciones = 0
+        self.aciertos = 0
+        self._entradas = {}
+        self._etiquetas = {}
+        self._construyendo = {}
+        self._bloqueo = threading.Lock()
+
+    def obtener(self, nombre, clave, constructor, etiquetas=()):
+        """Retorna el objeto registrado para (nombre, clave), construyéndolo si no existe.
+
+        Al construir una clave nueva se descartan las demás claves del mismo nombre, que
+        corresponden a versiones anteriores de los datos. El objeto retornado es compartido:
+        no se debe modificar en el lugar.
+        """
+        if not self.habilitado:
+            return constructor()
+
+        entrada = (nombre, clave)
+        with self._bloqueo:
+            if entrada in self._entradas:
+                self.aciertos += 1
+                return self._entradas[entrada]
+            bloqueo_entrada = self._construyendo.setdefault(entrada, threading.Lock())
+
+        # Una sola sesión construye cada entrada; las que llegan a la vez esperan su resultado
+        # sin bloquear la lectura de las demás entradas
+        with bloqueo_entrada:
+            with self._bloqueo:
+                if entrada in self._entradas:
+                    self.aciertos += 1
+                    return self._entradas[entrada]
+            try:
+                valor = constructor()
+            except Exception:
+                with self._bloqueo:
+                    self._construyendo.pop(entrada, None)
+                raise
+            with self._bloqueo:
+                self._construyendo.pop(entrada, None)
+                self.construcciones += 1
+                for anterior in [e for e in self._entradas if e[0] == nombre and e != entrada]:
+                    self._descartar(anterior)
+                self._entradas[entrada] = valor
+                for etiqueta in etiquetas:
+                    self._etiquetas.setdefault(etiqueta, set()).add(entrada)
+        return valor
+
+    def _descartar(self, entrada):
+        """Quita una entrada y sus referencias en las etiquetas (con el bloqueo tomado)."""
+        self._entradas.pop(entrada, None)
+        for entradas in self._etiquetas.values():
+            entradas.discard(entrada)
+
+    def invalidar(self, etiqueta):
+        """Descarta todos los objetos registrados con la etiqueta; retorna cuántos se descartaron."""
+        with self._bloqueo:
+            entradas = self._etiquetas.pop(etiqueta, set())
+            for entrada in entradas:
+                self._descartar(entrada)
+            return len(entradas)
+
+    def estadisticas(self):
+        """Retorna las entradas vivas, construcciones y aciertos del registro."""
+        with self._bloqueo:
+            return {
+                'entradas': len(self._entradas),
+                'construcciones': self.construcciones,
+                'aciertos': self.aciertos
+            }
+
+    def limpiar(self):
+        """Descarta todas las entradas y reinicia los contadores."""
+        with self._bloqueo:
+            self._entradas.clear()
+            self._etiquetas.clear()
+            self._construyendo.clear()
+            self.construcciones = 0
+            self.aciertos = 0
+
+
+# Registro compartido por todas las sesiones del proceso
+registro = RegistroCompartido()
+
+# Etiqueta de los objetos derivados del histórico; guardar_historico la invalida
+ETIQUETA_HISTORICO = 'historico'
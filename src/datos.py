@@ -3,46 +3,318 @@ Módulo de gestión de datos
 Contiene funciones para guardar, cargar y manejar el histórico de cálculos
 """
 
+import numpy as np
 import pandas as pd
 import datetime
 import os
+import json
 import streamlit as st
-from fpdf import FPDF
 import tempfile
+import threading
+from contextlib import contextmanager
+
+# pyarrow es opcional: si no está instalado se usa el lector CSV de pandas
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
+from agregados import (
+    RESOLUCIONES, METRICAS_AGREGADAS, actualizar_agregados, cargar_agregados,
+    reconstruir_agregados, archivo_agregado, agregados_existen
+)
+from graficos import (
+    crear_grafico_tendencias, crear_grafico_serie_historica, crear_mapa_densidad_potencias,
+    crear_flota_triangulos, crear_flota_desequilibrio, figura_desde_dict
+)
+from esquema import ESQUEMA_HISTORICO, FORMATO_FECHA
+from columnar import almacen_existe, agregar_registros, reconstruir_almacen, abrir_columnas
+from decimacion import decimar_serie, densidad_2d, PUNTOS_POR_DEFECTO, METODOS_DECIMACION
+from serializacion import reporte_compactacion
+from compartido import registro, ETIQUETA_HISTORICO
+
+
+ARCHIVO_HISTORICO = 'historico_calculos.csv'
+
+# Equivalencia entre los tipos del esquema y los tipos de Arrow
+TIPOS_ARROW = {
+    'category': lambda: pa.dictionary(pa.int32(), pa.string()),
+    'float32': lambda: pa.float32(),
+    'float64': lambda: pa.float64(),
+    'datetime64[ns]': lambda: pa.timestamp('s')
+}
+
+# Orden canónico de columnas del archivo activo; permite agregar filas sin reescribirlo
+COLUMNAS_HISTORICO = list(ESQUEMA_HISTORICO)
+
+# Columnas del histórico que se pueden graficar como series temporales
+SERIES_HISTORICAS = [
+    'potencia', 'potencia_activa', 'potencia_activa_total',
+    'factor_potencia', 'coseno_fi', 'desequilibrio_porcentaje'
+]
+
+# Pares de columnas (P, Q) para el mapa de densidad de puntos de operación
+PARES_POTENCIA = {
+    'Monofásico (AC)': ('potencia_activa', 'potencia_reactiva'),
+    'Trifásico (total)': ('potencia_activa_total', 'potencia_reactiva_total')
+}
+
+# Segmentos rotados y comprimidos del histórico (ver mantenimiento.py)
+DIRECTORIO_SEGMENTOS = 'historico_segmentos'
+ARCHIVO_MANIFIESTO = 'manifiesto.json'
+
+# Archivo de bloqueo compartido por las escrituras del archivo activo y su rotación
+SUFIJO_BLOQUEO = '.lock'
+
+
+def cargar_manifiesto():
+    """Carga la lista de segmentos rotados del histórico, del más antiguo al más reciente."""
+    ruta = os.path.join(DIRECTORIO_SEGMENTOS, ARCHIVO_MANIFIESTO)
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_manifiesto(segmentos):
+    """Guarda la lista de segmentos rotados reemplazando el manifiesto de forma atómica."""
+    os.makedirs(DIRECTORIO_SEGMENTOS, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_SEGMENTOS, ARCHIVO_MANIFIESTO)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(segmentos, f, indent=2)
+    os.replace(ruta + '.tmp', ruta)
+
+
+# Profundidad del bloqueo en el hilo actual: permite anidarlo (p. ej. reconstruir dentro de un guardado)
+_bloqueo_local = threading.local()
+
+
+@contextmanager
+def bloqueo_historico():
+    """Bloquea el histórico entre procesos (y entre hilos) mientras se escribe o se rota.
+
+    Cubre el archivo activo, el manifiesto de segmentos, los agregados y el almacén columnar.
+    """
+    if getattr(_bloqueo_local, 'profundidad', 0):
+        _bloqueo_local.profundidad += 1
+        try:
+            yield
+        finally:
+            _bloqueo_local.profundidad -= 1
+        return
+
+    with open(ARCHIVO_HISTORICO + SUFIJO_BLOQUEO, 'a+b') as archivo:
+        if os.name == 'nt':
+            import msvcrt
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+        _bloqueo_local.profundidad = 1
+        try:
+            yield
+        finally:
+            _bloqueo_local.profundidad = 0
+            if os.name == 'nt':
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+def archivos_historico():
+    """Retorna los archivos que forman el histórico: segmentos rotados y archivo activo."""
+    # Con el bloqueo, una rotación en curso no deja sus filas fuera de la lista ni duplicadas
+    with bloqueo_historico():
+        archivos = [os.path.join(DIRECTORIO_SEGMENTOS, s['archivo']) for s in cargar_manifiesto()]
+        if os.path.exists(ARCHIVO_HISTORICO):
+            archivos.append(ARCHIVO_HISTORICO)
+    return archivos
+
+
+def contar_filas_csv(archivo):
+    """Cuenta las filas de datos de un CSV sin cargarlo (descontando el encabezado)."""
+    with open(archivo, 'rb') as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def contar_registros():
+    """Cuenta los registros del histórico usando el manifiesto para los segmentos rotados."""
+    with bloqueo_historico():
+        total = sum(s['filas'] for s in cargar_manifiesto())
+        if os.path.exists(ARCHIVO_HISTORICO):
+            total += contar_filas_csv(ARCHIVO_HISTORICO)
+    return total
 
 
 def guardar_historico(datos):
     """Guarda los resultados en un archivo CSV."""
-    archivo_historico = 'historico_calculos.csv'
-    
     # Agregar timestamp
-    datos['fecha'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    datos['fecha'] = datetime.datetime.now().strftime(FORMATO_FECHA)
+    return guardar_historico_lote(pd.DataFrame([datos]))
+
+
+def guardar_historico_lote(nuevo_df):
+    """Agrega varios registros al histórico con una sola escritura y retorna el total de registros.
     
-    # Crear DataFrame con los nuevos datos
-    nuevo_df = pd.DataFrame([datos])
+    Los registros sin fecha reciben la fecha actual; las columnas fuera del esquema se descartan
+    salvo que el archivo activo ya las tenga.
+    """
+    archivo_historico = ARCHIVO_HISTORICO
+    if nuevo_df.empty:
+        return contar_registros()
     
-    # Si el archivo existe, cargarlo y agregar los nuevos datos
-    if os.path.exists(archivo_historico):
-        df_existente = pd.read_csv(archivo_historico)
-        df_final = pd.concat([df_existente, nuevo_df], ignore_index=True)
+    nuevo_df = nuevo_df.reset_index(drop=True)
+    ahora = datetime.datetime.now().strftime(FORMATO_FECHA)
+    if 'fecha' in nuevo_df.columns:
+        fechas = pd.to_datetime(nuevo_df['fecha'], errors='coerce')
+        nuevo_df['fecha'] = fechas.dt.strftime(FORMATO_FECHA).fillna(ahora)
     else:
-        df_final = nuevo_df
+        nuevo_df['fecha'] = ahora
     
-    # Guardar el DataFrame actualizado
-    df_final.to_csv(archivo_historico, index=False)
+    # Agregar las filas al final del archivo activo si sus columnas ya existen en él;
+    # si no, reescribir el archivo activo con el orden canónico de columnas. El bloqueo
+    # impide que la rotación mueva el archivo entre la lectura del encabezado y la escritura,
+    # y que otro proceso actualice los agregados a la vez (leer, combinar y reescribir)
+    with bloqueo_historico():
+        if os.path.exists(archivo_historico):
+            columnas = list(pd.read_csv(archivo_historico, nrows=0).columns)
+            if set(nuevo_df.columns) <= set(columnas):
+                nuevo_df.reindex(columns=columnas).to_csv(
+                    archivo_historico, mode='a', header=False, index=False
+                )
+            else:
+                df_final = pd.concat([pd.read_csv(archivo_historico), nuevo_df], ignore_index=True)
+                df_final.reindex(columns=ordenar_columnas(df_final.columns)).to_csv(
+                    archivo_historico, index=False
+                )
+        else:
+            nuevo_df.reindex(columns=ordenar_columnas(nuevo_df.columns)).to_csv(
+                archivo_historico, index=False
+            )
+        
+        # Actualizar los agregados con los nuevos registros; si aún no existen (histórico
+        # previo a esta versión), crearlos a partir de todo el histórico
+        if agregados_existen():
+            actualizar_agregados(nuevo_df)
+        else:
+            reconstruir_agregados(cargar_historico())
+        
+        # Igual con el almacén columnar: sus archivos y meta.json deben avanzar juntos
+        if almacen_existe():
+            agregar_registros(nuevo_df)
+        else:
+            reconstruir_almacen(cargar_historico())
     
-    return len(df_final)
+    # Los objetos compartidos derivados del histórico dejan de ser válidos
+    registro.invalidar(ETIQUETA_HISTORICO)
+    return contar_registros()
+
+
+def asegurar_almacen():
+    """Crea el almacén columnar a partir del histórico si aún no existe (histórico previo a esta versión)."""
+    if archivos_historico() and not almacen_existe():
+        with bloqueo_historico():
+            if not almacen_existe():
+                reconstruir_almacen(cargar_historico())
+
+
+def leer_lecturas(archivo):
+    """Lee un archivo de lecturas subido (CSV con ',' o ';', o Excel) como DataFrame."""
+    nombre = getattr(archivo, 'name', str(archivo)).lower()
+    if nombre.endswith(('.xlsx', '.xls')):
+        # read_excel requiere openpyxl (incluido en requirements.txt)
+        return pd.read_excel(archivo)
+    # Detectar el separador: las planillas en español suelen exportar con ';'
+    return pd.read_csv(archivo, sep=None, engine='python')
 
 
-def cargar_historico():
-    """Carga el histórico de cálculos desde el archivo CSV."""
-    archivo_historico = 'historico_calculos.csv'
+def ordenar_columnas(columnas):
+    """Retorna las columnas canónicas seguidas de las columnas adicionales presentes."""
+    return COLUMNAS_HISTORICO + [c for c in columnas if c not in ESQUEMA_HISTORICO]
+
+
+def _columnas_disponibles(archivo, columnas=None):
+    """Retorna las columnas del archivo, restringidas a las pedidas si se indican."""
+    # Leer solo el encabezado para conocer las columnas disponibles
+    disponibles = list(pd.read_csv(archivo, nrows=0).columns)
+    if columnas is not None:
+        disponibles = [c for c in disponibles if c in columnas]
+    return disponibles
+
+
+def _leer_csv_arrow(archivo, columnas=None):
+    """Lee un archivo del histórico (CSV o CSV comprimido) como tabla de Arrow."""
+    disponibles = _columnas_disponibles(archivo, columnas)
+    opciones = pa_csv.ConvertOptions(
+        column_types={c: TIPOS_ARROW[ESQUEMA_HISTORICO[c]]() for c in disponibles
+                      if c in ESQUEMA_HISTORICO},
+        include_columns=disponibles,
+        timestamp_parsers=[FORMATO_FECHA]
+    )
+    return pa_csv.read_csv(
+        archivo,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        convert_options=opciones
+    )
+
+
+def cargar_historico_arrow(columnas=None):
+    """Carga el histórico como tabla de Arrow con el lector CSV multihilo de pyarrow."""
+    archivos = archivos_historico()
+    if not PYARROW_DISPONIBLE or not archivos:
+        return None
     
-    if os.path.exists(archivo_historico):
+    tablas = [_leer_csv_arrow(archivo, columnas) for archivo in archivos]
+    return pa.concat_tables(tablas, promote_options='default')
+
+
+def _leer_csv_pandas(archivo, columnas=None):
+    """Lee un archivo del histórico (CSV o CSV comprimido) con el lector de pandas."""
+    disponibles = _columnas_disponibles(archivo, columnas)
+    
+    # Tipos explícitos y fecha convertida durante la lectura
+    return pd.read_csv(
+        archivo,
+        usecols=disponibles,
+        dtype={c: ESQUEMA_HISTORICO[c] for c in disponibles
+               if c in ESQUEMA_HISTORICO and c != 'fecha'},
+        parse_dates=['fecha'] if 'fecha' in disponibles else False,
+        date_format=FORMATO_FECHA
+    )
+
+
+def _tipo_pandas_arrow(tipo):
+    """Mantiene las columnas respaldadas por Arrow salvo los diccionarios, que pasan a categorías."""
+    if pa.types.is_dictionary(tipo):
+        return None
+    return pd.ArrowDtype(tipo)
+
+
+def cargar_historico(columnas=None, motor='pandas'):
+    """Carga el histórico de cálculos desde los segmentos y el archivo activo usando el esquema.
+    
+    Con motor='pyarrow' los archivos se leen con pyarrow y las columnas quedan respaldadas
+    por Arrow; si pyarrow no está instalado se usa el lector de pandas.
+    """
+    archivos = archivos_historico()
+    
+    if archivos:
         try:
-            df = pd.read_csv(archivo_historico)
-            # Convertir la columna de fecha
-            df['fecha'] = pd.to_datetime(df['fecha'])
+            if motor == 'pyarrow' and PYARROW_DISPONIBLE:
+                return cargar_historico_arrow(columnas).to_pandas(types_mapper=_tipo_pandas_arrow)
+            
+            partes = [_leer_csv_pandas(archivo, columnas) for archivo in archivos]
+            if len(partes) == 1:
+                return partes[0]
+            # Conservar los tipos categóricos aunque cada segmento tenga sus propias categorías
+            df = pd.concat(partes, ignore_index=True)
+            for columna in df.columns:
+                if ESQUEMA_HISTORICO.get(columna) == 'category':
+                    df[columna] = df[columna].astype('category')
             return df
         except Exception as e:
             st.error(f"Error al cargar el histórico: {e}")
@@ -51,9 +323,40 @@ def cargar_historico():
         return pd.DataFrame()
 
 
+def version_historico():
+    """Identifica el contenido del histórico por la ruta, tamaño y modificación de sus archivos."""
+    version = []
+    for archivo in archivos_historico():
+        estado = os.stat(archivo)
+        version.append((os.path.abspath(archivo), estado.st_size, estado.st_mtime_ns))
+    return tuple(version)
+
+
+def cargar_historico_vigente(motor='pyarrow'):
+    """Carga el histórico completo, compartido por las sesiones mientras sus archivos no cambien.
+    
+    El DataFrame retornado es compartido: no se debe modificar en el lugar.
+    """
+    return registro.obtener(
+        'historico', (motor, version_historico()), lambda: cargar_historico(motor=motor),
+        etiquetas=[ETIQUETA_HISTORICO]
+    )
+
+
+def agregados_vigentes(resolucion, metrica):
+    """Retorna los agregados de una métrica, leyendo una vez por proceso la tabla de la resolución."""
+    archivo = archivo_agregado(resolucion)
+    version = os.stat(archivo).st_mtime_ns if os.path.exists(archivo) else None
+    df = registro.obtener(
+        f'agregados_{resolucion}', version, lambda: cargar_agregados(resolucion),
+        etiquetas=[ETIQUETA_HISTORICO]
+    )
+    return df[df['metrica'] == metrica].reset_index(drop=True)
+
+
 def mostrar_historico():
     """Muestra el histórico de cálculos en la interfaz."""
-    df = cargar_historico()
+    df = cargar_historico_vigente()
     if df is not None and not df.empty:
         st.subheader("Histórico de Cálculos")
         
@@ -62,12 +365,12 @@ def mostrar_historico():
         with col1:
             tipo_circuito_filtro = st.multiselect(
                 "Filtrar por tipo de circuito",
-                options=df['tipo_circuito'].unique()
+                options=df['tipo_circuito'].dropna().unique()
             )
         with col2:
             tipo_corriente_filtro = st.multiselect(
                 "Filtrar por tipo de corriente",
-                options=df['tipo_corriente'].unique() if 'tipo_corriente' in df.columns else []
+                options=df['tipo_corriente'].dropna().unique() if 'tipo_corriente' in df.columns else []
             )
         
         # Aplicar filtros
@@ -76,14 +379,23 @@ def mostrar_historico():
         if tipo_corriente_filtro and 'tipo_corriente' in df.columns:
             df = df[df['tipo_corriente'].isin(tipo_corriente_filtro)]
         
-        # Mostrar el dataframe con estilos
+        # Mostrar el dataframe; el formato se aplica en el navegador para que las
+        # columnas respaldadas por Arrow se envíen sin pasar por un Styler
         st.dataframe(
-            df.style.format({col: '{:.2f}' for col in df.select_dtypes('float64').columns}),
+            df,
+            column_config={
+                col: st.column_config.NumberColumn(format='%.2f')
+                for col in df.columns if ESQUEMA_HISTORICO.get(col, '').startswith('float')
+            },
             use_container_width=True
         )
         
-        # Opción para descargar
-        csv = df.to_csv(index=False)
+        # Opción para descargar; sin filtros el CSV se genera una vez y se comparte
+        if tipo_circuito_filtro or tipo_corriente_filtro:
+            csv = df.to_csv(index=False)
+        else:
+            csv = registro.obtener('historico_csv', version_historico(), lambda: df.to_csv(index=False),
+                                   etiquetas=[ETIQUETA_HISTORICO])
         st.download_button(
             "Descargar histórico",
             csv,
@@ -108,8 +420,191 @@ def mostrar_historico():
         st.info("No hay datos en el histórico aún.")
 
 
+def mostrar_tendencias():
+    """Muestra la evolución de las métricas del histórico a partir de los agregados."""
+    st.subheader("Tendencias del Histórico")
+    
+    # Reconstruir los agregados si aún no existen (histórico previo a esta versión)
+    if archivos_historico() and not agregados_existen():
+        with bloqueo_historico():
+            if not agregados_existen():
+                reconstruir_agregados(cargar_historico())
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        resolucion = st.selectbox(
+            "Resolución",
+            options=list(RESOLUCIONES),
+            index=1,
+            format_func=lambda r: {'hora': 'Por hora', 'dia': 'Por día', 'mes': 'Por mes'}[r]
+        )
+    with col2:
+        metrica = st.selectbox("Métrica", options=METRICAS_AGREGADAS)
+    with col3:
+        estadistico = st.selectbox("Estadístico", options=['media', 'suma', 'minimo', 'maximo', 'conteo'])
+    
+    df = agregados_vigentes(resolucion, metrica)
+    if df.empty:
+        st.info("No hay datos agregados para esta métrica aún.")
+        return
+    
+    st.plotly_chart(crear_grafico_tendencias(df, metrica, estadistico), use_container_width=True)
+
+
+def mostrar_grafico_compacto(figura):
+    """Muestra una figura de la ruta rápida con su JSON compactado e informa los bytes ahorrados."""
+    # Streamlit vuelve a validar la figura, así que se usan listas redondeadas y no binario
+    compacta, reporte = reporte_compactacion(figura, binario=False)
+    st.plotly_chart(figura_desde_dict(compacta), use_container_width=True)
+    st.caption(
+        f"Datos del gráfico: {reporte['bytes_antes'] / 1024:,.1f} kB → "
+        f"{reporte['bytes_despues'] / 1024:,.1f} kB "
+        f"({reporte['reduccion_porcentaje']:.0f}% menos)"
+    )
+
+
+def mostrar_series_historicas():
+    """Muestra las series temporales del histórico con trazas WebGL decimadas en el servidor."""
+    st.subheader("Series Temporales del Histórico")
+    
+    asegurar_almacen()
+    
+    columnas = abrir_columnas(['fecha'] + SERIES_HISTORICAS)
+    segundos = columnas.get('fecha')
+    if segundos is None or len(segundos) == 0:
+        st.info("No hay datos en el histórico aún.")
+        return
+    validas = segundos[segundos != np.iinfo('int64').min]
+    if len(validas) == 0:
+        st.info("Los registros del histórico no tienen fechas válidas.")
+        return
+    
+    disponibles = [c for c in SERIES_HISTORICAS if c in columnas and not np.isnan(columnas[c]).all()]
+    if not disponibles:
+        st.info("El histórico no tiene series de potencia, factor de potencia o desequilibrio.")
+        return
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        metricas = st.multiselect(
+            "Series",
+            options=disponibles,
+            default=[c for c in ['potencia', 'factor_potencia', 'desequilibrio_porcentaje']
+                     if c in disponibles] or disponibles[:1]
+        )
+    with col2:
+        metodo = st.selectbox(
+            "Decimación",
+            options=METODOS_DECIMACION,
+            format_func=lambda m: {'minmax': 'Mínimo/máximo', 'lttb': 'LTTB'}[m]
+        )
+    with col3:
+        puntos = st.select_slider(
+            "Puntos por serie",
+            options=[500, 1000, PUNTOS_POR_DEFECTO, 4000, 8000],
+            value=PUNTOS_POR_DEFECTO
+        )
+    
+    # Rango de fechas: al acotarlo se vuelve a decimar solo el tramo elegido
+    inicio = pd.Timestamp(int(validas.min()), unit='s').to_pydatetime()
+    fin = pd.Timestamp(int(validas.max()), unit='s').to_pydatetime()
+    if inicio < fin:
+        inicio, fin = st.slider(
+            "Rango de fechas",
+            min_value=inicio,
+            max_value=fin,
+            value=(inicio, fin),
+            format="YYYY-MM-DD HH:mm"
+        )
+    en_rango = (segundos >= int(pd.Timestamp(inicio).timestamp())) & \
+               (segundos <= int(pd.Timestamp(fin).timestamp()))
+    
+    for metrica in metricas:
+        fechas, valores, total = decimar_serie(
+            segundos[en_rango], columnas[metrica][en_rango], puntos, metodo
+        )
+        if total == 0:
+            st.info(f"No hay valores de {metrica} en el rango seleccionado.")
+            continue
+        mostrar_grafico_compacto(crear_grafico_serie_historica(
+            fechas.astype('datetime64[s]'), valores, metrica, total, rapido=True
+        ))
+
+
+def mostrar_densidad_potencias():
+    """Muestra la densidad de puntos de operación P-Q del histórico agrupada en el servidor."""
+    st.subheader("Puntos de Operación (P vs Q)")
+    
+    asegurar_almacen()
+    
+    columnas = abrir_columnas([c for par in PARES_POTENCIA.values() for c in par])
+    disponibles = [
+        nombre for nombre, (p, q) in PARES_POTENCIA.items()
+        if p in columnas and q in columnas and not np.isnan(columnas[p]).all()
+    ]
+    if not disponibles:
+        st.info("El histórico no tiene registros con potencia activa y reactiva.")
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        par = st.selectbox("Sistema", options=disponibles)
+    with col2:
+        cubetas = st.select_slider("Cubetas por eje", options=[50, 100, 150, 200, 300], value=150)
+    
+    p, q = PARES_POTENCIA[par]
+    bordes_p, bordes_q, conteos = densidad_2d(columnas[p], columnas[q], cubetas)
+    mostrar_grafico_compacto(crear_mapa_densidad_potencias(bordes_p, bordes_q, conteos, rapido=True))
+    st.caption(f"{int(conteos.sum()):,} registros agrupados en una rejilla de {cubetas}×{cubetas} celdas")
+
+
+def mostrar_vista_flota():
+    """Muestra los últimos N cálculos del histórico como subgráficos de una sola figura."""
+    st.subheader("Vista de Flota")
+    
+    asegurar_almacen()
+    
+    vistas = {
+        'Triángulos de potencias (AC)': ['potencia_activa', 'potencia_reactiva'],
+        'Corrientes por fase (trifásico)': ['corriente_r', 'corriente_s', 'corriente_t']
+    }
+    columnas = abrir_columnas(['fecha'] + [c for cols in vistas.values() for c in cols])
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        vista = st.selectbox("Vista", options=list(vistas))
+    with col2:
+        cantidad = st.select_slider("Circuitos", options=[12, 24, 36, 48, 60], value=24)
+    with col3:
+        por_fila = st.select_slider("Por fila", options=[3, 4, 5, 6], value=4)
+    
+    nombres_columnas = vistas[vista]
+    if 'fecha' not in columnas or any(c not in columnas for c in nombres_columnas):
+        st.info("No hay registros para esta vista aún.")
+        return
+    
+    # Últimos registros con todas las columnas de la vista
+    valores = np.column_stack([columnas[c] for c in nombres_columnas])
+    indices = np.flatnonzero(~np.isnan(valores).any(axis=1))[-cantidad:]
+    if len(indices) == 0:
+        st.info("No hay registros para esta vista aún.")
+        return
+    
+    nombres = pd.to_datetime(np.asarray(columnas['fecha'][indices]).view('datetime64[s]')) \
+        .strftime('%d/%m %H:%M').tolist()
+    if nombres_columnas[0] == 'potencia_activa':
+        fig = crear_flota_triangulos(valores[indices, 0], valores[indices, 1], nombres, por_fila,
+                                     rapido=True)
+    else:
+        fig = crear_flota_desequilibrio(valores[indices], nombres, por_fila, rapido=True)
+    mostrar_grafico_compacto(fig)
+
+
 def crear_pdf_reporte(datos, graficos=None):
     """Crea un informe PDF con los resultados del cálculo."""
+    # fpdf tarda en importarse (carga sus fuentes); solo se necesita al crear el informe
+    from fpdf import FPDF
+    
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font('Arial', 'B', 16)
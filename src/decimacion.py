@@ -0,0 +1,112 @@
+"""
+Módulo de decimación de series temporales
+Reduce series largas del histórico a un número de puntos acorde al ancho del gráfico,
+conservando su forma visual (mínimos y máximos, o LTTB), y nubes de puntos a
+rejillas de densidad cuyo tamaño no depende del número de registros
+"""
+
+import numpy as np
+
+
+# Puntos por defecto: unos dos por píxel en un gráfico de ~1000 px de ancho
+PUNTOS_POR_DEFECTO = 2000
+METODOS_DECIMACION = ['minmax', 'lttb']
+
+
+def _cubetas_por_tiempo(x, cubetas):
+    """Retorna los bordes (índices) de intervalos de igual duración sobre x ordenado."""
+    limites = np.linspace(x[0], x[-1], cubetas + 1)
+    bordes = np.searchsorted(x, limites, side='left')
+    bordes[-1] = len(x)
+    return bordes
+
+
+def decimar_min_max(x, y, puntos=PUNTOS_POR_DEFECTO):
+    """Conserva el mínimo y el máximo de cada intervalo de tiempo, en orden de aparición.
+
+    Retorna los índices de los puntos conservados.
+    """
+    n = len(y)
+    if n <= puntos:
+        return np.arange(n)
+
+    bordes = _cubetas_por_tiempo(x, max(puntos // 2, 1))
+    indices = [0, n - 1]
+    for inicio, fin in zip(bordes[:-1], bordes[1:]):
+        if fin > inicio:
+            tramo = y[inicio:fin]
+            indices.append(inicio + int(np.argmin(tramo)))
+            indices.append(inicio + int(np.argmax(tramo)))
+    return np.unique(indices)
+
+
+def decimar_lttb(x, y, puntos=PUNTOS_POR_DEFECTO):
+    """Largest-Triangle-Three-Buckets: elige en cada intervalo el punto de mayor área.
+
+    Retorna los índices de los puntos conservados.
+    """
+    n = len(y)
+    if n <= puntos or puntos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    bordes = np.linspace(1, n - 1, puntos - 1).astype(np.int64)
+
+    indices = np.empty(puntos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    anterior = 0
+    for i in range(puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        # Promedio del intervalo siguiente (o el último punto) como tercer vértice
+        siguiente_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        x_siguiente = x[fin:siguiente_fin].mean()
+        y_siguiente = y[fin:siguiente_fin].mean()
+
+        areas = np.abs(
+            (x[anterior] - x_siguiente) * (y[inicio:fin] - y[anterior])
+            - (x[anterior] - x[inicio:fin]) * (y_siguiente - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return indices
+
+
+def decimar_serie(x, y, puntos=PUNTOS_POR_DEFECTO, metodo='minmax'):
+    """Descarta valores faltantes, ordena por x y decima la serie con el método indicado.
+
+    Retorna los arreglos x e y decimados y el número de puntos válidos de la serie.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    validos = ~np.isnan(y)
+    if not validos.all():
+        x, y = x[validos], y[validos]
+    if len(x) > 1 and np.any(x[1:] < x[:-1]):
+        orden = np.argsort(x, kind='stable')
+        x, y = x[orden], y[orden]
+
+    if metodo not in METODOS_DECIMACION:
+        raise ValueError(f"Método de decimación desconocido: {metodo}")
+    decimar = decimar_lttb if metodo == 'lttb' else decimar_min_max
+    indices = decimar(x, y, puntos)
+    return x[indices], y[indices], len(x)
+
+
+def densidad_2d(x, y, cubetas=150, rango=None):
+    """Cuenta los puntos (x, y) en una rejilla de cubetas x cubetas, descartando faltantes.
+
+    Retorna los bordes de x, los bordes de y y la matriz de conteos indexada [y, x],
+    la orientación que espera un go.Heatmap.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    validos = np.isfinite(x) & np.isfinite(y)
+    if not validos.all():
+        x, y = x[validos], y[validos]
+    if rango is None and len(x):
+        rango = [[x.min(), x.max()], [y.min(), y.max()]]
+        # Ampliar rangos degenerados para que las cubetas tengan ancho
+        rango = [[a, b] if b > a else [a - 0.5, a + 0.5] for a, b in rango]
+    conteos, bordes_x, bordes_y = np.histogram2d(x, y, bins=cubetas, range=rango)
+    return bordes_x, bordes_y, conteos.T.astype(np.int64)
@@ -0,0 +1,39 @@
+"""
+Módulo de esquema del histórico
+Define las columnas del histórico, sus tipos y el formato de fecha compartidos por
+los módulos de datos, agregados y almacenamiento columnar
+"""
+
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+# Tipos de las columnas del histórico: categorías para los textos enumerados,
+# float32 para mediciones e índices y float64 para magnitudes derivadas
+ESQUEMA_HISTORICO = {
+    'tipo_circuito': 'category',
+    'tipo_corriente': 'category',
+    'conexion': 'category',
+    'voltaje': 'float32',
+    'corriente': 'float32',
+    'coseno_fi': 'float32',
+    'resistencia': 'float64',
+    'potencia': 'float64',
+    'potencia_activa': 'float64',
+    'potencia_reactiva': 'float64',
+    'potencia_aparente': 'float64',
+    'impedancia': 'float64',
+    'reactancia': 'float64',
+    'voltaje_linea': 'float32',
+    'corriente_linea': 'float32',
+    'factor_potencia': 'float32',
+    'potencia_activa_total': 'float64',
+    'potencia_reactiva_total': 'float64',
+    'potencia_aparente_total': 'float64',
+    'corriente_r': 'float32',
+    'corriente_s': 'float32',
+    'corriente_t': 'float32',
+    'desequilibrio_porcentaje': 'float32',
+    'eficiencia_fp': 'float32',
+    'calidad_puntuacion': 'float32',
+    'fecha': 'datetime64[ns]'
+}
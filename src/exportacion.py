@@ -0,0 +1,228 @@
+"""
+Módulo de exportación de gráficos a imágenes
+Exporta lotes de figuras a PNG/SVG/JPEG/WebP/PDF manteniendo abierto el proceso de
+kaleido entre figuras, opcionalmente con varios procesos renderizadores, y escribe
+los resultados en un directorio o en un archivo zip
+
+Uso desde la línea de comandos:
+    python src/exportacion.py informes.zip                      # gráficos del histórico
+    python src/exportacion.py graficos/ --formato svg --procesos 4
+"""
+
+import os
+import time
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import plotly
+
+# kaleido es opcional: solo se necesita para exportar imágenes estáticas
+try:
+    from kaleido.scopes.plotly import PlotlyScope
+    KALEIDO_DISPONIBLE = True
+except ImportError:
+    KALEIDO_DISPONIBLE = False
+
+from graficos import (
+    crear_triangulo_potencias, crear_grafico_circuito_dc, crear_grafico_desequilibrio,
+    FASES_TRIFASICAS
+)
+
+
+FORMATOS_IMAGEN = ['png', 'svg', 'jpeg', 'webp', 'pdf']
+TAMANO_LOTE = 8
+
+# Formatos de texto que conviene comprimir dentro del zip
+FORMATOS_COMPRIMIBLES = {'svg', 'pdf'}
+
+# Renderizador de cada proceso del pool (se crea en el inicializador)
+_renderizador_proceso = None
+
+
+class Renderizador:
+    """Proceso de kaleido persistente que convierte figuras en imágenes."""
+
+    def __init__(self, formato='png', ancho=None, alto=None, escala=1):
+        if not KALEIDO_DISPONIBLE:
+            raise ImportError("Se requiere kaleido para exportar imágenes: pip install kaleido")
+        if formato not in FORMATOS_IMAGEN:
+            raise ValueError(f"Formato no soportado: {formato}")
+        self.formato = formato
+        self.ancho = ancho
+        self.alto = alto
+        self.escala = escala
+        # Usar el plotly.js incluido con plotly y sin MathJax, para no depender de la red
+        self._scope = PlotlyScope(
+            plotlyjs=os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js'),
+            mathjax=False
+        )
+
+    def renderizar(self, figura):
+        """Convierte una figura (go.Figure o dict) en los bytes de la imagen."""
+        if hasattr(figura, 'to_plotly_json'):
+            figura = figura.to_plotly_json()
+        return self._scope.transform(
+            figura, format=self.formato, width=self.ancho, height=self.alto, scale=self.escala
+        )
+
+    def cerrar(self):
+        """Termina el proceso de kaleido."""
+        # kaleido 0.2 no expone un cierre público; sin él, el proceso termina al liberar el scope
+        apagar = getattr(self._scope, '_shutdown_kaleido', None)
+        if apagar is not None:
+            apagar()
+        self._scope = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+
+def _iniciar_proceso(formato, ancho, alto, escala):
+    """Crea el renderizador persistente de un proceso del pool."""
+    global _renderizador_proceso
+    _renderizador_proceso = Renderizador(formato, ancho, alto, escala)
+
+
+def _renderizar_lote(lote):
+    """Renderiza un lote de (nombre, figura) con el renderizador del proceso."""
+    return [(nombre, _renderizador_proceso.renderizar(figura)) for nombre, figura in lote]
+
+
+def _lotes(figuras, tamano):
+    """Agrupa las figuras en lotes, convirtiéndolas a dict para enviarlas a otro proceso."""
+    lote = []
+    for nombre, figura in figuras:
+        if hasattr(figura, 'to_plotly_json'):
+            figura = figura.to_plotly_json()
+        lote.append((nombre, figura))
+        if len(lote) == tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class _Destino:
+    """Escribe las imágenes en un directorio o en un archivo zip."""
+
+    def __init__(self, destino, formato):
+        self.formato = formato
+        self.ruta = destino
+        self.es_zip = str(destino).endswith('.zip')
+        if self.es_zip:
+            compresion = zipfile.ZIP_DEFLATED if formato in FORMATOS_COMPRIMIBLES else zipfile.ZIP_STORED
+            self._zip = zipfile.ZipFile(destino, 'w', compression=compresion)
+        else:
+            os.makedirs(destino, exist_ok=True)
+
+    def escribir(self, nombre, contenido):
+        """Guarda una imagen con la extensión del formato."""
+        archivo = f'{nombre}.{self.formato}'
+        if self.es_zip:
+            self._zip.writestr(archivo, contenido)
+        else:
+            with open(os.path.join(self.ruta, archivo), 'wb') as f:
+                f.write(contenido)
+
+    def cerrar(self):
+        if self.es_zip:
+            self._zip.close()
+
+
+def exportar_figuras(figuras, destino, formato='png', ancho=None, alto=None, escala=1,
+                     procesos=1, tamano_lote=TAMANO_LOTE):
+    """Exporta figuras a imágenes en un directorio o zip y reporta las figuras por segundo.
+
+    figuras puede ser un dict {nombre: figura} o un iterable de pares (nombre, figura);
+    las figuras pueden ser go.Figure o los dict de la ruta rápida de graficos.py.
+    """
+    if not KALEIDO_DISPONIBLE:
+        raise ImportError("Se requiere kaleido para exportar imágenes: pip install kaleido")
+    if isinstance(figuras, dict):
+        figuras = figuras.items()
+
+    salida = _Destino(destino, formato)
+    exportadas = 0
+    inicio = time.perf_counter()
+    try:
+        if procesos <= 1:
+            with Renderizador(formato, ancho, alto, escala) as renderizador:
+                for nombre, figura in figuras:
+                    salida.escribir(nombre, renderizador.renderizar(figura))
+                    exportadas += 1
+        else:
+            # Cada proceso mantiene su propio kaleido; los lotes reparten el trabajo
+            with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso,
+                                     initargs=(formato, ancho, alto, escala)) as pool:
+                for resultado in pool.map(_renderizar_lote, _lotes(figuras, tamano_lote)):
+                    for nombre, contenido in resultado:
+                        salida.escribir(nombre, contenido)
+                        exportadas += 1
+    finally:
+        salida.cerrar()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'figuras': exportadas,
+        'segundos': segundos,
+        'figuras_por_segundo': exportadas / segundos if segundos > 0 else 0.0,
+        'destino': str(destino)
+    }
+
+
+def _hay_valores(registro, columnas):
+    """Indica si el registro tiene valores en todas las columnas indicadas."""
+    return all(pd.notna(registro.get(c)) for c in columnas)
+
+
+def figuras_historico(df):
+    """Genera (nombre, figura) con los gráficos de cada registro del histórico."""
+    for i, registro in enumerate(df.to_dict('records')):
+        prefijo = f"{i:05d}_{registro.get('tipo_circuito', 'calculo')}".replace(' ', '_')
+        if _hay_valores(registro, ['potencia_activa', 'potencia_reactiva']):
+            yield f'{prefijo}_triangulo', crear_triangulo_potencias(
+                registro['potencia_activa'], registro['potencia_reactiva'], rapido=True)
+        elif _hay_valores(registro, ['voltaje', 'corriente', 'resistencia']):
+            yield f'{prefijo}_circuito_dc', crear_grafico_circuito_dc(
+                registro['voltaje'], registro['corriente'], registro['resistencia'], rapido=True)
+        if _hay_valores(registro, ['corriente_r', 'corriente_s', 'corriente_t']):
+            yield f'{prefijo}_desequilibrio', crear_grafico_desequilibrio(
+                [registro['corriente_r'], registro['corriente_s'], registro['corriente_t']],
+                FASES_TRIFASICAS, rapido=True)
+
+
+def main(argumentos=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Exportación por lotes de los gráficos del histórico")
+    parser.add_argument('destino', help="Directorio o archivo .zip de salida")
+    parser.add_argument('--formato', choices=FORMATOS_IMAGEN, default='png')
+    parser.add_argument('--ancho', type=int, default=None, help="Ancho en píxeles")
+    parser.add_argument('--alto', type=int, default=None, help="Alto en píxeles")
+    parser.add_argument('--escala', type=float, default=1, help="Factor de escala de la imagen")
+    parser.add_argument('--procesos', type=int, default=1,
+                        help="Procesos renderizadores (cada uno con su propio kaleido)")
+    parser.add_argument('--ultimos', type=int, default=None,
+                        help="Exportar solo los últimos N registros del histórico")
+    args = parser.parse_args(argumentos)
+
+    # datos (y con él streamlit) solo se importa al exportar el histórico
+    from datos import cargar_historico
+    df = cargar_historico()
+    if args.ultimos:
+        df = df.tail(args.ultimos)
+
+    resultado = exportar_figuras(
+        figuras_historico(df), args.destino, args.formato,
+        args.ancho, args.alto, args.escala, args.procesos
+    )
+    print(f"{resultado['figuras']} figuras exportadas a {resultado['destino']} en "
+          f"{resultado['segundos']:.1f} s ({resultado['figuras_por_segundo']:.1f} figuras/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,20 +5,63 @@ Contiene todas las funciones para crear gráficos y diagramas interactivos
 
 import math
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
 import numpy as np
 
 
-def crear_triangulo_potencias(potencia_activa, potencia_reactiva):
-    """Crea el gráfico del triángulo de potencias."""
-    potencia_aparente = math.sqrt(potencia_activa**2 + potencia_reactiva**2)
-    angulo = math.degrees(math.atan2(potencia_reactiva, potencia_activa))
+# Plantillas por gráfico: layout estático y estilo de trazas validados por Plotly
+# una sola vez por proceso. Cada llamada posterior solo agrega datos, títulos y
+# anotaciones; con rapido=True las funciones crear_* retornan ese dict sin pasarlo
+# otra vez por los validadores (incluido el layout de 'plotly_white'), y sin rapido
+# retornan la figura validada con la API pública (figura_desde_dict).
+_plantillas = {}
+
+
+def _plantilla(nombre, constructor):
+    """Retorna la plantilla de un gráfico, construyéndola con Plotly la primera vez."""
+    if nombre not in _plantillas:
+        fig = constructor()
+        _plantillas[nombre] = {
+            'layout': fig.layout.to_plotly_json(),
+            'trazas': [traza.to_plotly_json() for traza in fig.data]
+        }
+    return _plantillas[nombre]
+
+
+def figura_desde_dict(figura):
+    """Crea una figura de Plotly validada a partir del dict de una figura; el dict no se modifica."""
+    return go.Figure(figura)
+
+
+def _figura_desde_plantilla(plantilla, datos_trazas, layout=None, rapido=False, estilos=None,
+                            cuadros=None):
+    """Crea una figura a partir de una plantilla, agregando datos, títulos y anotaciones.
     
+    El dict que retorna rapido=True comparte la plantilla en caché, por lo que debe
+    tratarse como solo lectura. estilos indica el estilo de cada traza cuando su número
+    varía entre figuras y cuadros la lista de cuadros de una animación.
+    """
+    estilos = plantilla['trazas'] if estilos is None else estilos
+    trazas = [dict(estilo, **datos) for estilo, datos in zip(estilos, datos_trazas)]
+    figura = {'data': trazas, 'layout': dict(plantilla['layout'], **(layout or {}))}
+    if cuadros is not None:
+        figura['frames'] = cuadros
+    if rapido:
+        return figura
+    return figura_desde_dict(figura)
+
+
+def figura_a_json(figura):
+    """Serializa a JSON una figura de Plotly o el dict de la ruta rápida, sin validarla."""
+    return pio.to_json(figura, validate=False)
+
+
+def _plantilla_triangulo_potencias():
+    """Construye la parte estática del triángulo de potencias."""
     fig = go.Figure()
     
-    # Agregar el triángulo
     fig.add_trace(go.Scatter(
-        x=[0, potencia_activa, 0, 0],
-        y=[0, 0, potencia_reactiva, 0],
         mode='lines+markers',
         line=dict(color='blue', width=3),
         marker=dict(size=8, color='blue'),
@@ -27,44 +70,16 @@ def crear_triangulo_potencias(potencia_activa, potencia_reactiva):
                      "P (Activa): %{x:.2f} W<br>" +
                      "Q (Reactiva): %{y:.2f} VAR<extra></extra>"
     ))
-      # Agregar línea de potencia aparente (hipotenusa)
+    
     fig.add_trace(go.Scatter(
-        x=[0, potencia_activa],
-        y=[0, potencia_reactiva],
         mode='lines',
         line=dict(color='red', width=3, dash='dash'),
         name='Potencia Aparente',
         hovertemplate="<b>Potencia Aparente</b><br>" +
                      "S: %{customdata[0]:.2f} VA<br>" +
-                     "φ: %{customdata[1]:.1f}°<extra></extra>",
-        customdata=[[potencia_aparente, angulo], [potencia_aparente, angulo]]
+                     "φ: %{customdata[1]:.1f}°<extra></extra>"
     ))
     
-    # Agregar anotaciones
-    fig.add_annotation(
-        x=potencia_activa/2,
-        y=-10,
-        text=f'P: {potencia_activa:.2f} W',
-        showarrow=True,
-        arrowhead=2
-    )
-    
-    fig.add_annotation(
-        x=-30,
-        y=potencia_reactiva/2,
-        text=f'Q: {potencia_reactiva:.2f} VAR',
-        showarrow=True,
-        arrowhead=2
-    )
-    
-    fig.add_annotation(
-        x=potencia_activa/2,
-        y=potencia_reactiva/2,
-        text=f'S: {potencia_aparente:.2f} VA\nφ: {angulo:.1f}°',
-        showarrow=True,
-        arrowhead=2
-    )
-    
     fig.update_layout(
         title={
             'text': 'Triángulo de Potencias',
@@ -85,17 +100,49 @@ def crear_triangulo_potencias(potencia_activa, potencia_reactiva):
     return fig
 
 
-def crear_grafico_circular(potencia_activa, potencia_reactiva, potencia_aparente):
-    """Crea el gráfico circular de potencias."""
-    labels = ['Potencia Activa', 'Potencia Reactiva']
-    values = [potencia_activa, potencia_reactiva]
-    colors = ['#FF9900', '#00CC96']
+def crear_triangulo_potencias(potencia_activa, potencia_reactiva, rapido=False):
+    """Crea el gráfico del triángulo de potencias."""
+    potencia_aparente = math.sqrt(potencia_activa**2 + potencia_reactiva**2)
+    angulo = math.degrees(math.atan2(potencia_reactiva, potencia_activa))
     
+    plantilla = _plantilla('triangulo_potencias', _plantilla_triangulo_potencias)
+    return _figura_desde_plantilla(plantilla, [
+        # Triángulo
+        dict(x=[0, potencia_activa, 0, 0], y=[0, 0, potencia_reactiva, 0]),
+        # Línea de potencia aparente (hipotenusa)
+        dict(x=[0, potencia_activa], y=[0, potencia_reactiva],
+             customdata=[[potencia_aparente, angulo], [potencia_aparente, angulo]])
+    ], layout=dict(annotations=[
+        dict(
+            x=potencia_activa/2,
+            y=-10,
+            text=f'P: {potencia_activa:.2f} W',
+            showarrow=True,
+            arrowhead=2
+        ),
+        dict(
+            x=-30,
+            y=potencia_reactiva/2,
+            text=f'Q: {potencia_reactiva:.2f} VAR',
+            showarrow=True,
+            arrowhead=2
+        ),
+        dict(
+            x=potencia_activa/2,
+            y=potencia_reactiva/2,
+            text=f'S: {potencia_aparente:.2f} VA\nφ: {angulo:.1f}°',
+            showarrow=True,
+            arrowhead=2
+        )
+    ]), rapido=rapido)
+
+
+def _plantilla_grafico_circular():
+    """Construye la parte estática del gráfico circular de potencias."""
     fig = go.Figure(data=[go.Pie(
-        labels=labels,
-        values=values,
+        labels=['Potencia Activa', 'Potencia Reactiva'],
         hole=0.3,
-        marker_colors=colors,
+        marker_colors=['#FF9900', '#00CC96'],
         textinfo='label+percent+value',
         texttemplate='%{label}<br>%{value:.2f} %{customdata}<br>%{percent}',
         customdata=['W', 'VAR'],
@@ -107,38 +154,41 @@ def crear_grafico_circular(potencia_activa, potencia_reactiva, potencia_aparente
     
     fig.update_layout(
         title='Distribución de Potencias',
-        annotations=[dict(text=f'S: {potencia_aparente:.2f} VA', x=0.5, y=0.5, 
-                         font_size=16, showarrow=False)],
         template='plotly_white'
     )
     return fig
 
 
-def crear_grafico_circuito_dc(voltaje, corriente, resistencia):
-    """Crea una visualización del circuito DC."""
+def crear_grafico_circular(potencia_activa, potencia_reactiva, potencia_aparente, rapido=False):
+    """Crea el gráfico circular de potencias."""
+    plantilla = _plantilla('grafico_circular', _plantilla_grafico_circular)
+    return _figura_desde_plantilla(plantilla, [
+        dict(values=[potencia_activa, potencia_reactiva])
+    ], layout=dict(
+        annotations=[dict(text=f'S: {potencia_aparente:.2f} VA', x=0.5, y=0.5, 
+                         font=dict(size=16), showarrow=False)]
+    ), rapido=rapido)
+
+
+def _plantilla_grafico_circuito_dc():
+    """Construye la parte estática de la visualización del circuito DC."""
     fig = go.Figure()
     
-    # Datos para el gráfico
     parametros = ['Voltaje (V)', 'Corriente (A)', 'Resistencia (Ω)']
-    valores = [voltaje, corriente, resistencia]
-    colores = ['#FF9900', '#00CC96', '#AB63FA']
     
-    # Agregar barras con más estilo
+    # Barras con más estilo
     fig.add_trace(go.Bar(
         x=parametros,
-        y=valores,
-        marker_color=colores,
-        text=[f'{v:.2f}' for v in valores],
+        marker_color=['#FF9900', '#00CC96', '#AB63FA'],
         textposition='auto',
         hovertemplate="<b>%{x}</b><br>" +
                      "Valor: %{y:.2f}<extra></extra>",
         width=0.6
     ))
     
-    # Agregar línea de tendencia
+    # Línea de tendencia
     fig.add_trace(go.Scatter(
         x=parametros,
-        y=valores,
         mode='lines',
         name='Tendencia',
         line=dict(color='royalblue', width=2, dash='dot'),
@@ -164,24 +214,28 @@ def crear_grafico_circuito_dc(voltaje, corriente, resistencia):
     return fig
 
 
-def crear_grafico_capacitor(valores, titulos, tipo="DC"):
-    """Crea una visualización de los parámetros del capacitor."""
-    colores = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
+def crear_grafico_circuito_dc(voltaje, corriente, resistencia, rapido=False):
+    """Crea una visualización del circuito DC."""
+    valores = [voltaje, corriente, resistencia]
     
+    plantilla = _plantilla('circuito_dc', _plantilla_grafico_circuito_dc)
+    return _figura_desde_plantilla(plantilla, [
+        dict(y=valores, text=[f'{v:.2f}' for v in valores]),
+        dict(y=valores)
+    ], rapido=rapido)
+
+
+def _plantilla_grafico_capacitor():
+    """Construye la parte estática de la visualización del capacitor."""
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
-        x=titulos,
-        y=valores,
-        marker_color=colores[:len(valores)],
-        text=[f'{v:.2e}' if v < 0.01 else f'{v:.2f}' for v in valores],
         textposition='auto',
         hovertemplate="<b>%{x}</b><br>" +
                      "Valor: %{y:.2e}<extra></extra>",
     ))
     
     fig.update_layout(
-        title=f'Parámetros del Capacitor - {tipo}',
         yaxis_title='Valor',
         template='plotly_white',
         xaxis=dict(tickangle=-45)
@@ -189,64 +243,62 @@ def crear_grafico_capacitor(valores, titulos, tipo="DC"):
     return fig
 
 
-def crear_diagrama_fasorial_trifasico(voltajes, angulos):
-    """Crea un diagrama fasorial para el sistema trifásico."""
+def crear_grafico_capacitor(valores, titulos, tipo="DC", rapido=False):
+    """Crea una visualización de los parámetros del capacitor."""
+    colores = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
+    
+    plantilla = _plantilla('capacitor', _plantilla_grafico_capacitor)
+    return _figura_desde_plantilla(plantilla, [
+        dict(x=titulos, y=valores, marker=dict(color=colores[:len(valores)]),
+             text=[f'{v:.2e}' if v < 0.01 else f'{v:.2f}' for v in valores])
+    ], layout=dict(title=dict(text=f'Parámetros del Capacitor - {tipo}')), rapido=rapido)
+
+
+FASES_TRIFASICAS = ['R', 'S', 'T']
+COLORES_FASES = ['#FF0000', '#00FF00', '#0000FF']
+COLORES_GRUPOS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+                  '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+
+def _con_cortes(segmentos):
+    """Aplana una matriz (un segmento por fila) en una lista con None entre segmentos."""
+    filas, columnas = segmentos.shape
+    salida = np.empty((filas, columnas + 1), dtype=object)
+    salida[:, :columnas] = segmentos
+    salida[:, columnas] = None
+    return salida.ravel().tolist()
+
+
+def _plantilla_diagrama_fasorial():
+    """Construye la parte estática del diagrama fasorial: vectores, arcos y ángulos."""
     fig = go.Figure()
     
-    fases = ['R', 'S', 'T']
-    colores = ['#FF0000', '#00FF00', '#0000FF']
+    # Vectores de un grupo, separados por cortes (None)
+    fig.add_trace(go.Scatter(
+        line=dict(width=3),
+        textposition='top center',
+        hovertemplate='<b>%{text}</b><br>' +
+                     'Magnitud: %{customdata[0]:.2f}<br>' +
+                     'Ángulo: %{customdata[1]:.1f}°<extra></extra>'
+    ))
     
-    for fase, voltaje, angulo, color in zip(fases, voltajes, angulos, colores):
-        # Convertir a radianes
-        angulo_rad = math.radians(angulo)
-        
-        # Coordenadas del vector
-        x_end = voltaje * math.cos(angulo_rad)
-        y_end = voltaje * math.sin(angulo_rad)
-        
-        # Agregar el vector
-        fig.add_trace(go.Scatter(
-            x=[0, x_end],
-            y=[0, y_end],
-            mode='lines+markers+text',
-            line=dict(color=color, width=3),
-            marker=dict(size=[0, 10], color=color),
-            text=['', f'V{fase}'],
-            textposition='top center',
-            name=f'Fase {fase}',
-            hovertemplate="<b>Fase %{text}</b><br>" +
-                         'Voltaje: %{customdata[0]:.2f} V<br>' +
-                         'Ángulo: %{customdata[1]:.1f}°<extra></extra>',
-            customdata=[[voltaje, angulo]]*2
-        ))
-        
-        # Agregar arco para mostrar el ángulo
-        radio = voltaje * 0.2
-        angulo_rad = math.radians(angulo)
-        arco_x = [radio * math.cos(th) for th in np.linspace(0, angulo_rad, 50)]
-        arco_y = [radio * math.sin(th) for th in np.linspace(0, angulo_rad, 50)]
-        
-        fig.add_trace(go.Scatter(
-            x=arco_x,
-            y=arco_y,
-            mode='lines',
-            line=dict(color=color, width=1, dash='dot'),
-            showlegend=False,
-            hoverinfo='skip'
-        ))
-        
-        # Agregar etiqueta del ángulo
-        fig.add_annotation(
-            x=radio*math.cos(angulo_rad/2),
-            y=radio*math.sin(angulo_rad/2),
-            text=f'{angulo}°',
-            showarrow=False,
-            font=dict(size=10, color=color)
-        )
+    # Arcos de los ángulos del grupo
+    fig.add_trace(go.Scatter(
+        mode='lines',
+        line=dict(width=1, dash='dot'),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+    
+    # Etiquetas de los ángulos del grupo
+    fig.add_trace(go.Scatter(
+        mode='text',
+        textfont=dict(size=10),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
     
-    # Configuración del layout
     fig.update_layout(
-        title='Diagrama Fasorial Trifásico',
         xaxis_title='Componente Real',
         yaxis_title='Componente Imaginaria',
         showlegend=True,
@@ -266,31 +318,112 @@ def crear_diagrama_fasorial_trifasico(voltajes, angulos):
         ),
         template='plotly_white'
     )
-    
     return fig
 
 
-def crear_grafico_desequilibrio(corrientes_fases, nombres_fases):
-    """Crea un gráfico de barras mostrando el desequilibrio de corrientes."""
-    fig = go.Figure()
+def crear_diagrama_fasorial(magnitudes, angulos, grupos=None, etiquetas=None, colores=None,
+                            titulo='Diagrama Fasorial', normalizar=False, mostrar_angulos=True,
+                            puntos_arco=50, rapido=False):
+    """Crea un diagrama fasorial de N vectores (voltajes, corrientes, varios alimentadores).
+    
+    Los vectores de cada grupo van en una sola traza separada por cortes y los arcos se
+    calculan con operaciones de arreglos, por lo que el número de trazas solo depende del
+    número de grupos. Con normalizar=True cada grupo se dibuja relativo a su mayor magnitud
+    (el valor real se mantiene en la información al pasar el cursor).
+    """
+    magnitudes = np.asarray(magnitudes, dtype='float64')
+    angulos = np.asarray(angulos, dtype='float64')
+    n = len(magnitudes)
+    grupos = np.asarray(grupos if grupos is not None else ['Fasores'] * n, dtype=object)
+    etiquetas = np.asarray(etiquetas if etiquetas is not None else [f'{g}' for g in grupos],
+                           dtype=object)
+    colores = colores or COLORES_GRUPOS
     
-    colores = ['#FF0000', '#00FF00', '#0000FF']  # R, S, T
+    plantilla = _plantilla('diagrama_fasorial', _plantilla_diagrama_fasorial)
+    estilo_vectores, estilo_arcos, estilo_angulos = plantilla['trazas']
+    
+    estilos, datos_trazas = [], []
+    for i, grupo in enumerate(dict.fromkeys(grupos)):
+        en_grupo = grupos == grupo
+        modulo, angulo = magnitudes[en_grupo], angulos[en_grupo]
+        color = colores[i % len(colores)]
+        
+        # Longitud dibujada de cada vector
+        longitud = modulo
+        if normalizar and len(modulo) and np.abs(modulo).max() > 0:
+            longitud = modulo / np.abs(modulo).max()
+        
+        radianes = np.radians(angulo)
+        x_fin = longitud * np.cos(radianes)
+        y_fin = longitud * np.sin(radianes)
+        ceros = np.zeros_like(x_fin)
+        
+        # Vectores: origen, extremo y corte, con los datos reales para el cursor
+        estilos.append(estilo_vectores)
+        datos_trazas.append(dict(
+            mode='lines+markers+text' if len(modulo) <= 12 else 'lines+markers',
+            x=_con_cortes(np.column_stack([ceros, x_fin])),
+            y=_con_cortes(np.column_stack([ceros, y_fin])),
+            customdata=np.repeat(np.column_stack([modulo, angulo]), 3, axis=0).tolist(),
+            text=_con_cortes(np.column_stack([np.full(len(modulo), '', dtype=object),
+                                              etiquetas[en_grupo]])),
+            marker=dict(size=[0, 10, 0] * len(modulo), color=color),
+            line=dict(estilo_vectores['line'], color=color),
+            name=str(grupo),
+            legendgroup=str(grupo)
+        ))
+        
+        if not mostrar_angulos:
+            continue
+        
+        # Arcos: una fila de puntos por vector, calculadas de una sola vez
+        radio = (longitud * 0.2)[:, None]
+        theta = radianes[:, None] * np.linspace(0, 1, puntos_arco)[None, :]
+        estilos.append(estilo_arcos)
+        datos_trazas.append(dict(
+            x=_con_cortes(radio * np.cos(theta)),
+            y=_con_cortes(radio * np.sin(theta)),
+            line=dict(estilo_arcos['line'], color=color),
+            legendgroup=str(grupo)
+        ))
+        
+        # Etiquetas de los ángulos en la mitad de cada arco
+        estilos.append(estilo_angulos)
+        datos_trazas.append(dict(
+            x=(radio[:, 0] * np.cos(radianes / 2)).tolist(),
+            y=(radio[:, 0] * np.sin(radianes / 2)).tolist(),
+            text=[f'{a:g}°' for a in angulo.tolist()],
+            textfont=dict(estilo_angulos['textfont'], color=color),
+            legendgroup=str(grupo)
+        ))
+    
+    return _figura_desde_plantilla(plantilla, datos_trazas, layout=dict(title=dict(text=titulo)),
+                                   rapido=rapido, estilos=estilos)
+
+
+def crear_diagrama_fasorial_trifasico(voltajes, angulos, rapido=False):
+    """Crea un diagrama fasorial para el sistema trifásico."""
+    return crear_diagrama_fasorial(
+        voltajes, angulos,
+        grupos=[f'Fase {fase}' for fase in FASES_TRIFASICAS[:len(voltajes)]],
+        etiquetas=[f'V{fase}' for fase in FASES_TRIFASICAS[:len(voltajes)]],
+        colores=COLORES_FASES,
+        titulo='Diagrama Fasorial Trifásico',
+        rapido=rapido
+    )
+
+
+def _plantilla_grafico_desequilibrio():
+    """Construye la parte estática del gráfico de desequilibrio de corrientes."""
+    fig = go.Figure()
     
     fig.add_trace(go.Bar(
-        x=nombres_fases,
-        y=corrientes_fases,
-        marker_color=colores,
-        text=[f'{i:.2f} A' for i in corrientes_fases],
+        marker_color=COLORES_FASES,  # R, S, T
         textposition='auto',
         hovertemplate="<b>Fase %{x}</b><br>" +
                      "Corriente: %{y:.2f} A<extra></extra>"
     ))
     
-    # Línea del promedio
-    promedio = sum(corrientes_fases) / len(corrientes_fases)
-    fig.add_hline(y=promedio, line_dash="dash", line_color="red",
-                  annotation_text=f"Promedio: {promedio:.2f} A")
-    
     fig.update_layout(
         title='Corrientes por Fase - Análisis de Desequilibrio',
         xaxis_title='Fases',
@@ -298,5 +431,537 @@ def crear_grafico_desequilibrio(corrientes_fases, nombres_fases):
         template='plotly_white',
         showlegend=False
     )
+    return fig
+
+
+def crear_grafico_desequilibrio(corrientes_fases, nombres_fases, rapido=False):
+    """Crea un gráfico de barras mostrando el desequilibrio de corrientes."""
+    plantilla = _plantilla('desequilibrio', _plantilla_grafico_desequilibrio)
+    
+    # Línea del promedio (equivalente a fig.add_hline, sin resolver subgráficos)
+    promedio = sum(corrientes_fases) / len(corrientes_fases)
+    return _figura_desde_plantilla(plantilla, [
+        dict(x=nombres_fases, y=corrientes_fases,
+             text=[f'{i:.2f} A' for i in corrientes_fases])
+    ], layout=dict(
+        shapes=[dict(type='line', xref='x domain', x0=0, x1=1, yref='y', y0=promedio, y1=promedio,
+                     line=dict(color='red', dash='dash'))],
+        annotations=[dict(text=f"Promedio: {promedio:.2f} A", showarrow=False,
+                          xref='x domain', x=1, xanchor='right',
+                          yref='y', y=promedio, yanchor='bottom')]
+    ), rapido=rapido)
+
+
+def crear_grafico_tendencias(agregados, metrica, estadistico='media'):
+    """Crea un gráfico de la evolución de una métrica agregada por tipo de circuito."""
+    fig = go.Figure()
+    
+    for tipo, datos_tipo in agregados.groupby('tipo_circuito'):
+        # Banda entre mínimo y máximo cuando se grafica la media
+        if estadistico == 'media':
+            fig.add_trace(go.Scatter(
+                x=list(datos_tipo['periodo']) + list(datos_tipo['periodo'])[::-1],
+                y=list(datos_tipo['maximo']) + list(datos_tipo['minimo'])[::-1],
+                fill='toself',
+                line=dict(width=0),
+                opacity=0.2,
+                showlegend=False,
+                hoverinfo='skip'
+            ))
+        
+        fig.add_trace(go.Scatter(
+            x=datos_tipo['periodo'],
+            y=datos_tipo[estadistico],
+            mode='lines+markers',
+            name=tipo,
+            customdata=datos_tipo[['conteo']],
+            hovertemplate=f"<b>{tipo}</b><br>" +
+                         "Periodo: %{x}<br>" +
+                         f"{estadistico.capitalize()}: " + "%{y:.2f}<br>" +
+                         "Registros: %{customdata[0]}<extra></extra>"
+        ))
+    
+    fig.update_layout(
+        title=f'Tendencia de {metrica} ({estadistico})',
+        xaxis_title='Periodo',
+        yaxis_title=metrica,
+        template='plotly_white',
+        hovermode='closest'
+    )
+    
+    return fig
+
+
+def _plantilla_serie_historica():
+    """Construye la plantilla de la serie temporal del histórico (WebGL)."""
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        mode='lines',
+        line=dict(width=1, color='#1f77b4'),
+        hovertemplate="%{x}<br>%{y:.3f}<extra></extra>"
+    ))
+    fig.update_layout(
+        xaxis_title='Fecha',
+        template='plotly_white',
+        height=350,
+        margin=dict(t=50, b=40),
+        showlegend=False
+    )
+    return fig
+
+
+def crear_grafico_serie_historica(fechas, valores, metrica, total=None, rapido=False):
+    """Crea el gráfico WebGL de una métrica del histórico ya decimada."""
+    titulo = f'{metrica} ({len(valores):,} puntos'
+    titulo += f' de {total:,})' if total is not None and total != len(valores) else ')'
+    
+    plantilla = _plantilla('serie_historica', _plantilla_serie_historica)
+    return _figura_desde_plantilla(plantilla, [
+        dict(x=fechas, y=valores)
+    ], layout=dict(title=dict(text=titulo), yaxis=dict(title=dict(text=metrica))), rapido=rapido)
+
+
+FACTORES_POTENCIA_ISOLINEAS = [0.5, 0.7, 0.8, 0.9, 0.95, 1.0]
+
+
+def _plantilla_densidad_potencias():
+    """Construye la plantilla del mapa de densidad P-Q con isolíneas de factor de potencia."""
+    fig = go.Figure()
+    
+    # Rejilla de conteos (escala logarítmica)
+    fig.add_trace(go.Heatmap(
+        colorscale='Viridis',
+        hoverongaps=False,
+        colorbar=dict(title=dict(text='Registros')),
+        hovertemplate='P: %{x:.2f} W<br>' +
+                     'Q: %{y:.2f} VAR<br>' +
+                     'Registros: %{customdata}<extra></extra>'
+    ))
+    
+    # Isolíneas de factor de potencia, separadas por cortes (None)
+    fig.add_trace(go.Scatter(
+        mode='lines',
+        line=dict(color='white', width=1, dash='dash'),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+    
+    # Etiquetas de las isolíneas
+    fig.add_trace(go.Scatter(
+        mode='text',
+        textposition='top left',
+        textfont=dict(color='white', size=10),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+    
+    fig.update_layout(
+        title='Densidad de Puntos de Operación (P vs Q)',
+        xaxis_title='Potencia Activa (W)',
+        yaxis_title='Potencia Reactiva (VAR)',
+        template='plotly_white'
+    )
+    return fig
+
+
+def crear_mapa_densidad_potencias(bordes_p, bordes_q, conteos, factores=FACTORES_POTENCIA_ISOLINEAS,
+                                  rapido=False):
+    """Crea el mapa de densidad de potencia activa vs reactiva a partir de una rejilla de conteos.
+    
+    Solo se envía la rejilla al navegador, por lo que el tamaño de la figura no depende del
+    número de registros.
+    """
+    bordes_p = np.asarray(bordes_p, dtype='float64')
+    bordes_q = np.asarray(bordes_q, dtype='float64')
+    conteos = np.asarray(conteos)
     
+    # Conteos en escala logarítmica; las celdas vacías quedan como huecos
+    with np.errstate(divide='ignore'):
+        z = np.where(conteos > 0, np.round(np.log10(conteos), 3), np.nan)
+    maximo = int(np.ceil(np.nanmax(z))) if conteos.any() else 0
+    marcas = list(range(maximo + 1))
+    
+    # Isolíneas desde el origen: Q = P·tan(acos(fp)), recortadas al borde de la rejilla
+    factores = np.asarray(factores, dtype='float64')
+    tangentes = np.tan(np.arccos(factores))
+    p_max = bordes_p[-1]
+    q_limite = np.where(tangentes > 0, bordes_q[-1], 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_fin = np.where(tangentes > 0, np.minimum(p_max, q_limite / tangentes), p_max)
+    q_fin = p_fin * tangentes
+    
+    plantilla = _plantilla('densidad_potencias', _plantilla_densidad_potencias)
+    estilo_mapa = plantilla['trazas'][0]
+    return _figura_desde_plantilla(plantilla, [
+        dict(
+            x=((bordes_p[:-1] + bordes_p[1:]) / 2).tolist(),
+            y=((bordes_q[:-1] + bordes_q[1:]) / 2).tolist(),
+            z=z,
+            customdata=conteos,
+            colorbar=dict(estilo_mapa['colorbar'], tickvals=marcas,
+                          ticktext=[f'{10 ** m:,}' for m in marcas])
+        ),
+        dict(
+            x=_con_cortes(np.column_stack([np.zeros_like(p_fin), p_fin])),
+            y=_con_cortes(np.column_stack([np.zeros_like(q_fin), q_fin]))
+        ),
+        dict(
+            x=p_fin.tolist(),
+            y=q_fin.tolist(),
+            text=[f'fp {f:g}' for f in factores.tolist()]
+        )
+    ], layout=dict(
+        # Ejes fijos a la rejilla: las isolíneas que salen de ella se recortan
+        xaxis=dict(plantilla['layout'].get('xaxis', {}), range=[bordes_p[0], bordes_p[-1]]),
+        yaxis=dict(plantilla['layout'].get('yaxis', {}), range=[bordes_q[0], bordes_q[-1]])
+    ), rapido=rapido)
+
+
+def _plantilla_histograma():
+    """Construye la plantilla del histograma de una métrica agrupada en el servidor."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        marker=dict(color='#1f77b4'),
+        hovertemplate='%{customdata[0]:.3g} – %{customdata[1]:.3g}<br>' +
+                     'Lecturas: %{y}<extra></extra>'
+    ))
+    fig.update_layout(
+        yaxis_title='Lecturas',
+        template='plotly_white',
+        bargap=0.05,
+        height=320,
+        margin=dict(t=50, b=40),
+        showlegend=False
+    )
     return fig
+
+
+def crear_histograma(bordes, conteos, titulo, etiqueta_x, rapido=False):
+    """Crea el histograma de una métrica a partir de sus bordes y conteos (np.histogram)."""
+    bordes = np.asarray(bordes, dtype='float64')
+    
+    plantilla = _plantilla('histograma', _plantilla_histograma)
+    return _figura_desde_plantilla(plantilla, [
+        dict(
+            x=((bordes[:-1] + bordes[1:]) / 2).tolist(),
+            y=np.asarray(conteos).tolist(),
+            width=np.diff(bordes).tolist(),
+            customdata=np.column_stack([bordes[:-1], bordes[1:]]).tolist()
+        )
+    ], layout=dict(title=dict(text=titulo), xaxis=dict(title=dict(text=etiqueta_x))), rapido=rapido)
+
+
+COLORES_CATEGORIAS_PERFIL = {
+    'entrada': '#7f7f7f', 'cálculo': '#1f77b4', 'análisis': '#9467bd',
+    'gráfico': '#ff7f0e', 'envío': '#2ca02c', 'histórico': '#d62728'
+}
+
+
+def crear_cascada_tiempos(tramos, total_ms=None):
+    """Crea la cascada de tiempos de una ejecución (tramos de perfilado.py).
+
+    Cada tramo es una barra horizontal que empieza en su inicio relativo; los tramos
+    anidados se sangran bajo el que los contiene. Una traza por categoría.
+    """
+    etiquetas = [f"{i + 1:>2}. {'· ' * t['nivel']}{t['nombre']}" for i, t in enumerate(tramos)]
+    fig = go.Figure()
+    for categoria in dict.fromkeys(t['categoria'] for t in tramos):
+        indices = [i for i, t in enumerate(tramos) if t['categoria'] == categoria]
+        fig.add_trace(go.Bar(
+            y=[etiquetas[i] for i in indices],
+            x=[tramos[i].get('duracion_ms', 0.0) for i in indices],
+            base=[tramos[i]['inicio_ms'] for i in indices],
+            orientation='h',
+            name=categoria,
+            marker=dict(color=COLORES_CATEGORIAS_PERFIL.get(categoria, '#17becf')),
+            hovertemplate='%{y}<br>Inicio: %{base:.1f} ms<br>Duración: %{x:.2f} ms<extra>' + categoria + '</extra>'
+        ))
+
+    titulo = 'Cascada de la Ejecución' + (f' ({total_ms:.0f} ms)' if total_ms is not None else '')
+    fig.update_layout(
+        title=titulo,
+        xaxis_title='Tiempo (ms)',
+        yaxis=dict(categoryorder='array', categoryarray=etiquetas, autorange='reversed', tickfont=dict(size=9)),
+        barmode='overlay',
+        template='plotly_white',
+        height=max(250, 16 * len(tramos) + 110),
+        margin=dict(l=10, r=10, t=40, b=30),
+        legend=dict(orientation='h', y=-0.15)
+    )
+    return fig
+
+
+DURACION_CUADRO_MS = 50
+COLOR_FASE_UNICA = '#1f77b4'
+
+
+def _plantilla_animacion_ondas(fases):
+    """Construye la plantilla de la animación de fasores y formas de onda para 1 o 3 fases."""
+    colores = COLORES_FASES if fases == 3 else [COLOR_FASE_UNICA]
+    nombres = FASES_TRIFASICAS if fases == 3 else ['']
+    fig = make_subplots(
+        rows=1, cols=2,
+        column_widths=[0.35, 0.65],
+        specs=[[{}, {'secondary_y': True}]],
+        subplot_titles=('Fasores (normalizados)', 'Formas de onda (un ciclo)')
+    )
+    
+    # Formas de onda de voltaje (eje principal) y corriente (eje secundario)
+    for nombre, color in zip(nombres, colores):
+        fig.add_trace(go.Scatter(
+            mode='lines', line=dict(color=color, width=2), name=f'v{nombre.lower()}(t)',
+            hovertemplate='t: %{x:.2f} ms<br>v: %{y:.2f} V<extra></extra>'
+        ), row=1, col=2, secondary_y=False)
+    for nombre, color in zip(nombres, colores):
+        fig.add_trace(go.Scatter(
+            mode='lines', line=dict(color=color, width=2, dash='dash'), name=f'i{nombre.lower()}(t)',
+            hovertemplate='t: %{x:.2f} ms<br>i: %{y:.2f} A<extra></extra>'
+        ), row=1, col=2, secondary_y=True)
+    
+    # Fasores de voltaje y de corriente, separados por cortes (None)
+    fig.add_trace(go.Scatter(
+        mode='lines+markers', line=dict(color='#444444', width=3),
+        marker=dict(size=[0, 10, 0] * fases, color=[c for color in colores for c in (color,) * 3]),
+        name='V', hoverinfo='skip'
+    ), row=1, col=1)
+    fig.add_trace(go.Scatter(
+        mode='lines+markers', line=dict(color='#444444', width=2, dash='dash'),
+        marker=dict(size=[0, 8, 0] * fases, color=[c for color in colores for c in (color,) * 3]),
+        name='I', hoverinfo='skip'
+    ), row=1, col=1)
+    
+    # Valores instantáneos en el cuadro actual
+    fig.add_trace(go.Scatter(
+        mode='markers', marker=dict(size=10, color=colores), showlegend=False, hoverinfo='skip'
+    ), row=1, col=2, secondary_y=False)
+    fig.add_trace(go.Scatter(
+        mode='markers', marker=dict(size=8, color=colores, symbol='diamond'),
+        showlegend=False, hoverinfo='skip'
+    ), row=1, col=2, secondary_y=True)
+    
+    fig.update_xaxes(range=[-1.2, 1.2], zeroline=True, showgrid=True, row=1, col=1)
+    fig.update_yaxes(range=[-1.2, 1.2], zeroline=True, scaleanchor='x', scaleratio=1, row=1, col=1)
+    fig.update_xaxes(title_text='Tiempo (ms)', row=1, col=2)
+    fig.update_yaxes(title_text='Voltaje (V)', row=1, col=2, secondary_y=False)
+    fig.update_yaxes(title_text='Corriente (A)', showgrid=False, row=1, col=2, secondary_y=True)
+    
+    # Reproducción en el navegador, sin volver a ejecutar la aplicación
+    fig.update_layout(
+        template='plotly_white',
+        height=420,
+        updatemenus=[dict(
+            type='buttons', showactive=False, direction='left',
+            x=0, xanchor='left', y=-0.12, yanchor='top',
+            buttons=[
+                dict(label='▶ Reproducir', method='animate',
+                     args=[None, dict(frame=dict(duration=DURACION_CUADRO_MS, redraw=False),
+                                      transition=dict(duration=0), fromcurrent=True, mode='immediate')]),
+                dict(label='Pausa', method='animate',
+                     args=[[None], dict(frame=dict(duration=0, redraw=False),
+                                        transition=dict(duration=0), mode='immediate')])
+            ]
+        )]
+    )
+    return fig
+
+
+def crear_animacion_ondas(voltajes, corrientes, coseno_fi, frecuencia=50, muestras=200, cuadros=48,
+                          rapido=False):
+    """Crea la animación de fasores giratorios y formas de onda v(t)/i(t) de 1 o 3 fases.
+    
+    voltajes y corrientes son valores eficaces por fase. Todas las muestras y cuadros se
+    calculan una sola vez con numpy y la reproducción ocurre en el navegador; muestras y
+    cuadros acotan el tamaño de la figura.
+    """
+    voltajes = np.asarray(voltajes, dtype='float64')
+    corrientes = np.asarray(corrientes, dtype='float64')
+    fases = len(voltajes)
+    desfases = np.radians([0, -120, 120][:fases])[:, None]
+    fi = math.acos(max(-1.0, min(1.0, coseno_fi)))
+    omega = 2 * math.pi * frecuencia
+    
+    # Formas de onda de un ciclo completo: (fases, muestras)
+    t = np.linspace(0, 1 / frecuencia, muestras)
+    v = math.sqrt(2) * voltajes[:, None] * np.sin(omega * t + desfases)
+    i = math.sqrt(2) * corrientes[:, None] * np.sin(omega * t + desfases - fi)
+    
+    # Ángulo de giro de cada cuadro y extremos de los fasores: (cuadros, fases)
+    t_cuadros = np.arange(cuadros) / (cuadros * frecuencia)
+    theta = omega * t_cuadros[:, None] + desfases.T
+    escala_i = 0.8 * corrientes / corrientes.max() if corrientes.max() > 0 else corrientes
+    v_x, v_y = np.cos(theta), np.sin(theta)
+    i_x, i_y = escala_i * np.cos(theta - fi), escala_i * np.sin(theta - fi)
+    v_cuadro = math.sqrt(2) * voltajes * v_y
+    i_cuadro = math.sqrt(2) * corrientes * np.sin(theta - fi)
+    ceros = np.zeros(fases)
+    ms = (t * 1000).tolist()
+    ms_cuadros = (t_cuadros * 1000).tolist()
+    
+    def datos_cuadro(k):
+        return [
+            dict(type='scatter', x=_con_cortes(np.column_stack([ceros, v_x[k]])),
+                 y=_con_cortes(np.column_stack([ceros, v_y[k]]))),
+            dict(type='scatter', x=_con_cortes(np.column_stack([ceros, i_x[k]])),
+                 y=_con_cortes(np.column_stack([ceros, i_y[k]]))),
+            dict(type='scatter', x=[ms_cuadros[k]] * fases, y=v_cuadro[k].tolist()),
+            dict(type='scatter', x=[ms_cuadros[k]] * fases, y=i_cuadro[k].tolist())
+        ]
+    
+    animadas = list(range(2 * fases, 2 * fases + 4))
+    lista_cuadros = [dict(name=str(k), data=datos_cuadro(k), traces=animadas) for k in range(cuadros)]
+    
+    plantilla = _plantilla(f'animacion_ondas_{fases}', lambda: _plantilla_animacion_ondas(fases))
+    return _figura_desde_plantilla(
+        plantilla,
+        [dict(x=ms, y=onda) for onda in v.tolist()] +
+        [dict(x=ms, y=onda) for onda in i.tolist()] +
+        datos_cuadro(0),
+        layout=dict(
+            title=dict(text=f'Formas de Onda y Fasores - cos φ = {coseno_fi:.2f}, {frecuencia:g} Hz'),
+            sliders=[dict(
+                active=0, x=0.25, len=0.75, y=-0.12, yanchor='top',
+                currentvalue=dict(prefix='ωt = '),
+                steps=[dict(label=f'{360 * k / cuadros:.0f}°', method='animate',
+                            args=[[str(k)], dict(frame=dict(duration=0, redraw=False), mode='immediate',
+                                                 transition=dict(duration=0))])
+                       for k in range(cuadros)]
+            )]
+        ),
+        rapido=rapido,
+        cuadros=lista_cuadros
+    )
+
+
+def _rejilla_subgraficos(n, columnas, compartir_ejes=True, alto_fila=170, espacio_h=0.03):
+    """Calcula los ejes y títulos de una rejilla de n subgráficos sin usar make_subplots.
+    
+    Retorna el layout de la rejilla (con su altura), las referencias (x, y) de cada
+    subgráfico y la posición de sus títulos.
+    """
+    columnas = max(1, min(columnas, n))
+    filas = max(1, math.ceil(n / columnas))
+    altura = max(300, alto_fila * filas + 100)
+    espacio_v = min(0.3, 55 / altura) if filas > 1 else 0
+    indices = np.arange(n)
+    fila, columna = indices // columnas, indices % columnas
+    
+    ancho = (1 - espacio_h * (columnas - 1)) / columnas
+    alto = (1 - espacio_v * (filas - 1)) / filas
+    # Redondear para que los errores de coma flotante no saquen los dominios de [0, 1]
+    x0 = np.round(columna * (ancho + espacio_h), 6)
+    y1 = np.round(1 - fila * (alto + espacio_v), 6)
+    ancho, alto = round(ancho, 6), round(alto, 6)
+    
+    layout, referencias, titulos = {'height': altura}, [], []
+    for k, (xi, yi, f, c) in enumerate(zip(x0.tolist(), y1.tolist(), fila.tolist(), columna.tolist())):
+        sufijo = '' if k == 0 else str(k + 1)
+        eje_x = dict(domain=[xi, min(1, xi + ancho)], anchor=f'y{sufijo}',
+                     showticklabels=f == filas - 1 or k + columnas >= n)
+        eje_y = dict(domain=[max(0, yi - alto), yi], anchor=f'x{sufijo}', showticklabels=c == 0)
+        if compartir_ejes and k > 0:
+            eje_x['matches'] = 'x'
+            eje_y['matches'] = 'y'
+        layout[f'xaxis{sufijo}'] = eje_x
+        layout[f'yaxis{sufijo}'] = eje_y
+        referencias.append((f'x{sufijo}', f'y{sufijo}'))
+        titulos.append(dict(x=xi + ancho / 2, y=yi, xref='paper', yref='paper',
+                            xanchor='center', yanchor='bottom', showarrow=False, font=dict(size=11)))
+    return layout, referencias, titulos
+
+
+def _plantilla_flota_triangulos():
+    """Construye la plantilla de la vista de flota de triángulos de potencias."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        mode='lines',
+        fill='toself',
+        line=dict(color='blue', width=1.5),
+        fillcolor='rgba(31, 119, 180, 0.25)',
+        hovertemplate='P: %{customdata[0]:.2f} W<br>' +
+                     'Q: %{customdata[1]:.2f} VAR<br>' +
+                     'S: %{customdata[2]:.2f} VA<extra>%{text}</extra>'
+    ))
+    fig.update_layout(template='plotly_white', showlegend=False, margin=dict(t=90, l=50, r=20, b=40))
+    return fig
+
+
+def crear_flota_triangulos(potencias_activas, potencias_reactivas, nombres=None, columnas=5,
+                           compartir_ejes=True, rapido=False):
+    """Crea una vista de flota con el triángulo de potencias de N circuitos en una sola figura."""
+    p = np.asarray(potencias_activas, dtype='float64')
+    q = np.asarray(potencias_reactivas, dtype='float64')
+    s = np.hypot(p, q)
+    n = len(p)
+    nombres = list(nombres) if nombres is not None else [f'Circuito {k + 1}' for k in range(n)]
+    
+    # Vértices (0,0) → (P,0) → (P,Q) → (0,0) de todos los triángulos a la vez
+    ceros = np.zeros(n)
+    xs = np.column_stack([ceros, p, p, ceros]).tolist()
+    ys = np.column_stack([ceros, ceros, q, ceros]).tolist()
+    datos_hover = np.repeat(np.column_stack([p, q, s])[:, None, :], 4, axis=1).tolist()
+    
+    layout, referencias, titulos = _rejilla_subgraficos(n, columnas, compartir_ejes)
+    plantilla = _plantilla('flota_triangulos', _plantilla_flota_triangulos)
+    estilo = plantilla['trazas'][0]
+    datos_trazas = [
+        dict(x=x, y=y, customdata=c, text=nombre, xaxis=ref_x, yaxis=ref_y)
+        for x, y, c, nombre, (ref_x, ref_y) in zip(xs, ys, datos_hover, nombres, referencias)
+    ]
+    anotaciones = [dict(titulo, text=f'{nombre}<br>fp {fp:.2f}')
+                   for titulo, nombre, fp in zip(titulos, nombres, np.divide(p, s, where=s > 0,
+                                                                             out=np.ones(n)).tolist())]
+    return _figura_desde_plantilla(plantilla, datos_trazas, layout=dict(
+        layout,
+        title=dict(text=f'Triángulos de Potencias - {n} circuitos'),
+        annotations=anotaciones
+    ), rapido=rapido, estilos=[estilo] * n)
+
+
+def _plantilla_flota_desequilibrio():
+    """Construye la plantilla de la vista de flota de corrientes por fase."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=FASES_TRIFASICAS,
+        marker_color=COLORES_FASES,
+        textposition='none',
+        hovertemplate='Fase %{x}: %{y:.2f} A<extra>%{text}</extra>'
+    ))
+    fig.update_layout(template='plotly_white', showlegend=False, bargap=0.15,
+                      margin=dict(t=90, l=50, r=20, b=40))
+    return fig
+
+
+def crear_flota_desequilibrio(corrientes, nombres=None, columnas=5, compartir_ejes=True, rapido=False):
+    """Crea una vista de flota con las corrientes por fase de N circuitos en una sola figura.
+    
+    corrientes es una matriz (N, 3) con las corrientes R, S y T de cada circuito.
+    """
+    corrientes = np.asarray(corrientes, dtype='float64').reshape(-1, 3)
+    n = len(corrientes)
+    nombres = list(nombres) if nombres is not None else [f'Circuito {k + 1}' for k in range(n)]
+    
+    # Promedio y desequilibrio (máxima desviación respecto al promedio) de cada circuito
+    promedios = corrientes.mean(axis=1)
+    desequilibrios = np.divide(np.abs(corrientes - promedios[:, None]).max(axis=1) * 100, promedios,
+                               where=promedios > 0, out=np.zeros(n))
+    
+    layout, referencias, titulos = _rejilla_subgraficos(n, columnas, compartir_ejes)
+    plantilla = _plantilla('flota_desequilibrio', _plantilla_flota_desequilibrio)
+    estilo = plantilla['trazas'][0]
+    datos_trazas = [
+        dict(y=y, text=nombre, xaxis=ref_x, yaxis=ref_y)
+        for y, nombre, (ref_x, ref_y) in zip(corrientes.tolist(), nombres, referencias)
+    ]
+    
+    # Línea del promedio de cada subgráfico
+    lineas = [dict(type='line', xref=f'{ref_x} domain', x0=0, x1=1, yref=ref_y, y0=promedio, y1=promedio,
+                   line=dict(color='red', dash='dash', width=1))
+              for promedio, (ref_x, ref_y) in zip(promedios.tolist(), referencias)]
+    anotaciones = [dict(titulo, text=f'{nombre}<br>{d:.1f}% deseq.')
+                   for titulo, nombre, d in zip(titulos, nombres, desequilibrios.tolist())]
+    return _figura_desde_plantilla(plantilla, datos_trazas, layout=dict(
+        layout,
+        title=dict(text=f'Corrientes por Fase - {n} circuitos'),
+        shapes=lineas,
+        annotations=anotaciones
+    ), rapido=rapido, estilos=[estilo] * n)
@@ -0,0 +1,249 @@
+"""
+Módulo de mantenimiento del histórico
+Rota el archivo activo a segmentos comprimidos y fusiona los segmentos pequeños
+
+Uso desde la línea de comandos:
+    python src/mantenimiento.py                  # una pasada con los umbrales por defecto
+    python src/mantenimiento.py --cada 3600      # una pasada cada hora
+"""
+
+import os
+import gzip
+import time
+import shutil
+import argparse
+
+import pandas as pd
+
+import datos
+from datos import (
+    cargar_manifiesto, guardar_manifiesto, contar_filas_csv, ordenar_columnas,
+    FORMATO_FECHA
+)
+
+
+# Umbrales por defecto
+TAMANO_MAXIMO_ACTIVO = 5 * 1024 * 1024       # bytes del archivo activo antes de rotar
+EDAD_MAXIMA_DIAS = 30                        # días del registro más antiguo antes de rotar
+TAMANO_OBJETIVO_SEGMENTO = 64 * 1024 * 1024  # bytes comprimidos de un segmento fusionado
+
+SUFIJO_ROTACION = '.rotando'
+SUFIJO_SEGMENTO = '.segmento'  # nombre del segmento de la rotación en curso
+
+
+def _nombre_segmento(desde, hasta):
+    """Genera un nombre de segmento único a partir del rango de fechas que contiene."""
+    base = f"historico_{desde:%Y%m%dT%H%M%S}_{hasta:%Y%m%dT%H%M%S}"
+    nombre = f"{base}.csv.gz"
+    contador = 1
+    while os.path.exists(os.path.join(datos.DIRECTORIO_SEGMENTOS, nombre)):
+        nombre = f"{base}_{contador}.csv.gz"
+        contador += 1
+    return nombre
+
+
+def _rango_fechas(archivo):
+    """Retorna la primera y la última fecha registradas en un archivo del histórico."""
+    fechas = pd.to_datetime(pd.read_csv(archivo, usecols=['fecha'])['fecha'], format=FORMATO_FECHA)
+    return fechas.min(), fechas.max()
+
+
+def _edad_dias(archivo):
+    """Retorna la antigüedad en días del primer registro del archivo."""
+    primera = pd.read_csv(archivo, usecols=['fecha'], nrows=1)
+    if primera.empty:
+        return 0
+    fecha = pd.to_datetime(primera['fecha'].iloc[0], format=FORMATO_FECHA)
+    return (pd.Timestamp.now() - fecha).total_seconds() / 86400
+
+
+def _comprimir_segmento(origen):
+    """Comprime un archivo CSV como nuevo segmento y lo registra en el manifiesto.
+
+    El nombre del segmento se anota junto al origen antes de comprimir: si una rotación
+    interrumpida ya lo publicó en el manifiesto, al reanudarla solo se elimina el origen
+    y sus filas no se duplican.
+    """
+    marca = origen + SUFIJO_SEGMENTO
+    nombre = None
+    if os.path.exists(marca):
+        with open(marca, 'r', encoding='utf-8') as f:
+            nombre = f.read().strip()
+        publicado = next((s for s in cargar_manifiesto() if s['archivo'] == nombre), None)
+        if publicado is not None:
+            os.remove(origen)
+            os.remove(marca)
+            return publicado
+
+    desde, hasta = _rango_fechas(origen)
+    if nombre is None:
+        nombre = _nombre_segmento(desde, hasta)
+        with open(marca + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(nombre)
+        os.replace(marca + '.tmp', marca)
+
+    os.makedirs(datos.DIRECTORIO_SEGMENTOS, exist_ok=True)
+    destino = os.path.join(datos.DIRECTORIO_SEGMENTOS, nombre)
+
+    with open(origen, 'rb') as entrada, gzip.open(destino + '.tmp', 'wb') as salida:
+        shutil.copyfileobj(entrada, salida)
+    os.replace(destino + '.tmp', destino)
+
+    segmento = {
+        'archivo': nombre,
+        'filas': contar_filas_csv(origen),
+        'desde': desde.strftime(FORMATO_FECHA),
+        'hasta': hasta.strftime(FORMATO_FECHA),
+        'bytes': os.path.getsize(destino)
+    }
+    with datos.bloqueo_historico():
+        guardar_manifiesto(cargar_manifiesto() + [segmento])
+        os.remove(origen)
+    os.remove(marca)
+    return segmento
+
+
+def rotar_historico(tamano_maximo=TAMANO_MAXIMO_ACTIVO, edad_maxima_dias=EDAD_MAXIMA_DIAS, forzar=False):
+    """Rota el archivo activo a un segmento comprimido si supera el tamaño o la antigüedad.
+
+    El renombrado, la compresión y la publicación en el manifiesto ocurren con el bloqueo
+    del histórico: quien liste sus archivos ve el archivo activo o su segmento, nunca
+    ninguno de los dos ni ambos.
+    """
+    activo = datos.ARCHIVO_HISTORICO
+    en_rotacion = activo + SUFIJO_ROTACION
+
+    with datos.bloqueo_historico():
+        # Completar una rotación interrumpida antes de evaluar el archivo activo
+        if os.path.exists(en_rotacion):
+            _comprimir_segmento(en_rotacion)
+
+        if not os.path.exists(activo) or contar_filas_csv(activo) == 0:
+            return None
+
+        if not (forzar
+                or os.path.getsize(activo) >= tamano_maximo
+                or _edad_dias(activo) >= edad_maxima_dias):
+            return None
+
+        # Una marca sin archivo en rotación quedó de una rotación ya publicada
+        if os.path.exists(en_rotacion + SUFIJO_SEGMENTO):
+            os.remove(en_rotacion + SUFIJO_SEGMENTO)
+        os.replace(activo, en_rotacion)
+        return _comprimir_segmento(en_rotacion)
+
+
+def _fusionar(grupo):
+    """Fusiona varios segmentos consecutivos en uno solo y retorna su entrada de manifiesto."""
+    partes = [
+        pd.read_csv(os.path.join(datos.DIRECTORIO_SEGMENTOS, s['archivo']),
+                    dtype=str, keep_default_na=False)
+        for s in grupo
+    ]
+    df = pd.concat(partes, ignore_index=True).fillna('')
+    df = df.reindex(columns=ordenar_columnas(df.columns), fill_value='')
+
+    desde = pd.to_datetime(grupo[0]['desde'], format=FORMATO_FECHA)
+    hasta = pd.to_datetime(grupo[-1]['hasta'], format=FORMATO_FECHA)
+    nombre = _nombre_segmento(desde, hasta)
+    destino = os.path.join(datos.DIRECTORIO_SEGMENTOS, nombre)
+    df.to_csv(destino + '.tmp', index=False, compression='gzip')
+    os.replace(destino + '.tmp', destino)
+
+    return {
+        'archivo': nombre,
+        'filas': len(df),
+        'desde': grupo[0]['desde'],
+        'hasta': grupo[-1]['hasta'],
+        'bytes': os.path.getsize(destino)
+    }
+
+
+def compactar_segmentos(tamano_objetivo=TAMANO_OBJETIVO_SEGMENTO):
+    """Fusiona segmentos consecutivos pequeños hasta alcanzar el tamaño objetivo."""
+    segmentos = cargar_manifiesto()
+
+    # Agrupar segmentos consecutivos mientras el grupo no alcance el objetivo
+    grupos, actual = [], []
+    for segmento in segmentos:
+        if actual and sum(s['bytes'] for s in actual) + segmento['bytes'] > tamano_objetivo:
+            grupos.append(actual)
+            actual = []
+        actual.append(segmento)
+    if actual:
+        grupos.append(actual)
+
+    if all(len(grupo) == 1 for grupo in grupos):
+        return 0
+
+    nuevos, reemplazados = [], []
+    for grupo in grupos:
+        if len(grupo) == 1:
+            nuevos.append(grupo[0])
+        else:
+            nuevos.append(_fusionar(grupo))
+            reemplazados.extend(grupo)
+
+    # La fusión corre sin bloqueo; el manifiesto se relee con el bloqueo para conservar los
+    # segmentos que una rotación haya publicado mientras tanto
+    with datos.bloqueo_historico():
+        vigentes = cargar_manifiesto()
+        if [s['archivo'] for s in vigentes[:len(segmentos)]] != [s['archivo'] for s in segmentos]:
+            # Otra compactación cambió los segmentos fusionados: descartar esta
+            for segmento in nuevos:
+                if segmento not in segmentos:
+                    os.remove(os.path.join(datos.DIRECTORIO_SEGMENTOS, segmento['archivo']))
+            return 0
+        # Publicar el nuevo manifiesto antes de eliminar los segmentos fusionados
+        guardar_manifiesto(nuevos + vigentes[len(segmentos):])
+    for segmento in reemplazados:
+        os.remove(os.path.join(datos.DIRECTORIO_SEGMENTOS, segmento['archivo']))
+    return len(reemplazados)
+
+
+def ejecutar_mantenimiento(tamano_maximo=TAMANO_MAXIMO_ACTIVO, edad_maxima_dias=EDAD_MAXIMA_DIAS,
+                           tamano_objetivo=TAMANO_OBJETIVO_SEGMENTO, forzar=False):
+    """Ejecuta una pasada completa de rotación y compactación."""
+    rotado = rotar_historico(tamano_maximo, edad_maxima_dias, forzar)
+    fusionados = compactar_segmentos(tamano_objetivo)
+    return {
+        'rotado': rotado['archivo'] if rotado else None,
+        'segmentos_fusionados': fusionados,
+        'segmentos': len(cargar_manifiesto())
+    }
+
+
+def main(argumentos=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Rotación y compactación del histórico de cálculos")
+    parser.add_argument('--directorio', default='.',
+                        help="Directorio donde están el histórico y sus segmentos")
+    parser.add_argument('--max-mb', type=float, default=TAMANO_MAXIMO_ACTIVO / 1024 ** 2,
+                        help="Tamaño del archivo activo que dispara la rotación (MB)")
+    parser.add_argument('--max-dias', type=float, default=EDAD_MAXIMA_DIAS,
+                        help="Antigüedad del primer registro que dispara la rotación (días)")
+    parser.add_argument('--objetivo-mb', type=float, default=TAMANO_OBJETIVO_SEGMENTO / 1024 ** 2,
+                        help="Tamaño comprimido objetivo de los segmentos fusionados (MB)")
+    parser.add_argument('--forzar', action='store_true',
+                        help="Rotar el archivo activo aunque no supere los umbrales")
+    parser.add_argument('--cada', type=float, default=None,
+                        help="Repetir el mantenimiento cada N segundos")
+    args = parser.parse_args(argumentos)
+
+    os.chdir(args.directorio)
+    while True:
+        resultado = ejecutar_mantenimiento(
+            int(args.max_mb * 1024 ** 2), args.max_dias,
+            int(args.objetivo_mb * 1024 ** 2), args.forzar
+        )
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] "
+              f"rotado: {resultado['rotado'] or '-'}, "
+              f"fusionados: {resultado['segmentos_fusionados']}, "
+              f"segmentos: {resultado['segmentos']}")
+        if args.cada is None:
+            break
+        time.sleep(args.cada)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Módulo de perfilado de ejecuciones
+Mide la duración de cada fase de una ejecución de app.py (widgets de entrada, cálculos,
+análisis, constructores de gráficos, envío de gráficos y guardado del histórico) para
+mostrarla como cascada en la barra lateral y registrarla en un log rotativo
+"""
+
+import os
+import json
+import time
+import logging
+import datetime
+import functools
+import threading
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+
+ARCHIVO_PERFIL = os.environ.get('OHM_PERFIL_LOG', 'perfil_ejecuciones.log')
+TAMANO_MAXIMO_LOG = 1024 * 1024
+RESPALDOS_LOG = 3
+
+# Fases medidas: prefijo del nombre de la función -> categoría
+FASES_APP = {
+    'calcular_desequilibrio': 'análisis',
+    'analizar_': 'análisis',
+    'calcular_': 'cálculo',
+    'crear_': 'gráfico',
+    'guardar_historico': 'histórico'
+}
+FASES_STREAMLIT = {
+    'number_input': 'entrada',
+    'radio': 'entrada',
+    'selectbox': 'entrada',
+    'select_slider': 'entrada',
+    'file_uploader': 'entrada',
+    'toggle': 'entrada',
+    'plotly_chart': 'envío'
+}
+
+# Cada sesión de Streamlit se ejecuta en su propio hilo
+_local = threading.local()
+_bloqueo = threading.Lock()
+_registradores = {}
+
+
+class PerfilEjecucion:
+    """Tramos medidos durante una ejecución, con su inicio relativo y su nivel de anidación."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fin = None
+        self.tramos = []
+        self._nivel = 0
+
+    @contextmanager
+    def medir(self, nombre, categoria):
+        """Mide el bloque como un tramo; los tramos internos quedan con un nivel más."""
+        tramo = {
+            'nombre': nombre,
+            'categoria': categoria,
+            'nivel': self._nivel,
+            'inicio_ms': (time.perf_counter() - self.inicio) * 1000
+        }
+        self.tramos.append(tramo)
+        self._nivel += 1
+        try:
+            yield tramo
+        finally:
+            self._nivel -= 1
+            tramo['duracion_ms'] = (time.perf_counter() - self.inicio) * 1000 - tramo['inicio_ms']
+
+    def terminar(self):
+        """Fija el fin del perfil."""
+        self.fin = time.perf_counter()
+
+    def total_ms(self):
+        """Duración del perfil (hasta ahora, si no ha terminado)."""
+        return ((self.fin or time.perf_counter()) - self.inicio) * 1000
+
+    def totales_por_categoria(self):
+        """Suma la duración de los tramos de cada categoría (sin contar los anidados en la misma)."""
+        totales = {}
+        abiertos = []
+        for tramo in self.tramos:
+            # Tramos de la misma categoría dentro de otro ya contado (p. ej. calcular_ en calcular_)
+            abiertos = [t for t in abiertos if t['nivel'] < tramo['nivel']]
+            if not any(t['categoria'] == tramo['categoria'] for t in abiertos):
+                totales[tramo['categoria']] = totales.get(tramo['categoria'], 0.0) + tramo.get('duracion_ms', 0.0)
+            abiertos.append(tramo)
+        return totales
+
+
+def iniciar_perfil():
+    """Inicia el perfil de la ejecución actual (del hilo actual) y lo retorna."""
+    _local.perfil = PerfilEjecucion()
+    return _local.perfil
+
+
+def perfil_actual():
+    """Retorna el perfil activo del hilo actual, o None si no se está perfilando."""
+    return getattr(_local, 'perfil', None)
+
+
+def finalizar_perfil(archivo=ARCHIVO_PERFIL):
+    """Termina el perfil activo, lo registra en el log y lo retorna (None si no había)."""
+    perfil = perfil_actual()
+    _local.perfil = None
+    if perfil is not None:
+        perfil.terminar()
+        registrar_perfil(perfil, archivo)
+    return perfil
+
+
+@contextmanager
+def medir(nombre, categoria):
+    """Mide un bloque en el perfil activo; sin perfil activo no hace nada."""
+    perfil = perfil_actual()
+    if perfil is None:
+        yield None
+    else:
+        with perfil.medir(nombre, categoria) as tramo:
+            yield tramo
+
+
+def medido(funcion, categoria, nombre=None):
+    """Envuelve una función para medir cada llamada hecha con un perfil activo."""
+    nombre = nombre or funcion.__name__
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        perfil = perfil_actual()
+        if perfil is None:
+            return funcion(*args, **kwargs)
+        with perfil.medir(nombre, categoria):
+            return funcion(*args, **kwargs)
+
+    envoltura.__perfilado__ = True
+    return envoltura
+
+
+def instrumentar(espacio, fases, prefijo_nombre=''):
+    """Envuelve con medido() las funciones del espacio (dict de globals o vars(módulo)).
+
+    Las funciones se eligen por el prefijo de su nombre según fases (prefijo -> categoría,
+    gana el primero que coincide). Es idempotente y, sin un perfil activo, las envolturas
+    solo llaman a la función original, por lo que puede aplicarse a módulos compartidos.
+    Retorna la cantidad de funciones envueltas.
+    """
+    envueltas = 0
+    for nombre, valor in list(espacio.items()):
+        if not callable(valor) or getattr(valor, '__perfilado__', False) or isinstance(valor, type):
+            continue
+        categoria = next((c for p, c in fases.items() if nombre.startswith(p)), None)
+        if categoria is not None:
+            espacio[nombre] = medido(valor, categoria, prefijo_nombre + nombre)
+            envueltas += 1
+    return envueltas
+
+
+def _obtener_registrador(archivo):
+    """Crea una vez por archivo el logger con el archivo rotativo de perfiles."""
+    ruta = os.path.abspath(archivo)
+    with _bloqueo:
+        if ruta not in _registradores:
+            registrador = logging.getLogger(f'ohm.perfil.{len(_registradores)}')
+            registrador.setLevel(logging.INFO)
+            registrador.propagate = False
+            manejador = RotatingFileHandler(ruta, maxBytes=TAMANO_MAXIMO_LOG,
+                                            backupCount=RESPALDOS_LOG, encoding='utf-8', delay=True)
+            manejador.setFormatter(logging.Formatter('%(message)s'))
+            registrador.addHandler(manejador)
+            _registradores[ruta] = registrador
+        return _registradores[ruta]
+
+
+def registrar_perfil(perfil, archivo=ARCHIVO_PERFIL):
+    """Escribe el perfil como una línea JSON en el log rotativo."""
+    _obtener_registrador(archivo).info(json.dumps({
+        'fecha': datetime.datetime.now().isoformat(timespec='milliseconds'),
+        'total_ms': round(perfil.total_ms(), 3),
+        'totales_ms': {c: round(d, 3) for c, d in perfil.totales_por_categoria().items()},
+        'tramos': [
+            dict(t, inicio_ms=round(t['inicio_ms'], 3), duracion_ms=round(t.get('duracion_ms', 0.0), 3))
+            for t in perfil.tramos
+        ]
+    }, ensure_ascii=False))
+
+
+def leer_perfiles(archivo=ARCHIVO_PERFIL):
+    """Lee los perfiles del log (y sus respaldos rotados, del más antiguo al más nuevo)."""
+    archivos = [f"{archivo}.{i}" for i in range(RESPALDOS_LOG, 0, -1)] + [archivo]
+    perfiles = []
+    for ruta in archivos:
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as f:
+                perfiles.extend(json.loads(linea) for linea in f if linea.strip())
+    return perfiles
@@ -0,0 +1,246 @@
+"""
+Módulo de procesamiento de lecturas por lotes sin Streamlit
+Lee archivos CSV o Parquet de millones de lecturas por bloques, reparte los bloques entre
+un pool de procesos que los calculan con calculos_vectorizados.py y escribe los
+resultados a medida que llegan, en el mismo orden de la entrada
+
+Uso desde la línea de comandos:
+    python src/procesamiento_lote.py lecturas.csv resultados.csv
+    python src/procesamiento_lote.py lecturas.parquet resultados.parquet --tipo estrella --procesos 8
+    python src/procesamiento_lote.py lecturas.csv resultados.csv --filas-bloque 500000 --historico
+"""
+
+import io
+import os
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# pyarrow es opcional: se necesita para Parquet y acelera la escritura de CSV
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
+from calculos_vectorizados import procesar_lecturas, TIPOS_CIRCUITO
+
+
+FILAS_POR_BLOQUE = 200_000
+
+# Bloques enviados al pool por proceso antes de esperar resultados (limita la memoria)
+BLOQUES_EN_VUELO = 2
+
+# cálculo y codificación se suman entre procesos; las demás etapas son del proceso principal
+ETAPAS = ['lectura', 'cálculo', 'codificación', 'espera', 'escritura', 'histórico']
+
+
+def _es_parquet(ruta):
+    """Indica si la ruta corresponde a un archivo Parquet."""
+    return str(ruta).lower().endswith(('.parquet', '.pq'))
+
+
+def leer_bloques(ruta, filas_bloque=FILAS_POR_BLOQUE, separador=','):
+    """Lee un archivo CSV o Parquet por bloques de DataFrame, sin cargarlo completo."""
+    if _es_parquet(ruta):
+        if not PYARROW_DISPONIBLE:
+            raise ImportError("Para leer archivos Parquet se requiere pyarrow: pip install pyarrow")
+        for lote in pq.ParquetFile(ruta).iter_batches(batch_size=filas_bloque):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(ruta, sep=separador, chunksize=filas_bloque, low_memory=False)
+
+
+def codificar_csv(df, encabezado=True):
+    """Codifica un DataFrame como bytes CSV (con pyarrow si está disponible, más rápido)."""
+    if PYARROW_DISPONIBLE:
+        destino = io.BytesIO()
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), destino,
+                         pa_csv.WriteOptions(include_header=encabezado))
+        return destino.getvalue()
+    return df.to_csv(index=False, header=encabezado).encode('utf-8')
+
+
+def _calcular_bloque(bloque, tipo, csv=False, encabezado=False, conservar=True):
+    """Calcula un bloque de lecturas (en un proceso del pool).
+
+    Con csv=True el bloque se codifica aquí, en paralelo con los demás, y el proceso
+    principal solo escribe los bytes; la tabla se retorna solo si conservar=True.
+    """
+    inicio = time.perf_counter()
+    resultado = procesar_lecturas(bloque, tipo)
+    calculo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    contenido = codificar_csv(resultado, encabezado) if csv else None
+    return {
+        'filas': len(resultado),
+        'errores': int((resultado['error'] != '').sum()),
+        'tabla': resultado if conservar else None,
+        'csv': contenido,
+        'cálculo': calculo,
+        'codificación': time.perf_counter() - inicio
+    }
+
+
+class _Escritor:
+    """Escribe los bloques de resultados (bytes CSV o tablas Parquet) a medida que llegan."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.parquet = _es_parquet(ruta)
+        if self.parquet and not PYARROW_DISPONIBLE:
+            raise ImportError("Para escribir archivos Parquet se requiere pyarrow: pip install pyarrow")
+        self._escritor = None
+        self._archivo = None
+
+    def _esquema(self, tabla):
+        """Esquema del archivo a partir del primer bloque.
+
+        Las columnas vacías (nulas) se escriben como texto y las enteras como float64, ya
+        que un bloque posterior puede traer en ellas valores o decimales.
+        """
+        esquema = tabla.schema
+        for i, campo in enumerate(esquema):
+            if pa.types.is_null(campo.type):
+                esquema = esquema.set(i, pa.field(campo.name, pa.string()))
+            elif pa.types.is_integer(campo.type):
+                esquema = esquema.set(i, pa.field(campo.name, pa.float64()))
+        return esquema
+
+    def escribir(self, bloque):
+        if self.parquet:
+            tabla = pa.Table.from_pandas(bloque['tabla'], preserve_index=False)
+            if self._escritor is None:
+                self._escritor = pq.ParquetWriter(self.ruta, self._esquema(tabla))
+            # Cada bloque infiere sus propios tipos: se convierten a los del archivo
+            esquema = self._escritor.schema
+            self._escritor.write_table(tabla.select(esquema.names).cast(esquema))
+        else:
+            if self._archivo is None:
+                self._archivo = open(self.ruta, 'wb')
+            self._archivo.write(bloque['csv'])
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+        if self._archivo is not None:
+            self._archivo.close()
+
+
+def procesar_archivo(entrada, salida, tipo=None, procesos=1, filas_bloque=FILAS_POR_BLOQUE,
+                     separador=',', historico=False):
+    """Calcula todas las lecturas de un archivo y escribe los resultados en otro.
+
+    Con procesos > 1 los bloques se calculan en un pool de procesos; se mantienen a lo sumo
+    BLOQUES_EN_VUELO bloques por proceso pendientes y los resultados se escriben en el orden
+    de la entrada. Con historico=True las lecturas válidas se agregan además al histórico.
+    Retorna las filas, las filas con error, los segundos por etapa y las filas por segundo.
+    """
+    if tipo is not None and tipo not in TIPOS_CIRCUITO:
+        raise ValueError(f"Tipo de circuito no soportado: {tipo} (use {', '.join(TIPOS_CIRCUITO)})")
+    if historico:
+        # datos (y con él streamlit) solo se importa si se guarda en el histórico
+        from datos import guardar_historico_lote
+
+    tiempos = dict.fromkeys(ETAPAS, 0.0)
+    totales = {'filas': 0, 'errores': 0, 'bloques': 0}
+    escritor = _Escritor(salida)
+
+    def leer():
+        bloques = leer_bloques(entrada, filas_bloque, separador)
+        while True:
+            inicio = time.perf_counter()
+            bloque = next(bloques, None)
+            tiempos['lectura'] += time.perf_counter() - inicio
+            if bloque is None:
+                return
+            yield bloque
+
+    def esperar(futuro):
+        inicio = time.perf_counter()
+        resultado = futuro.result()
+        tiempos['espera'] += time.perf_counter() - inicio
+        return resultado
+
+    def guardar(resultado):
+        tiempos['cálculo'] += resultado['cálculo']
+        tiempos['codificación'] += resultado['codificación']
+        inicio = time.perf_counter()
+        escritor.escribir(resultado)
+        tiempos['escritura'] += time.perf_counter() - inicio
+        totales['filas'] += resultado['filas']
+        totales['errores'] += resultado['errores']
+        totales['bloques'] += 1
+        if historico and resultado['errores'] < resultado['filas']:
+            tabla = resultado['tabla']
+            inicio = time.perf_counter()
+            guardar_historico_lote(tabla.loc[tabla['error'] == ''].drop(columns=['error', 'consumo']))
+            tiempos['histórico'] += time.perf_counter() - inicio
+
+    # El primer bloque lleva el encabezado del CSV; la tabla solo viaja si se necesita
+    conservar = escritor.parquet or historico
+    tareas = ((bloque, tipo, not escritor.parquet, i == 0, conservar) for i, bloque in enumerate(leer()))
+    inicio_total = time.perf_counter()
+    try:
+        if procesos <= 1:
+            for tarea in tareas:
+                guardar(_calcular_bloque(*tarea))
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                # Mantener el pool ocupado sin leer todo el archivo en memoria
+                pendientes = deque()
+                for tarea in tareas:
+                    pendientes.append(pool.submit(_calcular_bloque, *tarea))
+                    if len(pendientes) >= procesos * BLOQUES_EN_VUELO:
+                        guardar(esperar(pendientes.popleft()))
+                while pendientes:
+                    guardar(esperar(pendientes.popleft()))
+    finally:
+        escritor.cerrar()
+
+    segundos = time.perf_counter() - inicio_total
+    return dict(totales, **{
+        'segundos': segundos,
+        'filas_por_segundo': totales['filas'] / segundos if segundos > 0 else 0.0,
+        'tiempos': tiempos,
+        'salida': str(salida)
+    })
+
+
+def main(argumentos=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Cálculo por lotes de archivos de lecturas (CSV o Parquet)")
+    parser.add_argument('entrada', help="Archivo de lecturas .csv o .parquet")
+    parser.add_argument('salida', help="Archivo de resultados .csv o .parquet")
+    parser.add_argument('--tipo', choices=TIPOS_CIRCUITO, default=None,
+                        help="Tipo de circuito de todas las lecturas (por defecto, columna tipo o deducido)")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                        help="Procesos calculadores (1 para calcular en el proceso principal)")
+    parser.add_argument('--filas-bloque', type=int, default=FILAS_POR_BLOQUE,
+                        help="Lecturas por bloque enviado a cada proceso")
+    parser.add_argument('--separador', default=',', help="Separador de columnas del CSV")
+    parser.add_argument('--historico', action='store_true',
+                        help="Agregar también las lecturas válidas al histórico")
+    args = parser.parse_args(argumentos)
+
+    resultado = procesar_archivo(args.entrada, args.salida, args.tipo, args.procesos,
+                                 args.filas_bloque, args.separador, args.historico)
+    print(f"{resultado['filas']:,} lecturas ({resultado['errores']:,} con error) en "
+          f"{resultado['bloques']} bloques escritas en {resultado['salida']} en "
+          f"{resultado['segundos']:.1f} s ({resultado['filas_por_segundo']:,.0f} filas/s)")
+    for etapa in ETAPAS:
+        if resultado['tiempos'][etapa]:
+            print(f"  {etapa:<13} {resultado['tiempos'][etapa]:>8.2f} s")
+    if args.procesos > 1:
+        print("  (cálculo y codificación suman el tiempo de todos los procesos)")
+    return resultado
+
+
+if __name__ == '__main__':
+    main()
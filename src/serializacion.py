@@ -0,0 +1,203 @@
+"""
+Módulo de serialización compacta de gráficos
+Reduce el tamaño del JSON de las figuras: redondea los arreglos numéricos a la
+precisión de visualización, mueve a meta el customdata repetido en todos los puntos
+y, si el plotly.js incluido lo soporta, codifica los arreglos como binario base64
+"""
+
+import base64
+
+import numpy as np
+
+from graficos import figura_a_json
+
+
+CIFRAS_VISUALIZACION = 6
+
+# plotly.js acepta arreglos tipados {dtype, bdata, shape} desde la versión 2.28
+VERSION_MINIMA_BINARIO = (2, 28)
+
+# Arreglos más cortos se dejan como listas: la cabecera del binario no compensa
+TAMANO_MINIMO_BINARIO = 16
+
+# Tipos de numpy y su código en la especificación de arreglos tipados de plotly.js
+CODIGOS_BINARIOS = {
+    'float32': 'f4', 'float64': 'f8',
+    'int8': 'i1', 'int16': 'i2', 'int32': 'i4',
+    'uint8': 'u1', 'uint16': 'u2', 'uint32': 'u4'
+}
+
+# Atributos de texto que pueden referirse al customdata de cada punto
+PLANTILLAS_TEXTO = ['hovertemplate', 'texttemplate']
+
+
+def binario_disponible():
+    """Indica si el plotly.js incluido con plotly soporta arreglos tipados en base64."""
+    # plotly.offline carga IPython si está instalado: se difiere hasta que se necesita
+    import plotly.offline
+    
+    version = tuple(int(p) for p in plotly.offline.get_plotlyjs_version().split('.')[:2])
+    return version >= VERSION_MINIMA_BINARIO
+
+
+def _como_arreglo(valor):
+    """Convierte una lista o arreglo numérico a numpy (None pasa a NaN); None si no es numérico."""
+    if isinstance(valor, np.ndarray):
+        arreglo = valor
+    elif isinstance(valor, (list, tuple)) and valor:
+        try:
+            arreglo = np.asarray(valor)
+        except ValueError:
+            # Listas anidadas de distinto largo
+            return None
+    else:
+        return None
+
+    if arreglo.dtype.kind == 'O':
+        # Listas con cortes (None) entre segmentos
+        try:
+            arreglo = arreglo.astype('float64')
+        except (TypeError, ValueError):
+            return None
+    if arreglo.dtype.kind not in 'iuf':
+        return None
+    return arreglo
+
+
+def redondear_arreglo(arreglo, cifras=CIFRAS_VISUALIZACION):
+    """Redondea un arreglo a cifras significativas respecto a su mayor valor absoluto."""
+    if arreglo.dtype.kind != 'f':
+        return arreglo
+    # En float32 el valor redondeado no es exacto y tolist() lo escribiría con 17 cifras
+    arreglo = arreglo.astype('float64')
+    finitos = np.abs(arreglo[np.isfinite(arreglo)])
+    if finitos.size == 0 or finitos.max() == 0:
+        return arreglo
+    decimales = cifras - 1 - int(np.floor(np.log10(finitos.max())))
+    return np.round(arreglo, decimales)
+
+
+def _tipo_entero_minimo(arreglo):
+    """Retorna el tipo entero más pequeño que contiene todos los valores del arreglo."""
+    minimo, maximo = int(arreglo.min(initial=0)), int(arreglo.max(initial=0))
+    for tipo in ('uint8', 'int8', 'uint16', 'int16', 'uint32', 'int32'):
+        limites = np.iinfo(tipo)
+        if limites.min <= minimo and maximo <= limites.max:
+            return tipo
+    return 'float64'
+
+
+def codificar_binario(arreglo, cifras=CIFRAS_VISUALIZACION):
+    """Codifica un arreglo numérico como arreglo tipado de plotly.js ({dtype, bdata, shape})."""
+    if arreglo.dtype.kind == 'f':
+        # float32 conserva unas 7 cifras significativas
+        arreglo = arreglo.astype('float32' if cifras <= 7 else 'float64')
+    else:
+        arreglo = arreglo.astype(_tipo_entero_minimo(arreglo))
+    arreglo = np.ascontiguousarray(arreglo)
+    resultado = {
+        'dtype': CODIGOS_BINARIOS[str(arreglo.dtype)],
+        'bdata': base64.b64encode(arreglo.tobytes()).decode('ascii')
+    }
+    if arreglo.ndim > 1:
+        resultado['shape'] = ','.join(str(d) for d in arreglo.shape)
+    return resultado
+
+
+def _restaurar_cortes(original, arreglo):
+    """Convierte un arreglo redondeado a lista, devolviendo los None del original."""
+    lista = arreglo.tolist()
+    if isinstance(original, list) and arreglo.ndim == 1:
+        return [None if o is None else v for o, v in zip(original, lista)]
+    return lista
+
+
+def _mover_customdata_a_meta(traza):
+    """Reemplaza el customdata idéntico en todos los puntos por meta en las plantillas de texto."""
+    customdata = traza.get('customdata')
+    if customdata is None or 'meta' in traza or len(customdata) == 0:
+        return
+    # En las rejillas (heatmap, contour) customdata tiene un valor por celda, no por punto
+    if np.ndim(traza.get('z')) > 1:
+        return
+    primera = customdata[0]
+    if isinstance(customdata, np.ndarray) and customdata.dtype != object:
+        iguales = (customdata == primera).all()
+    else:
+        iguales = all(np.array_equal(fila, primera) for fila in customdata)
+    if not iguales:
+        return
+
+    meta = primera.tolist() if isinstance(primera, (np.ndarray, np.generic)) else primera
+    for atributo in PLANTILLAS_TEXTO:
+        if isinstance(traza.get(atributo), str):
+            traza[atributo] = traza[atributo].replace('%{customdata', '%{meta')
+    traza['meta'] = meta
+    del traza['customdata']
+
+
+def _compactar_valor(valor, cifras, binario):
+    """Compacta recursivamente los arreglos numéricos de una traza."""
+    if isinstance(valor, dict):
+        return {k: _compactar_valor(v, cifras, binario) for k, v in valor.items()}
+    arreglo = _como_arreglo(valor)
+    if arreglo is None:
+        return valor
+    from plotly.io.json import to_json_plotly
+
+    arreglo = redondear_arreglo(arreglo, cifras)
+    candidatos = [_restaurar_cortes(valor, arreglo)]
+    if binario and arreglo.size >= TAMANO_MINIMO_BINARIO:
+        candidatos.append(codificar_binario(arreglo, cifras))
+    # Ninguna forma es siempre menor (celdas vacías, enteros pequeños, el escape de los '/'
+    # del base64, valores ya cortos): comparar ya serializados y conservar el original si gana
+    tamanos = [len(to_json_plotly(c)) for c in candidatos]
+    mejor = int(np.argmin(tamanos))
+    return candidatos[mejor] if tamanos[mejor] < len(to_json_plotly(valor)) else valor
+
+
+def _compactar_traza(traza, cifras, binario):
+    """Retorna una copia compacta de una traza."""
+    traza = dict(traza)
+    _mover_customdata_a_meta(traza)
+    return {k: v if k in ('type', 'meta') else _compactar_valor(v, cifras, binario)
+            for k, v in traza.items()}
+
+
+def compactar_figura(figura, cifras=CIFRAS_VISUALIZACION, binario=None):
+    """Retorna el dict compacto de una figura (go.Figure o dict de la ruta rápida).
+
+    Redondea los arreglos de las trazas y cuadros a cifras significativas, mueve a meta
+    el customdata repetido y, con binario=True (por defecto, si plotly.js lo soporta),
+    codifica los arreglos como base64. La salida binaria está pensada para exportar
+    JSON o HTML; Streamlit vuelve a validar los dict, por lo que ahí se usa binario=False.
+    """
+    if hasattr(figura, 'to_plotly_json'):
+        figura = figura.to_plotly_json()
+    if binario is None:
+        binario = binario_disponible()
+
+    compacta = dict(figura)
+    compacta['data'] = [_compactar_traza(t, cifras, binario) for t in figura.get('data', [])]
+    if figura.get('frames'):
+        compacta['frames'] = [
+            dict(cuadro, data=[_compactar_traza(t, cifras, binario) for t in cuadro.get('data', [])])
+            for cuadro in figura['frames']
+        ]
+    return compacta
+
+
+def tamano_json(figura):
+    """Retorna el tamaño en bytes del JSON de una figura."""
+    return len(figura_a_json(figura).encode('utf-8'))
+
+
+def reporte_compactacion(figura, cifras=CIFRAS_VISUALIZACION, binario=None):
+    """Compacta una figura y reporta los bytes del JSON antes y después."""
+    compacta = compactar_figura(figura, cifras, binario)
+    antes, despues = tamano_json(figura), tamano_json(compacta)
+    return compacta, {
+        'bytes_antes': antes,
+        'bytes_despues': despues,
+        'reduccion_porcentaje': (1 - despues / antes) * 100 if antes else 0.0
+    }
@@ -0,0 +1,431 @@
+"""
+Módulo de sondeo de medidores
+Lee periódicamente, con asyncio y desde un solo proceso, miles de medidores trifásicos por
+un protocolo TCP de líneas de texto, y calcula las lecturas por lotes con
+calculos_vectorizados.py (sistema trifásico y desequilibrio de corrientes). Incluye un
+simulador local de medidores que atiende el mismo protocolo
+
+Protocolo (una línea ASCII por petición y por respuesta, sobre conexiones persistentes):
+    petición:  LEER <unidad>
+    respuesta: <unidad> <Y|D> <voltaje_linea> <corriente_r> <corriente_s> <corriente_t> <factor_potencia>
+    error:     ERROR <mensaje>
+
+Uso desde la línea de comandos:
+    python src/sondeo.py simulador --puerto 9600 --unidades 5000
+    python src/sondeo.py sondear --destino 127.0.0.1:9600 --unidades 5000 --intervalo 1 --rondas 10
+    python src/sondeo.py sondear --simulador --unidades 2000 --rondas 5 --salida lecturas.csv
+"""
+
+import time
+import random
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from calculos_vectorizados import procesar_lecturas
+from esquema import FORMATO_FECHA
+
+
+PUERTO_SIMULADOR = 9600
+
+CONEXIONES_POR_DESTINO = 32
+TIEMPO_CONEXION = 2.0
+TIEMPO_LECTURA = 1.0
+
+# Espera tras fallos consecutivos de un medidor: inicial * 2^(fallos-1), hasta el máximo
+BACKOFF_INICIAL = 0.5
+BACKOFF_MAXIMO = 30.0
+
+# Lecturas acumuladas antes de calcularlas juntas
+LECTURAS_POR_LOTE = 5000
+
+CONEXIONES = {'Y': 'estrella', 'D': 'delta'}
+COLUMNAS_LECTURA = ['medidor', 'tipo', 'voltaje', 'corriente_r', 'corriente_s', 'corriente_t', 'coseno_fi', 'fecha']
+CONTADORES = ['leidos', 'fallos', 'tiempos_agotados', 'en_espera', 'lotes']
+
+
+class ErrorMedidor(ValueError):
+    """El medidor respondió con un error o con una línea que no respeta el protocolo."""
+
+
+def interpretar_respuesta(linea, unidad):
+    """Convierte una línea de respuesta en (conexión, voltaje de línea, ir, is, it, factor de potencia)."""
+    partes = linea.decode('ascii', errors='replace').split()
+    if partes and partes[0] == 'ERROR':
+        raise ErrorMedidor(' '.join(partes[1:]) or "Error del medidor")
+    if len(partes) != 7 or partes[0] != str(unidad) or partes[1] not in CONEXIONES:
+        raise ErrorMedidor(f"Respuesta inválida del medidor {unidad}: {linea[:80]!r}")
+    try:
+        return (CONEXIONES[partes[1]],) + tuple(float(valor) for valor in partes[2:])
+    except ValueError:
+        raise ErrorMedidor(f"Respuesta inválida del medidor {unidad}: {linea[:80]!r}") from None
+
+
+def calcular_lecturas_medidores(lecturas):
+    """Calcula por lotes una lista de lecturas (tuplas en el orden de COLUMNAS_LECTURA).
+
+    La corriente de línea es el promedio de las tres fases. Retorna el DataFrame de
+    procesar_lecturas con la columna medidor al inicio.
+    """
+    df = pd.DataFrame(lecturas, columns=COLUMNAS_LECTURA)
+    df['corriente'] = df[['corriente_r', 'corriente_s', 'corriente_t']].mean(axis=1)
+    resultado = procesar_lecturas(df)
+    resultado.insert(0, 'medidor', df['medidor'])
+    return resultado
+
+
+def medidores_de(destinos, unidades):
+    """Lista de medidores con las unidades 1..unidades de cada destino (host, puerto)."""
+    return [
+        {'nombre': f"{host}:{puerto}/{unidad}", 'host': host, 'puerto': puerto, 'unidad': unidad}
+        for host, puerto in destinos
+        for unidad in range(1, unidades + 1)
+    ]
+
+
+class GrupoConexiones:
+    """Conexiones persistentes a un destino, con un máximo de conexiones en uso a la vez."""
+
+    def __init__(self, host, puerto, maximo=CONEXIONES_POR_DESTINO, tiempo_conexion=TIEMPO_CONEXION):
+        self.host = host
+        self.puerto = puerto
+        self.tiempo_conexion = tiempo_conexion
+        self.abiertas = 0
+        self.creadas = 0
+        self._libres = []
+        self._cupo = asyncio.Semaphore(maximo)
+
+    @asynccontextmanager
+    async def conexion(self):
+        """Presta una conexión (lector, escritor); si el bloque falla, la conexión se descarta."""
+        async with self._cupo:
+            conexion = None
+            while self._libres and conexion is None:
+                conexion = self._libres.pop()
+                if conexion[1].is_closing() or conexion[0].at_eof():
+                    self._descartar(conexion)
+                    conexion = None
+            if conexion is None:
+                conexion = await asyncio.wait_for(asyncio.open_connection(self.host, self.puerto),
+                                                  self.tiempo_conexion)
+                self.abiertas += 1
+                self.creadas += 1
+            try:
+                yield conexion
+            except BaseException:
+                self._descartar(conexion)
+                raise
+            self._libres.append(conexion)
+
+    def _descartar(self, conexion):
+        conexion[1].close()
+        self.abiertas -= 1
+
+    def cerrar(self):
+        """Cierra las conexiones libres."""
+        while self._libres:
+            self._descartar(self._libres.pop())
+
+
+class Sondeador:
+    """Sondea una lista de medidores por rondas y calcula sus lecturas por lotes.
+
+    Cada destino tiene un GrupoConexiones; en cada ronda tantos lectores como conexiones
+    recorren sus medidores. Un medidor que falla (conexión, tiempo agotado o error) no se
+    vuelve a leer hasta que pasa su espera exponencial con variación aleatoria.
+
+    Los lotes se calculan y se entregan a al_calcular en un hilo aparte, uno a la vez y
+    en orden, para que el cálculo y el guardado no detengan las lecturas en curso.
+    """
+
+    def __init__(self, medidores, conexiones=CONEXIONES_POR_DESTINO, tiempo_lectura=TIEMPO_LECTURA,
+                 tiempo_conexion=TIEMPO_CONEXION, lote=LECTURAS_POR_LOTE, al_calcular=None,
+                 backoff_inicial=BACKOFF_INICIAL, backoff_maximo=BACKOFF_MAXIMO):
+        self.medidores = medidores
+        self.conexiones = conexiones
+        self.tiempo_lectura = tiempo_lectura
+        self.lote = lote
+        self.al_calcular = al_calcular
+        self.backoff_inicial = backoff_inicial
+        self.backoff_maximo = backoff_maximo
+        self.grupos = {}
+        self.por_destino = {}
+        for medidor in medidores:
+            destino = (medidor['host'], medidor['puerto'])
+            if destino not in self.grupos:
+                self.grupos[destino] = GrupoConexiones(*destino, conexiones, tiempo_conexion)
+                self.por_destino[destino] = []
+            self.por_destino[destino].append(medidor)
+        self.esperas = {}
+        self.ultimo = None
+        self._pendientes = []
+        self._contadores = dict.fromkeys(CONTADORES, 0)
+        self._calculo = ThreadPoolExecutor(max_workers=1)
+
+    def _registrar_fallo(self, medidor, contador):
+        """Cuenta el fallo y programa el próximo intento del medidor."""
+        self._contadores[contador] += 1
+        fallos = self.esperas.get(medidor['nombre'], (0, 0.0))[0] + 1
+        espera = min(self.backoff_maximo, self.backoff_inicial * 2 ** (fallos - 1)) * random.uniform(0.5, 1.0)
+        self.esperas[medidor['nombre']] = (fallos, time.monotonic() + espera)
+
+    async def leer(self, medidor, grupo):
+        """Lee un medidor y acumula su lectura; retorna False si falló o está en espera."""
+        espera = self.esperas.get(medidor['nombre'])
+        if espera is not None and espera[1] > time.monotonic():
+            self._contadores['en_espera'] += 1
+            return False
+        try:
+            async with grupo.conexion() as (lector, escritor):
+                escritor.write(f"LEER {medidor['unidad']}\n".encode('ascii'))
+                linea = await asyncio.wait_for(lector.readline(), self.tiempo_lectura)
+                if not linea:
+                    raise ConnectionResetError("El medidor cerró la conexión")
+            lectura = interpretar_respuesta(linea, medidor['unidad'])
+        except asyncio.TimeoutError:
+            # Desde Python 3.11 es TimeoutError, subclase de OSError: debe atenderse antes
+            self._registrar_fallo(medidor, 'tiempos_agotados')
+            return False
+        except (OSError, ValueError):
+            # ValueError incluye ErrorMedidor y la línea que supera el límite de readline;
+            # en ese caso la conexión ya se descartó al salir del bloque
+            self._registrar_fallo(medidor, 'fallos')
+            return False
+
+        self.esperas.pop(medidor['nombre'], None)
+        self._contadores['leidos'] += 1
+        self._pendientes.append((medidor['nombre'],) + lectura + (time.time(),))
+        if len(self._pendientes) >= self.lote:
+            await self._calcular()
+        return True
+
+    async def _calcular(self):
+        """Calcula las lecturas pendientes como un lote en el hilo de cálculo."""
+        lecturas, self._pendientes = self._pendientes, []
+        if not lecturas:
+            return
+        self._contadores['lotes'] += 1
+        self.ultimo = await asyncio.get_running_loop().run_in_executor(self._calculo, self._procesar, lecturas)
+
+    def _procesar(self, lecturas):
+        """Calcula un lote de lecturas, lo entrega a al_calcular y lo retorna."""
+        resultado = calcular_lecturas_medidores(lecturas)
+        # Hora local de cada lectura, como en el resto del histórico
+        fechas = pd.to_datetime(resultado['fecha'] + time.localtime().tm_gmtoff, unit='s')
+        resultado['fecha'] = fechas.dt.strftime(FORMATO_FECHA)
+        if self.al_calcular is not None:
+            self.al_calcular(resultado)
+        return resultado
+
+    async def _lector(self, medidores, grupo):
+        for medidor in medidores:
+            await self.leer(medidor, grupo)
+
+    async def sondear(self):
+        """Lee una vez todos los medidores y retorna los contadores y la duración de la ronda."""
+        self._contadores = dict.fromkeys(CONTADORES, 0)
+        inicio = time.perf_counter()
+        lectores = []
+        for destino, medidores in self.por_destino.items():
+            # Los lectores comparten el iterador: cada medidor se lee una sola vez
+            pendientes = iter(medidores)
+            lectores.extend(self._lector(pendientes, self.grupos[destino])
+                            for _ in range(min(self.conexiones, len(medidores))))
+        await asyncio.gather(*lectores)
+        await self._calcular()
+        segundos = time.perf_counter() - inicio
+        return dict(self._contadores, **{
+            'medidores': len(self.medidores),
+            'segundos': segundos,
+            'lecturas_por_segundo': self._contadores['leidos'] / segundos if segundos > 0 else 0.0,
+            'conexiones_abiertas': sum(grupo.abiertas for grupo in self.grupos.values()),
+            'conexiones_creadas': sum(grupo.creadas for grupo in self.grupos.values())
+        })
+
+    async def ejecutar(self, intervalo=1.0, rondas=None, al_terminar_ronda=None):
+        """Sondea cada intervalo segundos (sin esperar si una ronda se atrasa) y retorna las rondas."""
+        resumenes = []
+        proxima = time.monotonic()
+        while rondas is None or len(resumenes) < rondas:
+            resumen = await self.sondear()
+            resumenes.append(resumen)
+            if al_terminar_ronda is not None:
+                al_terminar_ronda(resumen)
+            proxima = max(proxima + intervalo, time.monotonic())
+            if rondas is None or len(resumenes) < rondas:
+                await asyncio.sleep(proxima - time.monotonic())
+        return resumenes
+
+    def cerrar(self):
+        """Cierra las conexiones persistentes y el hilo de cálculo."""
+        for grupo in self.grupos.values():
+            grupo.cerrar()
+        self._calculo.shutdown()
+
+
+class SimuladorMedidores:
+    """Medidores trifásicos simulados (unidades 1..unidades) que atienden el protocolo de sondeo.
+
+    Cada unidad tiene una conexión, un voltaje, una carga y un factor de potencia propios
+    con ruido en cada lectura. retardo_ms demora cada respuesta y tasa_fallos es la
+    probabilidad de cerrar la conexión en lugar de responder.
+    """
+
+    def __init__(self, unidades=1000, retardo_ms=0.0, tasa_fallos=0.0, semilla=None):
+        self.unidades = unidades
+        self.retardo = retardo_ms / 1000
+        self.tasa_fallos = tasa_fallos
+        self.azar = random.Random(semilla)
+        self.perfiles = [
+            (self.azar.choice('YD'), self.azar.choice([380.0, 400.0, 415.0]), self.azar.uniform(5, 200),
+             self.azar.uniform(0.7, 0.99), self.azar.uniform(0, 0.15))
+            for _ in range(unidades)
+        ]
+        self.atendidas = 0
+        self._atenciones = {}
+
+    def responder(self, unidad):
+        """Línea de respuesta con una lectura nueva de la unidad."""
+        if not 1 <= unidad <= self.unidades:
+            return f"ERROR Unidad desconocida: {unidad}\n"
+        conexion, voltaje, carga, factor, desequilibrio = self.perfiles[unidad - 1]
+        azar = self.azar
+        corrientes = [carga * (1 + azar.uniform(-desequilibrio, desequilibrio)) for _ in range(3)]
+        return (f"{unidad} {conexion} {voltaje * azar.uniform(0.98, 1.02):.2f} "
+                f"{corrientes[0]:.3f} {corrientes[1]:.3f} {corrientes[2]:.3f} "
+                f"{min(1.0, factor + azar.uniform(-0.02, 0.02)):.3f}\n")
+
+    async def atender(self, lector, escritor):
+        """Atiende las peticiones de una conexión hasta que el cliente la cierra."""
+        self._atenciones[asyncio.current_task()] = escritor
+        try:
+            while linea := await lector.readline():
+                partes = linea.split()
+                if len(partes) != 2 or partes[0] != b'LEER' or not partes[1].isdigit():
+                    respuesta = "ERROR Petición inválida\n"
+                else:
+                    if self.retardo:
+                        await asyncio.sleep(self.retardo)
+                    if self.tasa_fallos and self.azar.random() < self.tasa_fallos:
+                        break
+                    respuesta = self.responder(int(partes[1]))
+                self.atendidas += 1
+                escritor.write(respuesta.encode('ascii'))
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+            self._atenciones.pop(asyncio.current_task(), None)
+
+    async def iniciar(self, host='127.0.0.1', puerto=PUERTO_SIMULADOR):
+        """Inicia el servidor del simulador y lo retorna (puerto=0 elige un puerto libre)."""
+        return await asyncio.start_server(self.atender, host, puerto, backlog=1024)
+
+    async def detener(self, servidor):
+        """Cierra el servidor y las conexiones abiertas, y espera a que terminen de atenderse."""
+        servidor.close()
+        tareas = list(self._atenciones)
+        for escritor in self._atenciones.values():
+            escritor.close()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        await servidor.wait_closed()
+
+
+def _destino(texto):
+    host, _, puerto = texto.rpartition(':')
+    return host or '127.0.0.1', int(puerto)
+
+
+async def _simular(args):
+    simulador = SimuladorMedidores(args.unidades, args.retardo_ms, args.tasa_fallos, args.semilla)
+    servidor = await simulador.iniciar(args.host, args.puerto)
+    print(f"Simulando {args.unidades:,} medidores en {args.host}:{servidor.sockets[0].getsockname()[1]}")
+    try:
+        await servidor.serve_forever()
+    finally:
+        await simulador.detener(servidor)
+
+
+async def _sondear(args):
+    destinos = [_destino(texto) for texto in args.destino]
+    simulador = servidor = None
+    if args.simulador:
+        simulador = SimuladorMedidores(args.unidades, semilla=0)
+        servidor = await simulador.iniciar(puerto=0)
+        destinos = [('127.0.0.1', servidor.sockets[0].getsockname()[1])]
+    if not destinos:
+        raise SystemExit("Indique al menos un --destino o use --simulador")
+
+    guardados = {'encabezado': True}
+
+    def al_calcular(resultado):
+        if args.salida:
+            resultado.to_csv(args.salida, mode='w' if guardados['encabezado'] else 'a',
+                             header=guardados['encabezado'], index=False)
+            guardados['encabezado'] = False
+        if args.historico:
+            # datos (y con él streamlit) solo se importa si se guarda en el histórico
+            from datos import guardar_historico_lote
+            validas = resultado.loc[resultado['error'] == '']
+            if not validas.empty:
+                guardar_historico_lote(validas.drop(columns=['medidor', 'error', 'consumo']))
+
+    def mostrar(resumen):
+        print(f"{resumen['leidos']:,}/{resumen['medidores']:,} medidores en {resumen['segundos'] * 1000:.0f} ms "
+              f"({resumen['lecturas_por_segundo']:,.0f} lecturas/s, {resumen['lotes']} lotes, "
+              f"{resumen['fallos']} fallos, {resumen['tiempos_agotados']} tiempos agotados, "
+              f"{resumen['en_espera']} en espera, {resumen['conexiones_abiertas']} conexiones)")
+
+    sondeador = Sondeador(medidores_de(destinos, args.unidades), args.conexiones, args.tiempo_lectura,
+                          lote=args.lote, al_calcular=al_calcular)
+    try:
+        return await sondeador.ejecutar(args.intervalo, args.rondas, mostrar)
+    finally:
+        sondeador.cerrar()
+        if simulador is not None:
+            await simulador.detener(servidor)
+
+
+def main(argumentos=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Sondeo de medidores trifásicos por TCP")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    simulador = comandos.add_parser('simulador', help="Atender el protocolo con medidores simulados")
+    simulador.add_argument('--host', default='127.0.0.1')
+    simulador.add_argument('--puerto', type=int, default=PUERTO_SIMULADOR)
+    simulador.add_argument('--unidades', type=int, default=1000)
+    simulador.add_argument('--retardo-ms', type=float, default=0.0, help="Demora de cada respuesta")
+    simulador.add_argument('--tasa-fallos', type=float, default=0.0,
+                           help="Probabilidad de cerrar la conexión en lugar de responder")
+    simulador.add_argument('--semilla', type=int, default=None)
+
+    sondear = comandos.add_parser('sondear', help="Sondear medidores y calcular sus lecturas")
+    sondear.add_argument('--destino', action='append', default=[],
+                         help="HOST:PUERTO de un simulador o pasarela (puede repetirse)")
+    sondear.add_argument('--simulador', action='store_true', help="Sondear un simulador en este mismo proceso")
+    sondear.add_argument('--unidades', type=int, default=1000, help="Medidores por destino")
+    sondear.add_argument('--intervalo', type=float, default=1.0, help="Segundos entre rondas")
+    sondear.add_argument('--rondas', type=int, default=None, help="Rondas a ejecutar (por defecto, sin fin)")
+    sondear.add_argument('--conexiones', type=int, default=CONEXIONES_POR_DESTINO,
+                         help="Conexiones persistentes por destino")
+    sondear.add_argument('--tiempo-lectura', type=float, default=TIEMPO_LECTURA,
+                         help="Segundos máximos de espera de cada respuesta")
+    sondear.add_argument('--lote', type=int, default=LECTURAS_POR_LOTE, help="Lecturas por lote de cálculo")
+    sondear.add_argument('--salida', help="Archivo CSV con las lecturas calculadas")
+    sondear.add_argument('--historico', action='store_true',
+                         help="Agregar también las lecturas válidas al histórico")
+
+    args = parser.parse_args(argumentos)
+    try:
+        return asyncio.run(_simular(args) if args.comando == 'simulador' else _sondear(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
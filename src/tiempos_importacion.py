@@ -0,0 +1,111 @@
+"""
+Módulo de tiempos de importación
+Ejecuta Python con -X importtime en un proceso aparte y resume su salida en una tabla,
+para medir el costo de arranque en frío de app.py por encima de streamlit
+
+Uso:
+    python src/tiempos_importacion.py
+    python src/tiempos_importacion.py --modulo datos --base streamlit --filas 20
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+
+# Módulos que retrasan la primera pantalla si app.py los importa al cargar
+MODULOS_PESADOS = ['numpy', 'pandas', 'pyarrow', 'fpdf', 'IPython', 'graficos', 'datos']
+
+# Línea de -X importtime: "import time: <propio us> | <acumulado us> | <sangría><módulo>"
+PATRON_LINEA = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def analizar_importtime(salida):
+    """Convierte la salida de -X importtime en registros (modulo, propio_ms, acumulado_ms, nivel)."""
+    registros = []
+    for linea in salida.splitlines():
+        coincidencia = PATRON_LINEA.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, modulo = coincidencia.groups()
+            registros.append({
+                'modulo': modulo,
+                'propio_ms': int(propio) / 1000,
+                'acumulado_ms': int(acumulado) / 1000,
+                # Cada nivel de importación anidada agrega dos espacios
+                'nivel': (len(sangria) - 1) // 2
+            })
+    return registros
+
+
+def medir_importacion(modulo='app', base=None):
+    """Importa el módulo en un intérprete nuevo y retorna los registros de -X importtime.
+
+    Si se indica base, se importa antes y solo se retornan los módulos que agrega el
+    módulo medido (los ya cargados por la base no vuelven a aparecer).
+    """
+    codigo = f"import {base}; import {modulo}" if base else f"import {modulo}"
+    entorno = dict(os.environ)
+    entorno['PYTHONPATH'] = os.pathsep.join(
+        [RAIZ, os.path.join(RAIZ, 'src')] + ([entorno['PYTHONPATH']] if entorno.get('PYTHONPATH') else [])
+    )
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        capture_output=True, text=True, cwd=RAIZ, env=entorno
+    )
+    if proceso.returncode != 0:
+        # La última línea de stderr es la del error; con -X importtime también puede quedar vacía
+        lineas = [l for l in proceso.stderr.splitlines() if l.strip() and not PATRON_LINEA.match(l)]
+        detalle = lineas[-1] if lineas else f"código de salida {proceso.returncode}"
+        raise RuntimeError(f"No se pudo importar {modulo}: {detalle}")
+
+    registros = analizar_importtime(proceso.stderr)
+    if base:
+        # El módulo base termina en su línea de nivel 0; lo que sigue es del módulo medido.
+        # Si no aparece (por ejemplo, ya lo cargó el arranque del intérprete) no se filtra nada
+        fin_base = next((i for i, r in enumerate(registros) if r['nivel'] == 0 and r['modulo'] == base), None)
+        if fin_base is not None:
+            registros = registros[fin_base + 1:]
+    return registros
+
+
+def modulos_importados(registros):
+    """Retorna el conjunto de módulos de los registros."""
+    return {r['modulo'] for r in registros}
+
+
+def tabla_importacion(registros, filas=15):
+    """Formatea como tabla los módulos de mayor tiempo acumulado."""
+    total = sum(r['acumulado_ms'] for r in registros if r['nivel'] == 0)
+    lineas = [
+        f"{'Módulo':<45} {'Propio':>10} {'Acumulado':>11}",
+        '-' * 68
+    ]
+    for r in sorted(registros, key=lambda r: r['acumulado_ms'], reverse=True)[:filas]:
+        nombre = '  ' * r['nivel'] + r['modulo']
+        lineas.append(f"{nombre[:45]:<45} {r['propio_ms']:>7.1f} ms {r['acumulado_ms']:>8.1f} ms")
+    lineas.append('-' * 68)
+    lineas.append(f"{'Total (' + str(len(registros)) + ' módulos)':<45} {'':>10} {total:>8.1f} ms")
+    return '\n'.join(lineas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tabla de tiempos de importación (-X importtime)")
+    parser.add_argument('--modulo', default='app', help="Módulo a medir")
+    parser.add_argument('--base', default='streamlit', help="Módulo importado antes, excluido de la tabla ('' para ninguno)")
+    parser.add_argument('--filas', type=int, default=15)
+    args = parser.parse_args()
+
+    registros = medir_importacion(args.modulo, args.base or None)
+    print(tabla_importacion(registros, args.filas))
+
+    pesados = [m for m in MODULOS_PESADOS if m in modulos_importados(registros)]
+    if pesados:
+        print(f"\n⚠️ Módulos pesados importados por {args.modulo}: {', '.join(pesados)}")
+
+
+if __name__ == '__main__':
+    main()
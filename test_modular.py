@@ -6,6 +6,8 @@ Pruebas para validar todas las funcionalidades de la versión modular
 import sys
 import os
 import datetime
+import tempfile
+import contextlib
 
 # Agregar src al path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -202,6 +204,1124 @@ def test_graficos():
         print(f"❌ Error generando gráficos: {e}")
 
 
+@contextlib.contextmanager
+def directorio_temporal():
+    """Ejecuta el bloque dentro de un directorio temporal para no tocar el histórico real."""
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            yield directorio
+        finally:
+            os.chdir(directorio_original)
+
+
+def _guardar_concurrente(directorio, potencia, veces):
+    """Guarda registros en el histórico de un directorio (en otro proceso)."""
+    os.chdir(directorio)
+    for _ in range(veces):
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'AC',
+                           'potencia_activa': potencia})
+
+
+def test_agregados_historico():
+    """Prueba que los agregados se actualizan incrementalmente al guardar."""
+    print("\n🗂️ Probando agregados del histórico...")
+    
+    from agregados import cargar_agregados, calcular_agregados, reconstruir_agregados
+    from datos import cargar_historico
+    
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'AC',
+                           'potencia_activa': 1000.0})
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'AC',
+                           'potencia_activa': 3000.0})
+        guardar_historico({'tipo_circuito': 'Trifásico', 'potencia_activa_total': 5000.0,
+                           'desequilibrio_porcentaje': 4.0, 'calidad_puntuacion': 90})
+        
+        diario = cargar_agregados('dia', 'potencia_activa')
+        assert len(diario) == 1, f"Expected 1 daily bucket, got {len(diario)}"
+        fila = diario.iloc[0]
+        assert fila['conteo'] == 2 and fila['suma'] == 4000.0, f"Unexpected rollup: {fila.to_dict()}"
+        assert fila['minimo'] == 1000.0 and fila['maximo'] == 3000.0 and fila['media'] == 2000.0
+        
+        # Los agregados incrementales deben coincidir con una reconstrucción completa
+        mensual = cargar_agregados('mes')
+        completo = calcular_agregados(cargar_historico(), 'mes')
+        assert mensual[['conteo', 'suma']].sum().tolist() == completo[['conteo', 'suma']].sum().tolist()
+        reconstruir_agregados(cargar_historico())
+        metricas = set(cargar_agregados('hora')['metrica'])
+        assert len(metricas) == 4, f"Expected 4 hourly metrics, got {metricas}"
+
+    # Histórico previo a los agregados: el primer guardado los crea con todos los registros
+    with directorio_temporal():
+        import pandas as pd
+        pd.DataFrame({
+            'fecha': ['2024-01-15 10:00:00', '2024-02-20 11:00:00'],
+            'tipo_circuito': ['Resistivo', 'Resistivo'],
+            'tipo_corriente': ['AC', 'AC'],
+            'potencia_activa': [500.0, 700.0]
+        }).to_csv('historico_calculos.csv', index=False)
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'AC',
+                           'potencia_activa': 900.0})
+
+        mensual = cargar_agregados('mes', 'potencia_activa')
+        assert mensual['conteo'].sum() == 3 and mensual['suma'].sum() == 2100.0, mensual
+        assert len(mensual) == 3, f"Expected 3 monthly buckets, got {len(mensual)}"
+
+    # Dos procesos guardando a la vez no pierden conteos ni sumas de los agregados
+    import multiprocessing
+    with directorio_temporal() as directorio:
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'AC',
+                           'potencia_activa': 1.0})
+        procesos = [multiprocessing.Process(target=_guardar_concurrente, args=(directorio, potencia, 15))
+                    for potencia in (10.0, 100.0)]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
+        assert all(proceso.exitcode == 0 for proceso in procesos)
+
+        diario = cargar_agregados('dia', 'potencia_activa')
+        assert diario['conteo'].sum() == 31 and diario['suma'].sum() == 1651.0, diario
+        assert len(cargar_historico()) == 31
+
+    print("✅ Agregados horarios, diarios y mensuales consistentes")
+
+
+def test_carga_historico_esquema():
+    """Prueba que el histórico se carga con los tipos del esquema y solo las columnas pedidas."""
+    print("\n📥 Probando carga del histórico con esquema...")
+    
+    from datos import cargar_historico
+    
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC',
+                           'voltaje': 12.0, 'corriente': 2.0, 'potencia': 24.0})
+        guardar_historico({'tipo_circuito': 'Trifásico', 'conexion': 'Estrella (Y)',
+                           'corriente_r': 10.0, 'potencia_activa_total': 5594.2})
+        
+        df = cargar_historico()
+        assert str(df['tipo_circuito'].dtype) == 'category', f"Got {df['tipo_circuito'].dtype}"
+        assert str(df['voltaje'].dtype) == 'float32', f"Got {df['voltaje'].dtype}"
+        assert str(df['potencia_activa_total'].dtype) == 'float64'
+        assert str(df['fecha'].dtype).startswith('datetime64'), f"Got {df['fecha'].dtype}"
+        
+        parcial = cargar_historico(['fecha', 'corriente_r', 'no_existe'])
+        assert sorted(parcial.columns) == ['corriente_r', 'fecha'], f"Got {list(parcial.columns)}"
+    
+    print("✅ Esquema de tipos y selección de columnas aplicados")
+
+
+def test_carga_historico_arrow():
+    """Prueba que el motor pyarrow entrega los mismos datos y que sin pyarrow se usa pandas."""
+    print("\n🏹 Probando carga del histórico con Arrow...")
+    
+    import datos
+    from datos import cargar_historico
+    
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'AC',
+                           'voltaje': 220.0, 'potencia_activa': 1760.0})
+        guardar_historico({'tipo_circuito': 'Trifásico', 'conexion': 'Delta (Δ)',
+                           'potencia_activa_total': 5594.2})
+        
+        base = cargar_historico()
+        if datos.PYARROW_DISPONIBLE:
+            arrow = cargar_historico(motor='pyarrow')
+            assert str(arrow['potencia_activa'].dtype) == 'double[pyarrow]', f"Got {arrow['potencia_activa'].dtype}"
+            assert arrow['potencia_activa_total'].sum() == base['potencia_activa_total'].sum()
+            assert list(arrow['tipo_circuito']) == list(base['tipo_circuito'])
+        
+        # Sin pyarrow la carga debe seguir funcionando con el lector de pandas
+        disponible = datos.PYARROW_DISPONIBLE
+        datos.PYARROW_DISPONIBLE = False
+        try:
+            respaldo = cargar_historico(motor='pyarrow')
+            assert datos.cargar_historico_arrow() is None
+        finally:
+            datos.PYARROW_DISPONIBLE = disponible
+        assert str(respaldo['voltaje'].dtype) == 'float32', f"Got {respaldo['voltaje'].dtype}"
+    
+    print("✅ Motor pyarrow equivalente y respaldo con pandas")
+
+
+def test_historico_vigente():
+    """Prueba que el histórico de la vista se reutiliza hasta que cambian sus archivos."""
+    print("\n♻️ Probando reutilización del histórico cargado...")
+    
+    from datos import cargar_historico_vigente
+    
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 12.0})
+        primero = cargar_historico_vigente()
+        assert cargar_historico_vigente() is primero, "Unchanged history should not be reloaded"
+        
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 24.0})
+        segundo = cargar_historico_vigente()
+        assert segundo is not primero and len(segundo) == 2, "A new record must invalidate the cache"
+    
+    print("✅ Histórico recargado solo cuando cambian sus archivos")
+
+
+def test_registro_compartido():
+    """Prueba los recursos compartidos entre sesiones y su invalidación al guardar."""
+    print("\n🤝 Probando recursos compartidos entre sesiones...")
+    
+    from compartido import RegistroCompartido, registro
+    from datos import cargar_historico_vigente
+    from cache_graficos import CacheFiguras
+    
+    local = RegistroCompartido()
+    construcciones = []
+    constructor = lambda: construcciones.append(1) or [len(construcciones)]
+    primero = local.obtener('dato', 1, constructor, etiquetas=('origen',))
+    assert local.obtener('dato', 1, constructor) is primero and len(construcciones) == 1
+    assert local.invalidar('origen') == 1
+    assert local.obtener('dato', 1, constructor) is not primero
+    local.obtener('dato', 2, constructor)
+    assert local.estadisticas()['entradas'] == 1, "A new key must replace older versions"
+    local.habilitado = False
+    assert local.obtener('dato', 2, constructor) is not local.obtener('dato', 2, constructor)
+    
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 12.0})
+        cargar_historico_vigente()
+        entradas = registro.estadisticas()['entradas']
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 24.0})
+        assert registro.estadisticas()['entradas'] < entradas, "Saving must invalidate shared history"
+    
+    cache = CacheFiguras()
+    figura = cache.obtener_compartida(crear_triangulo_potencias, 100.0, 50.0)
+    assert cache.obtener_compartida(crear_triangulo_potencias, 100.0, 50.0) is figura
+    
+    print("✅ Recursos compartidos e invalidados al guardar")
+
+
+def test_calculos_lote():
+    """Prueba los cálculos vectorizados contra los escalares y el guardado del lote."""
+    print("\n📥 Probando cálculos por lotes...")
+    
+    import numpy as np
+    import pandas as pd
+    from calculos_vectorizados import procesar_lecturas
+    from datos import guardar_historico_lote, cargar_historico, contar_registros
+    
+    lecturas = pd.DataFrame({
+        'V': ['12', '220', '380', '380', '-5', '220'],
+        'I': ['2', '10', '10', '10', '1', '10'],
+        'cos φ': [None, '0,8', '0.85', '0.85', None, '1.5'],
+        'Conexión': [None, None, 'Estrella', 'delta', None, None],
+        'IR': [None, None, '10', '12', None, None],
+        'IS': [None, None, '10', '8', None, None]
+    })
+    r = procesar_lecturas(lecturas)
+    assert list(r['error'] == '') == [True, True, True, True, False, False]
+    assert r.loc[4, 'error'] == validar_entrada_dc(-5, 1)
+    assert r.loc[5, 'error'] == validar_entrada(220, 10, 1.5)
+    
+    assert tuple(r.loc[0, ['resistencia', 'potencia']]) == calcular_dc(12, 2)
+    p, q, s = calcular_potencias(220, 10, 0.8)
+    assert np.allclose(r.loc[1, ['potencia_activa', 'potencia_reactiva', 'potencia_aparente']], [p, q, s])
+    for fila, calcular in ((2, calcular_sistema_trifasico_estrella), (3, calcular_sistema_trifasico_delta)):
+        esperado = calcular(380, 10, 0.85)
+        assert np.isclose(r.loc[fila, 'potencia_activa_total'], esperado['potencia_activa_total'])
+    # La corriente de fase T faltante toma la corriente de línea, como en la calculadora
+    desequilibrio = calcular_desequilibrio_corrientes(12, 8, 10)
+    assert np.isclose(r.loc[3, 'desequilibrio_porcentaje'], desequilibrio['desequilibrio_porcentaje'])
+    assert r.loc[3, 'calidad_puntuacion'] == analizar_calidad_energia(
+        desequilibrio['desequilibrio_porcentaje'], 0.85, esperado['potencia_aparente_total'])['puntuacion']
+    
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 1.0})
+        validas = r[r['error'] == ''].drop(columns=['error', 'consumo'])
+        assert guardar_historico_lote(validas) == 5 == contar_registros()
+        df = cargar_historico()
+        assert list(df['tipo_circuito'].iloc[1:]) == ['Resistivo', 'Resistivo', 'Trifásico', 'Trifásico']
+        assert df['conexion'].iloc[-1] == 'Delta (Δ)' and df['fecha'].notna().all()
+    
+    print("✅ Cálculos por lotes equivalentes a los escalares y guardados en una escritura")
+
+
+def test_procesamiento_lote_cli():
+    """Prueba el procesamiento por bloques de un archivo, en serie y con un pool de procesos."""
+    print("\n🏭 Probando procesamiento de archivos por lotes...")
+    
+    import pandas as pd
+    from calculos_vectorizados import procesar_lecturas
+    from procesamiento_lote import main as procesar_main, PYARROW_DISPONIBLE
+    
+    lecturas = pd.DataFrame({
+        'voltaje': [12.0, 220.0, 380.0, 380.0, -5.0, 220.0, 24.0],
+        'corriente': [2.0, 10.0, 10.0, 10.0, 1.0, 10.0, 3.0],
+        'coseno_fi': [None, 0.8, 0.85, 0.9, None, 0.95, None],
+        'tipo': ['DC', None, 'Estrella', 'delta', None, 'AC', 'x'],
+        'horas': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]
+    })
+    esperado = procesar_lecturas(lecturas)
+    assert list(esperado['conexion'].iloc[2:4]) == ["Estrella (Y)", "Delta (Δ)"]
+    assert esperado.loc[6, 'error'].startswith("Tipo de circuito desconocido")
+    
+    with directorio_temporal():
+        lecturas.to_csv('lecturas.csv', index=False)
+        for procesos in (1, 2):
+            resultado = procesar_main(['lecturas.csv', f'resultados_{procesos}.csv', '--procesos', str(procesos),
+                                       '--filas-bloque', '3'])
+            assert resultado['filas'] == 7 and resultado['bloques'] == 3 and resultado['errores'] == 2
+            salida = pd.read_csv(f'resultados_{procesos}.csv', keep_default_na=False, na_values=[''])
+            pd.testing.assert_series_equal(salida['potencia_activa_total'], esperado['potencia_activa_total'],
+                                           check_dtype=False)
+            assert list(salida['error'].fillna('') != '') == list(esperado['error'] != '')
+        
+        # El tipo indicado por opción se aplica a todas las lecturas (sin cos φ quedan con error)
+        procesar_main(['lecturas.csv', 'delta.csv', '--procesos', '1', '--tipo', 'delta'])
+        delta = pd.read_csv('delta.csv')
+        assert (delta['tipo_circuito'] == 'Trifásico').all()
+        assert list(delta['conexion'].notna()) == [False, True, True, True, False, True, False]
+        
+        if PYARROW_DISPONIBLE:
+            lecturas.to_parquet('lecturas.parquet', index=False)
+            procesar_main(['lecturas.parquet', 'resultados.parquet', '--procesos', '1', '--filas-bloque', '2'])
+            assert len(pd.read_parquet('resultados.parquet')) == 7
+            
+            # Un bloque posterior con otros tipos inferidos se convierte al esquema del primero
+            from procesamiento_lote import _Escritor
+            escritor = _Escritor('tipos.parquet')
+            escritor.escribir({'tabla': pd.DataFrame({'conexion': [None, None], 'filas': [1, 2]})})
+            escritor.escribir({'tabla': pd.DataFrame({'conexion': [1.5, None], 'filas': [3.5, None]})})
+            escritor.cerrar()
+            tipos = pd.read_parquet('tipos.parquet')
+            assert tipos['conexion'].isna().tolist() == [True, True, False, True] and tipos['conexion'][2] == '1.5'
+            assert tipos['filas'].tolist()[:3] == [1.0, 2.0, 3.5] and pd.isna(tipos['filas'].iloc[3])
+    
+    print("✅ Lecturas procesadas por bloques en el orden de la entrada")
+
+
+def test_api_micro_lotes():
+    """Prueba la API HTTP local: respuestas, errores y agrupación de peticiones concurrentes."""
+    print("\n🌐 Probando API HTTP con micro-lotes...")
+    
+    import json
+    import threading
+    import urllib.error
+    import urllib.request
+    from calculos import calcular_potencias, calcular_sistema_trifasico_delta
+    from api import iniciar_servidor, detener_servidor
+    
+    servidor = iniciar_servidor(espera_ms=20)
+    url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    
+    def pedir(ruta, datos=None):
+        cuerpo = None if datos is None else json.dumps(datos).encode('utf-8')
+        peticion = urllib.request.Request(url + ruta, cuerpo, {'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(peticion, timeout=10) as respuesta:
+                return respuesta.status, json.load(respuesta)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+    
+    try:
+        estado, datos = pedir('/potencias', {'voltaje': 220, 'corriente': 10, 'coseno_fi': 0.8})
+        assert estado == 200
+        assert abs(datos['potencia_activa'] - calcular_potencias(220, 10, 0.8)[0]) < 1e-9
+        
+        estado, datos = pedir('/potencias', {'voltaje': -1, 'corriente': 10, 'coseno_fi': 0.8})
+        assert estado == 422 and 'error' in datos
+        assert pedir('/inexistente', {})[0] == 404
+        
+        # Un arreglo se calcula de una vez y cada elemento lleva su resultado o su error
+        estado, datos = pedir('/trifasico', [
+            {'conexion': 'delta', 'voltaje_linea': 380, 'corriente_linea': 10, 'factor_potencia': 0.85},
+            {'conexion': 'delta', 'corriente_linea': 10, 'factor_potencia': 0.85}
+        ])
+        esperado = calcular_sistema_trifasico_delta(380, 10, 0.85)
+        assert estado == 200 and len(datos) == 2
+        assert abs(datos[0]['potencia_activa_total'] - esperado['potencia_activa_total']) < 1e-6
+        assert datos[1]['error'] == "Falta el campo voltaje_linea"
+        
+        # Las peticiones individuales concurrentes se agrupan en menos lotes que peticiones
+        cantidad = 20
+        barrera = threading.Barrier(cantidad)
+        resultados = []
+        
+        def cliente(i):
+            barrera.wait()
+            resultados.append(pedir('/dc', {'voltaje': 10 + i, 'corriente': 2}))
+        
+        hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(cantidad)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        assert len(resultados) == cantidad and all(estado == 200 for estado, _ in resultados)
+        
+        estado, metricas = pedir('/metricas')
+        assert estado == 200
+        assert metricas['dc']['peticiones'] == cantidad and metricas['dc']['lotes'] < cantidad
+        assert metricas['dc']['p50_ms'] <= metricas['dc']['p99_ms']
+        
+        # Content-Length ausente, inválido o mayor que el máximo se rechaza sin leer el cuerpo
+        import http.client
+        for encabezado, esperado in ((None, 411), ('abc', 400), ('-5', 400), (str(10 ** 12), 413)):
+            conexion = http.client.HTTPConnection('127.0.0.1', servidor.server_address[1], timeout=10)
+            conexion.putrequest('POST', '/potencias')
+            if encabezado is not None:
+                conexion.putheader('Content-Length', encabezado)
+            conexion.endheaders()
+            respuesta = conexion.getresponse()
+            assert respuesta.status == esperado and 'error' in json.load(respuesta), encabezado
+            conexion.close()
+    finally:
+        detener_servidor(servidor)
+    
+    print(f"✅ {cantidad} peticiones concurrentes agrupadas en {metricas['dc']['lotes']} lotes")
+
+
+def test_sondeo_medidores():
+    """Prueba el sondeo asíncrono de medidores simulados: lotes, conexiones, fallos y esperas."""
+    print("\n📡 Probando sondeo de medidores...")
+    
+    import socket
+    import asyncio
+    import threading
+    from calculos import (calcular_sistema_trifasico_estrella, calcular_sistema_trifasico_delta,
+                          calcular_desequilibrio_corrientes)
+    from sondeo import Sondeador, SimuladorMedidores, medidores_de
+    
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        puerto_cerrado = s.getsockname()[1]
+    
+    async def sondear():
+        simulador = SimuladorMedidores(50, semilla=1)
+        lento = SimuladorMedidores(5, retardo_ms=200)
+        servidor = await simulador.iniciar(puerto=0)
+        servidor_lento = await lento.iniciar(puerto=0)
+        destino = ('127.0.0.1', servidor.sockets[0].getsockname()[1])
+        # Una unidad que el simulador no tiene y un destino sin servidor
+        medidores = medidores_de([destino], 50) + [
+            {'nombre': 'desconocido', 'host': destino[0], 'puerto': destino[1], 'unidad': 99},
+            {'nombre': 'apagado', 'host': '127.0.0.1', 'puerto': puerto_cerrado, 'unidad': 1}
+        ]
+        lotes, hilos = [], set()
+
+        def al_calcular(resultado):
+            hilos.add(threading.current_thread())
+            lotes.append(resultado)
+
+        sondeador = Sondeador(medidores, conexiones=4, lote=20, al_calcular=al_calcular)
+        lentos = Sondeador(medidores_de([('127.0.0.1', servidor_lento.sockets[0].getsockname()[1])], 5),
+                           tiempo_lectura=0.05)
+        try:
+            rondas = await sondeador.ejecutar(intervalo=0, rondas=2)
+            ronda_lenta = await lentos.sondear()
+        finally:
+            sondeador.cerrar()
+            lentos.cerrar()
+            await simulador.detener(servidor)
+            await lento.detener(servidor_lento)
+        return rondas, ronda_lenta, lotes, hilos, sondeador.grupos[destino].creadas
+    
+    (primera, segunda), ronda_lenta, lotes, hilos, creadas = asyncio.run(sondear())
+    assert primera['leidos'] == 50 and primera['fallos'] == 2 and primera['lotes'] == 3
+    assert threading.main_thread() not in hilos, "Batches must be computed off the event loop"
+    assert [len(lote) for lote in lotes[:3]] == [20, 20, 10]
+    
+    # Los medidores que fallaron esperan su backoff; las conexiones se reutilizan
+    assert segunda['leidos'] == 50 and segunda['en_espera'] == 2 and segunda['fallos'] == 0
+    assert creadas <= 4
+    assert ronda_lenta['tiempos_agotados'] == 5 and ronda_lenta['leidos'] == 0
+    
+    # Cada lectura calculada coincide con las funciones de calculos.py
+    for _, fila in lotes[0].head(10).iterrows():
+        assert fila['error'] == ''
+        calcular = calcular_sistema_trifasico_delta if fila['conexion'] == "Delta (Δ)" else calcular_sistema_trifasico_estrella
+        sistema = calcular(fila['voltaje_linea'], fila['corriente_linea'], fila['factor_potencia'])
+        desequilibrio = calcular_desequilibrio_corrientes(fila['corriente_r'], fila['corriente_s'], fila['corriente_t'])
+        assert abs(fila['potencia_activa_total'] - sistema['potencia_activa_total']) < 1e-6
+        assert abs(fila['desequilibrio_porcentaje'] - desequilibrio['desequilibrio_porcentaje']) < 1e-9
+    
+    # Una línea mayor que el límite de readline (64 KiB) solo hace fallar a su medidor
+    class SimuladorLineaLarga(SimuladorMedidores):
+        def responder(self, unidad):
+            if unidad == 2:
+                return '2 Y ' + '9' * 70000 + '\n'
+            return super().responder(unidad)
+    
+    async def sondear_linea_larga():
+        simulador = SimuladorLineaLarga(3, semilla=1)
+        servidor = await simulador.iniciar(puerto=0)
+        sondeador = Sondeador(medidores_de([('127.0.0.1', servidor.sockets[0].getsockname()[1])], 3),
+                              conexiones=1)
+        try:
+            return await sondeador.sondear(), sondeador.ultimo
+        finally:
+            sondeador.cerrar()
+            await simulador.detener(servidor)
+    
+    ronda, ultimo = asyncio.run(sondear_linea_larga())
+    assert ronda['leidos'] == 2 and ronda['fallos'] == 1
+    assert [nombre.rsplit('/', 1)[1] for nombre in ultimo['medidor']] == ['1', '3']
+    
+    print(f"✅ {primera['leidos']} medidores leídos en {primera['segundos'] * 1000:.0f} ms con {creadas} conexiones")
+
+
+def test_rotacion_historico():
+    """Prueba la rotación, compresión y fusión de segmentos del histórico."""
+    print("\n🗜️ Probando rotación y compactación del histórico...")
+    
+    from datos import cargar_historico, cargar_manifiesto, archivos_historico
+    from mantenimiento import rotar_historico, compactar_segmentos, ejecutar_mantenimiento
+    
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC',
+                           'voltaje': 12.0, 'corriente': 2.0})
+        assert rotar_historico() is None, "Small, recent file should not rotate"
+        assert rotar_historico(forzar=True)['filas'] == 1
+        
+        guardar_historico({'tipo_circuito': 'Trifásico', 'conexion': 'Estrella (Y)',
+                           'potencia_activa_total': 5594.2})
+        rotar_historico(tamano_maximo=0)
+        total = guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'AC',
+                                   'potencia_activa': 1760.0})
+        assert total == 3, f"Expected 3 records across segments, got {total}"
+        assert len(cargar_manifiesto()) == 2 and len(archivos_historico()) == 3
+        assert all(s['archivo'].endswith('.csv.gz') for s in cargar_manifiesto())
+        
+        df = cargar_historico()
+        assert len(df) == 3 and df['potencia_activa_total'].sum() == 5594.2
+        assert str(df['tipo_circuito'].dtype) == 'category'
+        
+        assert compactar_segmentos() == 2, "Expected the two small segments to be merged"
+        assert len(cargar_manifiesto()) == 1 and cargar_manifiesto()[0]['filas'] == 2
+        resultado = ejecutar_mantenimiento(forzar=True)
+        assert resultado['segmentos'] == 1 and resultado['segmentos_fusionados'] == 2
+        assert len(cargar_historico(motor='pyarrow')) == 3
+
+    # Rotación interrumpida tras publicar el segmento: al reanudarla no se duplican filas
+    import os
+    import time
+    import threading
+    from unittest import mock
+    import pandas as pd
+    from datos import bloqueo_historico, ARCHIVO_HISTORICO
+
+    eliminar = os.remove
+
+    def fallar_al_eliminar(sufijo):
+        def remove(ruta):
+            if ruta.endswith(sufijo):
+                raise OSError("Interrupción simulada")
+            eliminar(ruta)
+        return remove
+
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 12.0})
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 24.0})
+        with mock.patch('os.remove', fallar_al_eliminar('.rotando')):
+            try:
+                rotar_historico(forzar=True)
+            except OSError:
+                pass
+        assert len(cargar_manifiesto()) == 1
+        rotar_historico()
+        assert len(cargar_manifiesto()) == 1 and len(cargar_historico()) == 2, "Rows must not be duplicated"
+
+        # Interrupción tras eliminar el origen pero no su marca: la marca no afecta la rotación siguiente
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 48.0})
+        with mock.patch('os.remove', fallar_al_eliminar('.segmento')):
+            try:
+                rotar_historico(forzar=True)
+            except OSError:
+                pass
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 96.0})
+        rotar_historico(forzar=True)
+        assert len(cargar_manifiesto()) == 3 and sorted(cargar_historico()['voltaje']) == [12, 24, 48, 96]
+
+        # Una escritura espera a la rotación en curso y crea el archivo activo nuevo con encabezado
+        en_bloqueo = threading.Event()
+
+        def rotar_con_bloqueo():
+            with bloqueo_historico():
+                en_bloqueo.set()
+                time.sleep(0.2)
+                os.replace(ARCHIVO_HISTORICO, 'rotado.csv')
+
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 1.0})
+        hilo = threading.Thread(target=rotar_con_bloqueo)
+        hilo.start()
+        en_bloqueo.wait()
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 2.0})
+        hilo.join()
+        activo = pd.read_csv(ARCHIVO_HISTORICO)
+        assert list(activo['voltaje']) == [2.0] and 'fecha' in activo.columns
+
+    # Un lector durante la rotación espera a que el segmento esté publicado y ve todas las filas
+    import mantenimiento
+    copiar = mantenimiento.shutil.copyfileobj
+    lecturas = []
+
+    def copiar_con_lector(entrada, salida):
+        lector = threading.Thread(target=lambda: lecturas.append(len(cargar_historico())))
+        lector.start()
+        lector.join(0.2)
+        assert lector.is_alive(), "The reader must wait for the rotation in progress"
+        copiar(entrada, salida)
+        return lector
+
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 12.0})
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 24.0})
+        with mock.patch('mantenimiento.shutil.copyfileobj', copiar_con_lector):
+            rotar_historico(forzar=True)
+        for _ in range(50):
+            if lecturas:
+                break
+            time.sleep(0.1)
+        assert lecturas == [2], f"Reader saw {lecturas} rows during the rotation"
+
+    # Un segmento publicado mientras se fusionan otros se conserva en el manifiesto
+    fusionar = mantenimiento._fusionar
+
+    def fusionar_con_rotacion(grupo):
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': 36.0})
+        rotar_historico(forzar=True)
+        return fusionar(grupo)
+
+    with directorio_temporal():
+        for voltaje in (12.0, 24.0):
+            guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'DC', 'voltaje': voltaje})
+            rotar_historico(forzar=True)
+        with mock.patch('mantenimiento._fusionar', fusionar_con_rotacion):
+            assert compactar_segmentos() == 2
+        assert [s['filas'] for s in cargar_manifiesto()] == [2, 1]
+        assert sorted(cargar_historico()['voltaje']) == [12, 24, 36]
+
+    print("✅ Segmentos rotados, comprimidos, fusionados y leídos de forma transparente")
+
+
+def test_almacen_columnar():
+    """Prueba que el almacén columnar refleja el histórico y se abre con memmap."""
+    print("\n🧱 Probando almacén columnar del histórico...")
+    
+    import numpy as np
+    from datos import cargar_historico
+    from columnar import abrir_columnas, cargar_columnas, reconstruir_almacen
+    
+    with directorio_temporal():
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'AC',
+                           'voltaje': 220.0, 'potencia_activa': 1760.0})
+        guardar_historico({'tipo_circuito': 'Trifásico', 'conexion': 'Estrella (Y)',
+                           'voltaje_linea': 380.0, 'potencia_activa_total': 5594.2})
+        guardar_historico({'tipo_circuito': 'Trifásico', 'conexion': 'Delta (Δ)',
+                           'voltaje_linea': 400.0, 'potencia_activa_total': 6000.0})
+        
+        mapas = abrir_columnas(['voltaje_linea', 'tipo_circuito'])
+        assert isinstance(mapas['voltaje_linea'], np.memmap), "Expected a numpy.memmap column"
+        assert mapas['voltaje_linea'].dtype == np.float32 and len(mapas['voltaje_linea']) == 3
+        assert np.nansum(mapas['voltaje_linea']) == 780.0
+        
+        df = cargar_columnas(['fecha', 'tipo_circuito', 'conexion', 'potencia_activa_total'])
+        historico = cargar_historico()
+        assert list(df['tipo_circuito']) == list(historico['tipo_circuito'])
+        assert list(df['conexion'].astype(object).fillna('-')) == ['-', 'Estrella (Y)', 'Delta (Δ)']
+        assert (df['fecha'] == historico['fecha']).all(), "Dates should round-trip"
+        
+        assert reconstruir_almacen(historico) == 3
+        assert np.nansum(abrir_columnas(['potencia_activa_total'])['potencia_activa_total']) == 11594.2
+
+        # Una escritura interrumpida deja bytes sin publicar en una columna y otra más corta:
+        # el siguiente agregado las realinea con las filas de los metadatos
+        import os
+        import pandas as pd
+        from columnar import agregar_registros, _ruta
+        with open(_ruta('voltaje_linea.bin'), 'ab') as f:
+            f.write(np.float32([999.0, 999.0]).tobytes())
+        os.truncate(_ruta('potencia_activa_total.bin'), 8)
+        agregar_registros(pd.DataFrame({'fecha': ['2024-03-01 12:00:00'], 'tipo_circuito': ['Trifásico'],
+                                        'voltaje_linea': [415.0], 'potencia_activa_total': [7000.0]}))
+        mapas = abrir_columnas(['voltaje_linea', 'potencia_activa_total'])
+        assert mapas['voltaje_linea'][3] == 415.0 and np.nansum(mapas['voltaje_linea']) == 1195.0
+        assert os.path.getsize(_ruta('voltaje_linea.bin')) == 4 * 4
+        assert mapas['potencia_activa_total'][3] == 7000.0 and np.isnan(mapas['potencia_activa_total'][1:3]).all()
+
+
+    # Dos procesos guardando a la vez dejan las columnas alineadas con meta.json
+    import multiprocessing
+    from columnar import cargar_meta
+    with directorio_temporal() as directorio:
+        guardar_historico({'tipo_circuito': 'Resistivo', 'tipo_corriente': 'AC', 'potencia_activa': 1.0})
+        procesos = [multiprocessing.Process(target=_guardar_concurrente, args=(directorio, potencia, 15))
+                    for potencia in (10.0, 100.0)]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
+        assert cargar_meta()['filas'] == 31
+        assert all(os.path.getsize(_ruta(f'{c}.bin')) == 31 * np.dtype(d['binario']).itemsize
+                   for c, d in cargar_meta()['columnas'].items())
+        assert np.nansum(abrir_columnas(['potencia_activa'])['potencia_activa']) == 1651.0
+
+    # Una fecha mal formada del histórico antiguo no impide reconstruir el almacén
+    with directorio_temporal():
+        pd.DataFrame({'fecha': ['2024-01-15 10:00:00', 'ayer'], 'tipo_circuito': ['Resistivo', 'Resistivo'],
+                      'voltaje': [12.0, 24.0]}).to_csv('historico_calculos.csv', index=False)
+        abrir_columnas(['voltaje'])
+        assert reconstruir_almacen(pd.read_csv('historico_calculos.csv')) == 2
+        fechas = cargar_columnas(['fecha'])['fecha']
+        assert fechas.notna().tolist() == [True, False]
+
+    print("✅ Columnas binarias consistentes con el histórico")
+
+
+def test_plantillas_graficos():
+    """Prueba que las figuras creadas desde plantillas son válidas e independientes."""
+    print("\n🧩 Probando plantillas de gráficos...")
+    
+    import plotly.graph_objects as go
+    
+    fig1 = crear_triangulo_potencias(1760, 1320)
+    fig1.update_layout(xaxis_range=[0, 1])
+    fig1.data[0].line.color = 'green'
+    
+    # Modificar una figura no debe alterar la plantilla compartida
+    fig2 = crear_triangulo_potencias(1760, 1320)
+    assert fig2.layout.xaxis.range is None, "Template layout was mutated"
+    assert fig2.data[0].line.color == 'blue', "Template trace style was mutated"
+    assert fig2.layout.template.layout.paper_bgcolor == 'white', "Expected plotly_white template"
+    
+    # La figura debe coincidir con su versión validada por Plotly
+    for fig in (fig2, crear_grafico_circular(1760, 1320, 2200), crear_grafico_circuito_dc(12, 2, 6),
+                crear_diagrama_fasorial_trifasico([220, 220, 220], [0, -120, 120]),
+                crear_grafico_desequilibrio([10, 8, 12], ['R', 'S', 'T'])):
+        assert go.Figure(fig.to_dict()).to_dict() == fig.to_dict(), "Figure differs after validation"
+    
+    # Los cambios posteriores siguen pasando por los validadores
+    try:
+        fig2.update_layout(propiedad_inexistente=1)
+        assert False, "Expected Plotly validation error"
+    except ValueError:
+        pass
+
+    # También en los objetos anidados (líneas, marcadores, ejes)
+    for cambiar in (lambda: setattr(fig2.data[0].line, 'color', 'no_es_un_color'),
+                    lambda: setattr(fig2.layout.xaxis, 'propiedad_inexistente', 1)):
+        try:
+            cambiar()
+            assert False, "Expected Plotly validation error on a nested object"
+        except (ValueError, AttributeError):
+            pass
+
+    # figura_desde_dict valida el dict con la API pública de Plotly
+    from graficos import figura_desde_dict
+    try:
+        figura_desde_dict({'data': [{'type': 'bar', 'line': {'color': 'no_es_un_color'}}]})
+        assert False, "Expected Plotly validation error from figura_desde_dict"
+    except ValueError:
+        pass
+
+    print("✅ Plantillas válidas, independientes y con validación posterior")
+
+
+def test_figuras_rapidas():
+    """Prueba que la ruta rápida sin validación produce el mismo JSON que la ruta validada."""
+    print("\n⚡ Probando construcción rápida de figuras...")
+    
+    import json
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    from graficos import (
+        figura_a_json, crear_grafico_serie_historica, crear_diagrama_fasorial,
+        crear_mapa_densidad_potencias, crear_animacion_ondas, crear_flota_triangulos,
+        crear_flota_desequilibrio, crear_histograma
+    )
+    
+    casos = [
+        (crear_triangulo_potencias, (1760, 1320)),
+        (crear_grafico_circular, (1760, 1320, 2200)),
+        (crear_grafico_circuito_dc, (12, 2, 6)),
+        (crear_grafico_capacitor, ([1e-6, 12, 0.5, 3e-3], ['C', 'V', 'Q', 'E'], "AC")),
+        (crear_diagrama_fasorial_trifasico, ([220, 220, 220], [0, -120, 120])),
+        (crear_diagrama_fasorial, ([220, 220, 10, 10], [0, 120, -30, 90], ['V', 'V', 'I', 'I'])),
+        (crear_mapa_densidad_potencias, ([0, 50, 100], [0, 40, 80], [[1, 0], [30, 400]])),
+        (crear_animacion_ondas, ([220] * 3, [10, 9, 11], 0.85, 50, 20, 6)),
+        (crear_flota_triangulos, ([1000, 2000, 1500], [300, 900, 0], ['A', 'B', 'C'], 2)),
+        (crear_flota_desequilibrio, ([[10, 10, 10], [12, 8, 10]], ['A', 'B'])),
+        (crear_histograma, ([0.5, 0.75, 1.0], [3, 12], 'Factor de potencia', 'cos φ')),
+        (crear_grafico_desequilibrio, ([10, 8, 12], ['R', 'S', 'T'])),
+        (crear_grafico_serie_historica, (['2024-01-01 00:00:00', '2024-01-02 00:00:00'], [1.5, 2.5],
+                                         'potencia', 10))
+    ]
+    for constructor, args in casos:
+        rapida = constructor(*args, rapido=True)
+        assert isinstance(rapida, dict), f"{constructor.__name__} should return a plain dict"
+        # Comparar contra la figura reconstruida pasando por todos los validadores
+        validada = pio.to_json(go.Figure(constructor(*args).to_dict()))
+        assert json.loads(figura_a_json(rapida)) == json.loads(validada), \
+            f"{constructor.__name__} fast JSON differs from validated JSON"
+    
+    print("✅ JSON de la ruta rápida idéntico al de la ruta validada")
+
+
+def test_decimacion_series():
+    """Prueba la decimación min/max y LTTB de series largas del histórico."""
+    print("\n📉 Probando decimación de series...")
+    
+    import numpy as np
+    from decimacion import decimar_serie, decimar_lttb
+    from graficos import crear_grafico_serie_historica
+    
+    x = np.arange(100000, dtype='int64')
+    y = np.sin(x / 1000.0)
+    y[12345] = 50.0   # pico aislado
+    y[500:600] = np.nan
+    
+    fechas, valores, total = decimar_serie(x, y, puntos=1000)
+    assert total == 100000 - 100, "NaN values should be discarded"
+    assert len(valores) <= 1002, f"Too many points after decimation: {len(valores)}"
+    assert valores.max() == 50.0 and valores.min() == y[~np.isnan(y)].min(), "Min/max must be preserved"
+    assert np.all(np.diff(fechas) > 0), "Decimated x must stay ordered"
+    
+    indices = decimar_lttb(x.astype(float), np.nan_to_num(y), 500)
+    assert len(indices) == 500 and indices[0] == 0 and indices[-1] == len(x) - 1
+    assert 12345 in indices, "LTTB should keep the isolated peak"
+    
+    # Series cortas se devuelven completas
+    assert len(decimar_serie(x[:10], y[:10], puntos=1000)[0]) == 10
+    
+    fig = crear_grafico_serie_historica(fechas.astype('datetime64[s]'), valores, 'potencia', total)
+    assert fig.data[0].type == 'scattergl', "History series must use WebGL traces"
+    
+    print("✅ Decimación conserva extremos y limita los puntos")
+
+
+def test_diagrama_fasorial_n():
+    """Prueba el diagrama fasorial de N vectores: trazas por grupo y cortes None."""
+    print("\n🧭 Probando diagrama fasorial de N vectores...")
+    
+    import numpy as np
+    from graficos import crear_diagrama_fasorial
+    
+    n = 300
+    magnitudes = np.r_[np.full(n, 220.0), np.full(n, 10.0)]
+    angulos = np.linspace(-180, 180, 2 * n)
+    grupos = ['Voltajes'] * n + ['Corrientes'] * n
+    
+    fig = crear_diagrama_fasorial(magnitudes, angulos, grupos=grupos, normalizar=True)
+    assert len(fig.data) == 6, f"Expected 3 traces per group, got {len(fig.data)}"
+    
+    vectores = fig.data[0]
+    assert len(vectores.x) == 3 * n and vectores.x[2] is None, "Vectors must be separated by None"
+    assert abs(vectores.x[1] - np.cos(np.radians(angulos[0]))) < 1e-9, "Normalized length expected"
+    assert vectores.customdata[1][0] == 220.0, "Hover must keep the real magnitude"
+    assert len(fig.data[1].x) == n * 51, "One 50-point arc plus a break per vector"
+    
+    sin_angulos = crear_diagrama_fasorial(magnitudes, angulos, grupos=grupos, mostrar_angulos=False)
+    assert len(sin_angulos.data) == 2, "Only vector traces expected without angles"
+    
+    print("✅ Diagrama fasorial con trazas mínimas por grupo")
+
+
+def test_exportacion_lotes():
+    """Prueba la exportación por lotes de figuras a un zip y a un directorio."""
+    print("\n🖼️ Probando exportación por lotes...")
+    
+    import zipfile
+    from exportacion import exportar_figuras, KALEIDO_DISPONIBLE
+    from tiempos_importacion import medir_importacion, modulos_importados
+    
+    # Importar exportacion no carga datos ni streamlit
+    importados = modulos_importados(medir_importacion('exportacion'))
+    assert not {'datos', 'streamlit'} & importados, "exportacion must not import datos/streamlit at load time"
+    
+    figuras = {
+        'triangulo': crear_triangulo_potencias(1760, 1320, rapido=True),
+        'desequilibrio': crear_grafico_desequilibrio([10, 8, 12], ['R', 'S', 'T'])
+    }
+    
+    with directorio_temporal():
+        if not KALEIDO_DISPONIBLE:
+            try:
+                exportar_figuras(figuras, 'graficos.zip')
+                assert False, "Expected ImportError without kaleido"
+            except ImportError:
+                print("⚠️ kaleido no instalado: exportación no disponible")
+                return
+        
+        resultado = exportar_figuras(figuras, 'graficos.zip')
+        assert resultado['figuras'] == 2 and resultado['figuras_por_segundo'] > 0
+        with zipfile.ZipFile('graficos.zip') as archivo:
+            assert sorted(archivo.namelist()) == ['desequilibrio.png', 'triangulo.png']
+            assert archivo.read('triangulo.png').startswith(b'\x89PNG'), "Expected PNG data"
+        
+        exportar_figuras(figuras.items(), 'graficos', formato='svg')
+        with open(os.path.join('graficos', 'triangulo.svg'), 'rb') as f:
+            assert b'<svg' in f.read(200), "Expected SVG data"
+    
+    print(f"✅ Exportación por lotes ({resultado['figuras_por_segundo']:.1f} figuras/s)")
+
+
+def test_densidad_potencias():
+    """Prueba el mapa de densidad P-Q: conteos en el servidor y tamaño independiente de las filas."""
+    print("\n🌡️ Probando mapa de densidad P vs Q...")
+    
+    import numpy as np
+    from decimacion import densidad_2d
+    from graficos import crear_mapa_densidad_potencias, figura_a_json, FACTORES_POTENCIA_ISOLINEAS
+    
+    rng = np.random.default_rng(0)
+    tamanos = []
+    for filas in (1000, 200000):
+        p = rng.uniform(100, 5000, filas)
+        q = p * np.tan(np.arccos(rng.uniform(0.6, 1, filas)))
+        p[:10] = np.nan   # registros sin potencia se descartan
+        bordes_p, bordes_q, conteos = densidad_2d(p, q, cubetas=80)
+        assert conteos.shape == (80, 80) and conteos.sum() == filas - 10
+        fig = crear_mapa_densidad_potencias(bordes_p, bordes_q, conteos)
+        tamanos.append(len(figura_a_json(fig)))
+    
+    assert fig.data[0].type == 'heatmap' and len(fig.data[0].x) == 80
+    assert tamanos[1] < tamanos[0] * 2, f"Payload should not grow with rows: {tamanos}"
+    
+    # Isolínea de fp 0.8 desde el origen con pendiente tan(acos(0.8)) = 0.75
+    isolineas = fig.data[1]
+    indice = list(FACTORES_POTENCIA_ISOLINEAS).index(0.8) * 3 + 1
+    assert abs(isolineas.y[indice] / isolineas.x[indice] - 0.75) < 1e-9
+    
+    print(f"✅ Mapa de densidad con tamaño acotado ({tamanos[0]:,} y {tamanos[1]:,} bytes)")
+
+
+def test_animacion_ondas():
+    """Prueba la animación de formas de onda: cuadros precalculados, picos y desfase."""
+    print("\n🌊 Probando animación de formas de onda...")
+    
+    import numpy as np
+    from graficos import crear_animacion_ondas, figura_a_json
+    
+    fig = crear_animacion_ondas([220], [10], 0.8, muestras=101, cuadros=24)
+    assert len(fig.frames) == 24, "Expected one frame per step"
+    assert len(fig.layout.sliders[0].steps) == 24
+    
+    v, i = np.array(fig.data[0].y), np.array(fig.data[1].y)
+    assert len(v) == 101 and abs(v.max() - 220 * np.sqrt(2)) < 0.5, "Voltage peak should be √2·V"
+    # La corriente atrasa φ = acos(0.8): i(0) = -√2·I·sin(φ)
+    assert abs(i[0] + 10 * np.sqrt(2) * 0.6) < 1e-9, "Current should lag by φ"
+    
+    # El tamaño crece con las muestras y no con otra cosa
+    pequena = len(figura_a_json(crear_animacion_ondas([220] * 3, [10, 9, 11], 0.85, muestras=50, rapido=True)))
+    grande = len(figura_a_json(crear_animacion_ondas([220] * 3, [10, 9, 11], 0.85, muestras=400, rapido=True)))
+    assert pequena < grande < pequena * 4, f"Unexpected payload sizes: {pequena}, {grande}"
+    
+    print(f"✅ Animación precalculada ({pequena:,} a {grande:,} bytes según las muestras)")
+
+
+def test_vista_flota():
+    """Prueba la vista de flota: N circuitos como subgráficos de una sola figura."""
+    print("\n🏭 Probando vista de flota...")
+    
+    import numpy as np
+    from graficos import crear_flota_triangulos, crear_flota_desequilibrio
+    
+    n = 50
+    rng = np.random.default_rng(0)
+    p = rng.uniform(500, 5000, n)
+    q = p * rng.uniform(0.1, 1, n)
+    
+    fig = crear_flota_triangulos(p, q, columnas=5)
+    assert len(fig.data) == n, "Expected one trace per circuit"
+    assert fig.data[-1].xaxis == f'x{n}' and fig.layout[f'xaxis{n}'].matches == 'x', "Axes must be shared"
+    assert list(fig.data[0].x) == [0, p[0], p[0], 0] and list(fig.data[0].y) == [0, 0, q[0], 0]
+    assert len(fig.layout.annotations) == n
+    
+    corrientes = np.array([[10, 10, 10], [12, 8, 10]])
+    fig = crear_flota_desequilibrio(corrientes, ['A', 'B'], columnas=2)
+    assert len(fig.data) == 2 and len(fig.layout.shapes) == 2
+    assert '20.0% deseq.' in fig.layout.annotations[1].text, "Unbalance should be max deviation / mean"
+    
+    print("✅ Vista de flota en una sola figura con ejes compartidos")
+
+
+def test_serializacion_compacta():
+    """Prueba la compactación del JSON: redondeo, customdata a meta y arreglos binarios."""
+    print("\n📦 Probando serialización compacta...")
+    
+    import base64
+    import numpy as np
+    import plotly.graph_objects as go
+    from graficos import crear_diagrama_fasorial
+    from serializacion import compactar_figura, reporte_compactacion, redondear_arreglo
+    
+    assert redondear_arreglo(np.array([1234.56789, 0.000123456])).tolist() == [1234.57, 0.0]
+    
+    # customdata idéntico en todos los puntos pasa a meta
+    triangulo = compactar_figura(crear_triangulo_potencias(1760, 1320, rapido=True), binario=False)
+    traza = triangulo['data'][1]
+    assert 'customdata' not in traza and traza['meta'][0] == 2200.0
+    assert '%{meta[0]' in traza['hovertemplate'] and '%{customdata' not in traza['hovertemplate']
+    go.Figure(triangulo)  # sigue siendo una figura válida
+
+    # En una rejilla 2-D el customdata es por celda: filas iguales no lo convierten en meta
+    rejilla = [[1, 30], [1, 30]]
+    mapa = compactar_figura({'data': [{'type': 'heatmap', 'z': rejilla, 'customdata': rejilla,
+                                       'hovertemplate': '%{customdata}'}], 'layout': {}}, binario=False)
+    assert mapa['data'][0]['customdata'] == rejilla and 'meta' not in mapa['data'][0]
+    # Por punto, solo filas completas idénticas pasan a meta
+    distintas = compactar_figura({'data': [{'type': 'scatter', 'x': [0, 1], 'y': [0, 1],
+                                            'customdata': np.array([[1.0, 2.0], [1.0, 3.0]])}],
+                                  'layout': {}}, binario=False)
+    assert 'meta' not in distintas['data'][0]
+
+    rng = np.random.default_rng(0)
+    magnitudes = rng.uniform(1, 220, 100)
+    fasorial = crear_diagrama_fasorial(magnitudes, rng.uniform(-180, 180, 100), rapido=True)
+    
+    listas = compactar_figura(fasorial, cifras=4, binario=False)
+    x = listas['data'][0]['x']
+    assert x[2] is None, "Breaks between vectors must be kept"
+    assert all(v is None or round(v, 1) == v for v in x), "Expected 4 significant digits"
+    
+    binaria, reporte = reporte_compactacion(fasorial, binario=True)
+    x = binaria['data'][1]['x']  # arcos de ángulo
+    assert isinstance(x, dict) and x['dtype'] == 'f4', "Expected a float32 typed array"
+    original = np.array(fasorial['data'][1]['x'], dtype='float64')
+    decodificado = np.frombuffer(base64.b64decode(x['bdata']), dtype='float32')
+    assert np.array_equal(np.isnan(decodificado), np.isnan(original)), "Breaks must decode as NaN"
+    # 6 cifras respecto al mayor valor (~220): error absoluto menor a 1e-3
+    assert np.allclose(decodificado, original, rtol=0, atol=1e-3, equal_nan=True)
+    assert reporte['bytes_despues'] < reporte['bytes_antes'] and reporte['reduccion_porcentaje'] > 30, reporte
+
+    # Columnas float32 del histórico en la ruta de listas: el JSON compacto nunca crece
+    serie = rng.uniform(0.7, 1, 2000).astype('float32')
+    figura = {'data': [{'type': 'scattergl', 'x': np.arange(2000.0), 'y': serie}], 'layout': {}}
+    compacta, reporte_lista = reporte_compactacion(figura, binario=False)
+    assert reporte_lista['bytes_despues'] < reporte_lista['bytes_antes'], reporte_lista
+    assert all(len(repr(v)) <= 9 for v in compacta['data'][0]['y']), "float32 values must not widen to 17 digits"
+    redondeada = dict(figura, data=[dict(figura['data'][0], y=serie.round(2))])
+    reporte_redondeada = reporte_compactacion(redondeada, binario=False)[1]
+    assert reporte_redondeada['bytes_despues'] <= reporte_redondeada['bytes_antes'], reporte_redondeada
+
+    print(f"✅ JSON del fasorial reducido {reporte['reduccion_porcentaje']:.0f}% "
+          f"({reporte['bytes_antes']:,} → {reporte['bytes_despues']:,} bytes)")
+
+
+def test_perfilado_ejecucion():
+    """Prueba la medición de fases de una ejecución, su cascada y su log rotativo."""
+    print("\n🐞 Probando perfilado de ejecuciones...")
+    
+    from perfilado import (
+        iniciar_perfil, finalizar_perfil, instrumentar, leer_perfiles, perfil_actual, FASES_APP
+    )
+    from graficos import crear_cascada_tiempos
+    
+    espacio = {
+        'calcular_total': lambda a, b: espacio['analizar_total'](a + b),
+        'analizar_total': lambda total: total * 2,
+        'mostrar_total': print,
+        'FASES': FASES_APP
+    }
+    assert instrumentar(espacio, FASES_APP) == 2
+    assert instrumentar(espacio, FASES_APP) == 0, "Instrumenting twice must not wrap again"
+    
+    # Sin perfil activo las envolturas solo llaman a la función
+    assert espacio['calcular_total'](1, 2) == 6 and perfil_actual() is None
+    
+    with directorio_temporal():
+        iniciar_perfil()
+        assert espacio['calcular_total'](1, 2) == 6
+        perfil = finalizar_perfil('perfil.log')
+        
+        tramos = [(t['nombre'], t['categoria'], t['nivel']) for t in perfil.tramos]
+        assert tramos == [('calcular_total', 'cálculo', 0), ('analizar_total', 'análisis', 1)]
+        assert all(t['duracion_ms'] >= 0 for t in perfil.tramos)
+        assert perfil.total_ms() >= perfil.tramos[0]['duracion_ms']
+        assert set(perfil.totales_por_categoria()) == {'cálculo', 'análisis'}
+        
+        registros = leer_perfiles('perfil.log')
+        assert len(registros) == 1 and registros[0]['tramos'][1]['nombre'] == 'analizar_total'
+    
+    fig = crear_cascada_tiempos(perfil.tramos, perfil.total_ms())
+    assert [t.name for t in fig.data] == ['cálculo', 'análisis']
+    
+    print("✅ Fases medidas, mostradas en cascada y registradas")
+
+
+def test_importacion_diferida():
+    """Prueba que app.py no importa módulos pesados antes de la primera pantalla."""
+    print("\n⏱️ Probando tiempos de importación de app.py...")
+    
+    from tiempos_importacion import (
+        analizar_importtime, medir_importacion, modulos_importados, tabla_importacion, MODULOS_PESADOS
+    )
+    
+    salida = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     hijo\n"
+        "import time:       300 |        420 |   padre\n"
+        "import time:        80 |        500 | raiz\n"
+    )
+    registros = analizar_importtime(salida)
+    assert [(r['modulo'], r['nivel'], r['acumulado_ms']) for r in registros] == [
+        ('hijo', 2, 0.12), ('padre', 1, 0.42), ('raiz', 0, 0.5)
+    ]
+
+    # Una base ya cargada al arrancar el intérprete no tiene línea propia: no se filtra nada
+    assert 'json' in modulos_importados(medir_importacion('json', base='sys'))
+    # Los errores informan la excepción, o el código de salida si stderr está vacío
+    from unittest import mock
+    for stderr, esperado in (("import time: 1 | 1 | x\nModuleNotFoundError: falta\n", "ModuleNotFoundError"),
+                             ("", "código de salida 1")):
+        with mock.patch('subprocess.run', return_value=mock.Mock(returncode=1, stderr=stderr)):
+            try:
+                medir_importacion('falta')
+                assert False, "Expected RuntimeError"
+            except RuntimeError as e:
+                assert esperado in str(e), str(e)
+
+    # Solo lo que app agrega por encima de streamlit (ya cargado por el servidor)
+    registros = medir_importacion('app', base='streamlit')
+    print(tabla_importacion(registros, filas=10))
+    pesados = [m for m in MODULOS_PESADOS if m in modulos_importados(registros)]
+    assert not pesados, f"app.py imports heavy modules at load time: {pesados}"
+    
+    print("✅ app.py difiere la importación de módulos pesados")
+
+
+def test_cache_figuras():
+    """Prueba la caché LRU de figuras: aciertos, fallos, desalojo e independencia."""
+    print("\n🧠 Probando caché de figuras...")
+    
+    from cache_graficos import CacheFiguras
+    
+    cache = CacheFiguras(capacidad=2)
+    fig1 = cache.obtener(crear_triangulo_potencias, 1760.0000000000002, 1320)
+    fig2 = cache.obtener(crear_triangulo_potencias, 1760, 1320)
+    assert cache.estadisticas()['aciertos'] == 1, "Floating-point noise should hit the cache"
+    assert fig1 is not fig2 and fig1.to_dict() == fig2.to_dict()
+
+    
+    fig1.update_layout(title_text='Modificada')
+    assert cache.obtener(crear_triangulo_potencias, 1760, 1320).layout.title.text == 'Triángulo de Potencias'
+    
+    # Desalojo del elemento menos usado recientemente
+    cache.obtener(crear_grafico_desequilibrio, [10, 8, 12], ['R', 'S', 'T'])
+    cache.obtener(crear_diagrama_fasorial_trifasico, [220, 220, 220], [0, -120, 120])
+    stats = cache.estadisticas()
+    assert stats['entradas'] == 2 and stats['fallos'] == 3, f"Unexpected stats: {stats}"
+    cache.obtener(crear_triangulo_potencias, 1760, 1320)
+    assert cache.estadisticas()['fallos'] == 4, "Evicted entry should miss"
+    
+    json_1 = cache.obtener_json(crear_grafico_circular, 1760, 1320, 2200)
+    assert cache.obtener_json(crear_grafico_circular, 1760, 1320, 2200) is json_1
+    assert '"Distribución de Potencias"' in json_1 or 'Distribuci' in json_1
+    
+    # Las etiquetas usan las entradas originales: valores grandes conservan sus decimales
+    grande = cache.obtener_json(crear_triangulo_potencias, 55942.34, 1320)
+    assert '55942.34' in grande and '55942.30' not in grande
+    assert '55942.31' in cache.obtener_json(crear_triangulo_potencias, 55942.31, 1320)
+    
+    print(f"✅ Caché de figuras operativa ({cache.estadisticas()})")
+
+
 def generar_informe():
     """Genera un informe de las pruebas."""
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -282,6 +1402,29 @@ def main():
         test_analisis_avanzados()
         test_capacitores()
         test_graficos()
+        test_agregados_historico()
+        test_carga_historico_esquema()
+        test_carga_historico_arrow()
+        test_historico_vigente()
+        test_registro_compartido()
+        test_calculos_lote()
+        test_procesamiento_lote_cli()
+        test_api_micro_lotes()
+        test_sondeo_medidores()
+        test_rotacion_historico()
+        test_almacen_columnar()
+        test_plantillas_graficos()
+        test_figuras_rapidas()
+        test_decimacion_series()
+        test_diagrama_fasorial_n()
+        test_exportacion_lotes()
+        test_densidad_potencias()
+        test_animacion_ondas()
+        test_vista_flota()
+        test_serializacion_compacta()
+        test_cache_figuras()
+        test_perfilado_ejecucion()
+        test_importacion_diferida()
         
         print("\n" + "=" * 70)
         print("🎉 ¡TODAS LAS PRUEBAS PASARON EXITOSAMENTE!")